@@ -3,7 +3,8 @@ from django.contrib.auth.admin import UserAdmin
 from django.contrib.auth.models import User
 from django.db import models
 
-from .models import Category, Location, Post, Comment
+from . import search
+from .models import Category, Comment, Location, Post, Task
 
 
 class UserAdminCustom(UserAdmin):
@@ -58,5 +59,28 @@ class PostAdmin(admin.ModelAdmin):
     empty_value_display = ('-пусто-')
     list_display_links = ('title',)
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term or not search.is_supported():
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        if not search.build_match(search_term):
+            # В запросе нет ни одного слова, например «!!!»: FTS5 не
+            # разберёт пустое выражение MATCH.
+            return queryset.none(), False
+        return (
+            queryset.filter(pk__in=search.matching_post_ids(search_term)),
+            False,
+        )
+
 
 admin.site.register(Comment)
+
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'attempts', 'run_after',
+                    'dedup_key', 'created_at',)
+    list_filter = ('status',)
+    search_fields = ('name', 'dedup_key')
+    readonly_fields = ('locked_until', 'last_error',)
@@ -8,3 +8,10 @@ class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
     verbose_name = 'Блог'
+
+    def ready(self):
+        from . import loaders, pragmas, signals  # noqa: F401
+        from .models import Comment, Post
+
+        loaders.install(Post, 'author', 'category', 'location')
+        loaders.install(Comment, 'author')
@@ -0,0 +1,164 @@
+"""Замеры маршрутов блога.
+
+Каждый именованный маршрут из ``blog.urls`` и ``pages.urls`` вызывается
+тестовым клиентом в том же процессе; для каждого записываются p50, p95
+и p99 времени ответа, число SQL-запросов и размер ответа. Результаты
+сохраняются в JSON и сравниваются с базовым прогоном.
+"""
+import statistics
+import time
+from http import HTTPStatus
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from PIL import Image
+
+from .models import Comment, Post
+from .timeline import timeline
+
+NAMESPACES = ('blog', 'pages')
+# Параметры запроса для маршрутов, которым без них нечего показать.
+QUERY_STRINGS = {
+    'blog:search': {'q': 'путешествие'},
+}
+# Метрики, рост которых считается ухудшением, и изменение, которое
+# тонет в шуме замера и ухудшением не считается.
+METRIC_NOISE = {
+    'p50': 1.0, 'p95': 1.0, 'p99': 1.0, 'queries': 0, 'bytes': 0,
+}
+
+
+def iter_routes(patterns=None, namespace=None):
+    """Имена маршрутов вида ``blog:index`` и их шаблоны."""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            inner = pattern.namespace or namespace
+            if namespace is None and inner not in NAMESPACES:
+                continue
+            yield from iter_routes(pattern.url_patterns, inner)
+        elif isinstance(pattern, URLPattern) and pattern.name and namespace:
+            yield f'{namespace}:{pattern.name}', pattern
+
+
+def route_arguments():
+    """Значения параметров маршрутов, взятые из данных в базе."""
+    post = Post.published.exclude(image='').first()
+    if post is None:
+        post = attach_image(Post.published.first())
+    comment = Comment.objects.create(
+        post=post, author_id=post.author_id, text='Комментарий для замера'
+    )
+    return post.author, {
+        'post_id': post.pk,
+        'comment_id': comment.pk,
+        'username': post.author.username,
+        'category_slug': post.category.slug,
+        'width': 640,
+        'height': 0,
+        'path': post.image.name,
+    }
+
+
+def attach_image(post):
+    stream = BytesIO()
+    Image.new('RGB', (1600, 1200), color=(73, 109, 137)).save(
+        stream, format='JPEG'
+    )
+    post.image.save('benchmark.jpg', ContentFile(stream.getvalue()))
+    return post
+
+
+def route_cases():
+    """Адреса всех маршрутов и автор, от чьего имени их открывать."""
+    author, arguments = route_arguments()
+    cases = []
+    for name, pattern in iter_routes():
+        kwargs = {
+            key: arguments[key] for key in pattern.pattern.converters
+        }
+        cases.append((name, reverse(name, kwargs=kwargs)))
+    return author, cases
+
+
+def percentile(values, percent):
+    if len(values) < 2:
+        return values[0] if values else 0
+    return statistics.quantiles(values, n=100, method='inclusive')[
+        percent - 1
+    ]
+
+
+def measure(client, path, data, iterations, warm):
+    """Вызвать адрес `iterations` раз и собрать метрики."""
+    timings = []
+    queries = []
+    for _ in range(iterations):
+        if not warm:
+            cache.clear()
+            timeline.reset()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(path, data)
+            timings.append((time.perf_counter() - started) * 1000)
+        queries.append(len(captured.captured_queries))
+    body = b''.join(response) if response.streaming else response.content
+    return {
+        'path': path,
+        'status': response.status_code,
+        'p50': percentile(timings, 50),
+        'p95': percentile(timings, 95),
+        'p99': percentile(timings, 99),
+        'queries': statistics.median(queries),
+        'bytes': len(body),
+    }
+
+
+def is_redirect(response):
+    return HTTPStatus.MULTIPLE_CHOICES <= response.status_code < 400
+
+
+def run(iterations=20, warm=False):
+    """Замерить все маршруты.
+
+    Маршрут, который гостя перенаправляет, а автору отвечает страницей,
+    замеряется от имени автора.
+    """
+    author, cases = route_cases()
+    anonymous = Client()
+    authorized = Client()
+    authorized.force_login(author)
+    results = {}
+    for name, path in cases:
+        data = QUERY_STRINGS.get(name, {})
+        client = anonymous
+        if is_redirect(anonymous.get(path, data)) and not is_redirect(
+            authorized.get(path, data)
+        ):
+            client = authorized
+        results[name] = measure(client, path, data, iterations, warm)
+    return results
+
+
+def compare(baseline, current, threshold):
+    """Ухудшения больше `threshold` (доля) относительно базового прогона."""
+    regressions = []
+    for name, metrics in current.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        if metrics['status'] != previous['status']:
+            regressions.append(
+                (name, 'status', previous['status'], metrics['status'])
+            )
+        for metric, noise in METRIC_NOISE.items():
+            before, after = previous[metric], metrics[metric]
+            if after > before * (1 + threshold) and after - before > noise:
+                regressions.append((name, metric, before, after))
+    return regressions
@@ -0,0 +1,112 @@
+"""Общие помощники для кэширования данных блога.
+
+Устаревание построено на поколениях: у каждого тега (``post:1``,
+``category:2``, ``feed``...) есть счётчик в кэше, сигналы моделей его
+сдвигают, а сохранённые данные помнят поколения, с которыми собирались.
+
+Счётчики должны лежать в кэше, общем для всех процессов: сервера с
+несколькими обработчиками, run_tasks, publish_scheduled и load_dump.
+Кэш в памяти процесса (LocMemCache) сбросит данные только в том процессе,
+который сделал запись, поэтому в settings.CACHES задан файловый кэш.
+"""
+import hashlib
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+
+GENERATION_KEY = 'blog:generation:{}'
+PAGE_KEY = 'blog:page:{}'
+# Тег данных, прочитанных с реплик; его сдвигает refresh_replica.
+REPLICA_TAG = 'replica'
+
+
+def _new_generation():
+    # Поколение берётся из часов, чтобы после вытеснения счётчика из кэша
+    # не вернуться к уже использованному значению, а две записи подряд
+    # не совпали.
+    return time.time_ns()
+
+
+def separate_caches(directory):
+    """Настройка CACHES того же вида, но с кэшем в каталоге `directory`.
+
+    Нужна прогонам на отдельной базе: их страницы и поколения не должны
+    попасть в кэш, который читает рабочий сервер.
+    """
+    return {
+        'default': {
+            **settings.CACHES['default'],
+            'LOCATION': Path(directory) / 'cache',
+        },
+    }
+
+
+def get_generation(name):
+    """Вернуть текущее поколение данных `name`."""
+    key = GENERATION_KEY.format(name)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _new_generation(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(*names):
+    """Сделать устаревшими ключи, построенные на поколениях `names`."""
+    # Новое значение вместо incr(): у файлового кэша incr() — это чтение и
+    # запись, и два процесса могли бы записать одно и то же поколение.
+    generation = _new_generation()
+    cache.set_many(
+        {GENERATION_KEY.format(name): generation for name in names}, None
+    )
+
+
+def get_generations(names):
+    """Вернуть поколения сразу для нескольких имён одним походом в кэш."""
+    keys = {GENERATION_KEY.format(name): name for name in names}
+    found = cache.get_many(keys)
+    generations = {keys[key]: value for key, value in found.items()}
+    for name in set(names) - set(generations):
+        generations[name] = get_generation(name)
+    return generations
+
+
+def post_tags(post):
+    """Теги объектов, из которых собрана карточка публикации."""
+    return {
+        f'post:{post.pk}',
+        f'author:{post.author_id}',
+        f'category:{post.category_id}',
+        f'location:{post.location_id}',
+    }
+
+
+def _page_key(request):
+    path = hashlib.md5(request.get_full_path().encode()).hexdigest()
+    return PAGE_KEY.format(path)
+
+
+def is_page_cacheable(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+    )
+
+
+def get_cached_page(request):
+    """Вернуть сохранённый ответ, если ни один из его тегов не изменился."""
+    entry = cache.get(_page_key(request))
+    if entry is None:
+        return None
+    generations, response = entry
+    if get_generations(generations) != generations:
+        return None
+    return response
+
+
+def store_page(request, response, tags, timeout):
+    cache.set(
+        _page_key(request), (get_generations(tags), response), timeout
+    )
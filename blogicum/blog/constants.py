@@ -1,3 +1,32 @@
 MAX_LENGTH_FIELD = 256
+# Сколько слов текста показывает карточка публикации в ленте.
+EXCERPT_WORDS = 10
 NUMBER_POSTS = 5
 POSTS_FOR_PAGINATOR = 10
+COMMENTS_PER_PAGE = 20
+# Сколько страниц главной обслуживает буфер ленты в памяти.
+TIMELINE_PAGES = 3
+TIMELINE_SIZE = POSTS_FOR_PAGINATOR * TIMELINE_PAGES
+# Сколько секунд буфер ленты живёт без проверки базы.
+TIMELINE_MAX_AGE = 60
+PAGINATOR_ON_EACH_SIDE = 2
+PAGINATOR_ON_ENDS = 1
+POST_COUNT_CACHE_TIMEOUT = 60
+PAGE_CACHE_TIMEOUT = 60
+# Сколько секунд после записи сессия читает из основной базы.
+REPLICA_PIN_SECONDS = 10
+# Через сколько секунд повторить запись, отклонённую из-за очереди.
+WRITE_RETRY_AFTER = 5
+# Ключи фрагментов содержат версии объектов, устаревшие просто истекают.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+# Ширина и высота копий картинок; высота 0 — по пропорциям оригинала.
+RENDITION_SIZES = ((320, 0), (640, 0), (960, 0), (1280, 0))
+RENDITION_QUALITY = 80
+RENDITION_CACHE_MAX_BYTES = 512 * 1024 * 1024
+RENDITION_CACHE_EVICT_TO = RENDITION_CACHE_MAX_BYTES * 9 // 10
+RENDITION_MAX_AGE = 60 * 60 * 24 * 30
+# Фоновая очередь: сколько секунд задача закреплена за обработчиком,
+# сколько раз её пробовать и пауза перед первым повтором.
+TASK_LEASE = 5 * 60
+TASK_MAX_ATTEMPTS = 3
+TASK_RETRY_DELAY = 10
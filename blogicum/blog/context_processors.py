@@ -0,0 +1,6 @@
+from .constants import FRAGMENT_CACHE_TIMEOUT
+
+
+def fragment_cache(request):
+    """Время жизни фрагментов шаблонов для тега {% cache %}."""
+    return {'fragment_cache_timeout': FRAGMENT_CACHE_TIMEOUT}
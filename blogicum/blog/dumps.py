@@ -0,0 +1,158 @@
+"""Потоковое чтение и запись дампов в формате фикстур Django.
+
+Дамп читается и пишется по одному объекту, поэтому память не зависит
+от размера файла. Файлы с расширением ``.gz`` сжимаются и
+распаковываются на лету.
+"""
+import gzip
+import json
+import sys
+from contextlib import contextmanager
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+READ_CHUNK = 64 * 1024
+
+
+@contextmanager
+def open_dump(path, mode='r'):
+    """Открыть дамп как текст; ``-`` — стандартный ввод или вывод."""
+    if path == '-':
+        yield sys.stdin if mode == 'r' else sys.stdout
+        return
+    opener = gzip.open if str(path).endswith('.gz') else open
+    with opener(path, mode + 't', encoding='utf-8') as stream:
+        yield stream
+
+
+class _Buffer:
+    """Непрочитанный хвост потока; дочитывает его кусками по мере нужды."""
+
+    def __init__(self, stream, chunk_size):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.text = ''
+        self.eof = False
+
+    def read(self):
+        chunk = self.stream.read(self.chunk_size)
+        self.eof = not chunk
+        self.text += chunk
+
+    def next_char(self):
+        self.text = self.text.lstrip()
+        while not self.text:
+            if self.eof:
+                raise ValueError('Дамп оборвался до закрывающей скобки.')
+            self.read()
+            self.text = self.text.lstrip()
+        return self.text[0]
+
+    def consume(self, size):
+        self.text = self.text[size:]
+
+    def decode(self, decoder):
+        while True:
+            try:
+                obj, end = decoder.raw_decode(self.text)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                # Объект ещё не дочитан целиком.
+                self.read()
+                continue
+            self.consume(end)
+            return obj
+
+
+def iter_fixture(stream, chunk_size=READ_CHUNK):
+    """Объекты JSON-массива из `stream` по одному."""
+    decoder = json.JSONDecoder()
+    buffer = _Buffer(stream, chunk_size)
+    if buffer.next_char() != '[':
+        raise ValueError('Дамп должен быть JSON-массивом.')
+    buffer.consume(1)
+    while True:
+        char = buffer.next_char()
+        if char == ']':
+            return
+        if char == ',':
+            buffer.consume(1)
+            continue
+        yield buffer.decode(decoder)
+
+
+def dependency_order(models):
+    """Отсортировать модели так, чтобы связанные шли раньше ссылающихся."""
+    models = list(models)
+    ordered = []
+    visiting = set()
+
+    def visit(model):
+        if model in ordered or model in visiting:
+            return
+        visiting.add(model)
+        for field in (*model._meta.fields, *model._meta.many_to_many):
+            related = field.related_model
+            if field.is_relation and related in models:
+                visit(related)
+        ordered.append(model)
+
+    for model in models:
+        visit(model)
+    return ordered
+
+
+def matches(model, labels):
+    """Подходит ли модель под метки вида ``app`` или ``app.Model``."""
+    return (
+        model._meta.app_label in labels
+        or model._meta.label_lower in {label.lower() for label in labels}
+    )
+
+
+def iter_keyset(queryset, batch_size):
+    """Все строки выборки по возрастанию pk, пачками по `batch_size`.
+
+    Каждая пачка — отдельный запрос ``pk > последний`` с LIMIT, а строки
+    внутри неё читаются курсором, поэтому в памяти не больше одной пачки.
+    """
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        batch = queryset if last_pk is None else queryset.filter(
+            pk__gt=last_pk
+        )
+        count = 0
+        for obj in batch[:batch_size].iterator(chunk_size=batch_size):
+            yield obj
+            last_pk = obj.pk
+            count += 1
+        if count < batch_size:
+            return
+
+
+class FixtureWriter:
+    """Пишет объекты по одному: JSON-массивом фикстуры или NDJSON."""
+
+    def __init__(self, stream, ndjson=False):
+        self.stream = stream
+        self.ndjson = ndjson
+        self.count = 0
+
+    def __enter__(self):
+        if not self.ndjson:
+            self.stream.write('[')
+        return self
+
+    def write(self, obj):
+        line = json.dumps(obj, cls=DjangoJSONEncoder, ensure_ascii=False)
+        if self.ndjson:
+            self.stream.write(line + '\n')
+        else:
+            self.stream.write(('\n' if not self.count else ',\n') + line)
+        self.count += 1
+
+    def __exit__(self, *exc_info):
+        if not self.ndjson:
+            self.stream.write('\n]\n')
@@ -0,0 +1,99 @@
+"""Пакетная загрузка связанных объектов и карта объектов запроса.
+
+Ленивое обращение к внешнему ключу (``post.author``) загружает объект
+сразу для всех соседей по выборке одним запросом ``IN (...)``, а карта
+объектов запроса не даёт загрузить один и тот же объект дважды.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import models
+from django.db.models.fields.related_descriptors import \
+    ForwardManyToOneDescriptor
+
+_identity_map = ContextVar('blog_identity_map', default=None)
+
+
+@contextmanager
+def identity_map():
+    """Включить карту объектов на время обработки запроса."""
+    token = _identity_map.set({})
+    try:
+        yield
+    finally:
+        _identity_map.reset(token)
+
+
+def remember(*objects):
+    """Положить уже загруженные объекты в карту текущего запроса."""
+    registry = _identity_map.get()
+    if registry is None:
+        return
+    for obj in objects:
+        registry.setdefault(type(obj), {})[obj.pk] = obj
+
+
+def load(field, instance):
+    """Вернуть объект по внешнему ключу `field`, загрузив его пакетом."""
+    model = field.related_model
+    registry = _identity_map.get()
+    if registry is None:
+        registry = {}
+    known = registry.setdefault(model, {})
+    pk = getattr(instance, field.attname)
+    if pk not in known:
+        batch = getattr(instance, '_loader_batch', (instance,))
+        pending = {
+            getattr(obj, field.attname) for obj in batch
+            if not field.is_cached(obj)
+        }
+        pending.add(pk)
+        pending.difference_update(known)
+        pending.discard(None)
+        known.update(
+            model._base_manager.db_manager(hints={'instance': instance})
+            .in_bulk(pending)
+        )
+        for obj in batch:
+            value = getattr(obj, field.attname)
+            if value in known and not field.is_cached(obj):
+                field.set_cached_value(obj, known[value])
+    try:
+        return known[pk]
+    except KeyError:
+        raise model.DoesNotExist(
+            f'{model._meta.object_name} с pk={pk} не найден.'
+        ) from None
+
+
+class BatchedForwardDescriptor(ForwardManyToOneDescriptor):
+    """Дескриптор внешнего ключа, который загружает объекты через load()."""
+
+    def get_object(self, instance):
+        return load(self.field, instance)
+
+
+def install(model, *field_names):
+    """Подменить дескрипторы внешних ключей модели на пакетные."""
+    for name in field_names:
+        setattr(
+            model, name,
+            BatchedForwardDescriptor(model._meta.get_field(name)),
+        )
+
+
+class BatchLoadingQuerySet(models.QuerySet):
+    """QuerySet, объекты которого знают соседей по выборке."""
+
+    def _fetch_all(self):
+        fetched = self._result_cache is None
+        super()._fetch_all()
+        if not fetched:
+            return
+        batch = [
+            obj for obj in self._result_cache
+            if isinstance(obj, models.Model)
+        ]
+        if len(batch) > 1:
+            for obj in batch:
+                obj._loader_batch = batch
@@ -0,0 +1,283 @@
+"""Нагрузочный прогон блога несколькими процессами.
+
+Сервер — несколько процессов с одним слушающим сокетом (как prefork у
+gunicorn): WSGI-приложение обслуживает wsgiref, ASGI — uvicorn, если он
+установлен. Клиенты — отдельные процессы, каждый держит свою сессию и
+выполняет смесь сценариев: чтение лент гостем, комментарий и публикация
+с картинкой от имени вошедшего пользователя.
+"""
+import random
+import re
+import time
+import uuid
+from collections import defaultdict
+from http.cookiejar import CookieJar
+from io import BytesIO
+from socketserver import ThreadingMixIn
+from urllib.error import HTTPError, URLError
+from urllib.parse import urlencode
+from urllib.request import (HTTPCookieProcessor, HTTPRedirectHandler,
+                            Request, build_opener)
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer
+
+from PIL import Image
+
+SCENARIOS = ('read', 'comment', 'post')
+# Верхние границы корзин гистограммы задержек, мс.
+BUCKETS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+CSRF_RE = re.compile(r'name="csrfmiddlewaretoken" value="([^"]+)"')
+REQUEST_TIMEOUT = 30
+
+
+def parse_mix(value):
+    """Разобрать смесь вида ``read=80,comment=15,post=5`` в веса."""
+    weights = {}
+    for item in value.split(','):
+        name, _, weight = item.partition('=')
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise ValueError(
+                f'Неизвестный сценарий: {name}. '
+                f'Доступны: {", ".join(SCENARIOS)}.'
+            )
+        weights[name] = float(weight)
+    if not any(weights.values()):
+        raise ValueError('Хотя бы у одного сценария вес должен быть больше 0.')
+    return weights
+
+
+class QuietHandler(WSGIRequestHandler):
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+def serve_wsgi(listener, threads):
+    """Обслуживать сокет `listener` WSGI-приложением проекта."""
+    from blogicum.wsgi import application
+
+    server_class = ThreadingWSGIServer if threads > 1 else WSGIServer
+    server = server_class(
+        listener.getsockname(), QuietHandler, bind_and_activate=False
+    )
+    # Сокет уже слушает в родительском процессе, его делят все рабочие.
+    server.socket = listener
+    server.server_name, server.server_port = listener.getsockname()[:2]
+    server.setup_environ()
+    server.set_app(application)
+    server.serve_forever()
+
+
+def serve_asgi(listener, threads):
+    import uvicorn
+
+    config = uvicorn.Config(
+        'blogicum.asgi:application', fd=listener.fileno(),
+        log_level='warning', lifespan='off',
+    )
+    uvicorn.Server(config).run()
+
+
+SERVERS = {
+    'wsgi': serve_wsgi,
+    'asgi': serve_asgi,
+}
+
+
+class NoRedirect(HTTPRedirectHandler):
+
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class Session:
+    """Браузер без JavaScript: cookie, CSRF и замер каждого запроса."""
+
+    def __init__(self, base_url, results):
+        self.base_url = base_url
+        self.results = results
+        self.opener = build_opener(
+            HTTPCookieProcessor(CookieJar()), NoRedirect()
+        )
+
+    def request(self, endpoint, path, data=None, content_type=None):
+        request = Request(self.base_url + path, data=data)
+        if content_type:
+            request.add_header('Content-Type', content_type)
+        started = time.perf_counter()
+        try:
+            with self.opener.open(request, timeout=REQUEST_TIMEOUT) as reply:
+                status, body = reply.status, reply.read()
+        except HTTPError as error:
+            status, body = error.code, error.read()
+        except (URLError, OSError):
+            status, body = None, b''
+        self.results[endpoint].append(
+            (status, (time.perf_counter() - started) * 1000)
+        )
+        return status, body.decode(errors='replace')
+
+    def csrf_token(self, endpoint, path):
+        _, body = self.request(endpoint, path)
+        match = CSRF_RE.search(body)
+        return match.group(1) if match else ''
+
+    def post(self, endpoint, path, fields, files=None, form_path=None):
+        fields = {
+            'csrfmiddlewaretoken': self.csrf_token(
+                f'{endpoint}:form', form_path or path
+            ),
+            **fields,
+        }
+        if files:
+            data, content_type = multipart(fields, files)
+        else:
+            data = urlencode(fields).encode()
+            content_type = 'application/x-www-form-urlencoded'
+        return self.request(endpoint, path, data, content_type)
+
+    def login(self, username, password):
+        self.post(
+            'login', '/auth/login/',
+            {'username': username, 'password': password},
+        )
+
+
+def multipart(fields, files):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for name, value in fields.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; '
+            f'name="{name}"\r\n\r\n{value}\r\n'.encode()
+        )
+    for name, (filename, content) in files.items():
+        parts.append(
+            f'--{boundary}\r\nContent-Disposition: form-data; '
+            f'name="{name}"; filename="{filename}"\r\n'
+            'Content-Type: image/jpeg\r\n\r\n'.encode()
+            + content + b'\r\n'
+        )
+    parts.append(f'--{boundary}--\r\n'.encode())
+    return b''.join(parts), f'multipart/form-data; boundary={boundary}'
+
+
+def sample_image():
+    stream = BytesIO()
+    Image.new('RGB', (1200, 800), color=(73, 109, 137)).save(
+        stream, format='JPEG'
+    )
+    return stream.getvalue()
+
+
+def read(session, rng, data):
+    path, endpoint = rng.choice((
+        ('/', 'index'),
+        (f'/?page={rng.randint(2, 5)}', 'index_page'),
+        (f'/posts/{rng.choice(data["posts"])}/', 'post_detail'),
+        (f'/category/{rng.choice(data["categories"])}/', 'category'),
+        (f'/profile/{rng.choice(data["usernames"])}/', 'profile'),
+    ))
+    session.request(endpoint, path)
+
+
+def comment(session, rng, data):
+    post_id = rng.choice(data['posts'])
+    session.post(
+        'add_comment', f'/posts/{post_id}/comment',
+        {'text': f'Комментарий под нагрузкой {rng.random()}'},
+        form_path=f'/posts/{post_id}/',
+    )
+
+
+def post(session, rng, data):
+    session.post(
+        'create_post', '/posts/create/',
+        {
+            'title': 'Публикация под нагрузкой',
+            'text': 'Текст публикации под нагрузкой.',
+            'pub_date': time.strftime('%Y-%m-%dT%H:%M'),
+            'category': rng.choice(data['category_ids']),
+            'is_published': 'on',
+        },
+        files={'image': ('load.jpg', data['image'])},
+    )
+
+
+def run_client(index, base_url, mix, data, deadline, queue):
+    """Выполнять сценарии до `deadline` и отдать замеры в `queue`."""
+    rng = random.Random(index)
+    results = defaultdict(list)
+    guest = Session(base_url, results)
+    user = Session(base_url, results)
+    user.login(data['usernames'][index % len(data['usernames'])],
+               data['password'])
+    scenarios = {'read': (read, guest), 'comment': (comment, user),
+                 'post': (post, user)}
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    while time.monotonic() < deadline:
+        scenario, session = scenarios[rng.choices(names, weights)[0]]
+        scenario(session, rng, data)
+    queue.put(dict(results))
+
+
+def merge(parts):
+    merged = defaultdict(list)
+    for part in parts:
+        for endpoint, samples in part.items():
+            merged[endpoint].extend(samples)
+    return merged
+
+
+def percentile(values, percent):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def histogram(latencies):
+    counts = [0] * (len(BUCKETS) + 1)
+    for latency in latencies:
+        position = next(
+            (number for number, bound in enumerate(BUCKETS)
+             if latency <= bound),
+            len(BUCKETS),
+        )
+        counts[position] += 1
+    return counts
+
+
+def summarize(samples, seconds):
+    """Пропускная способность, задержки и доля ошибок по конечной точке.
+
+    Ошибкой считается обрыв соединения, ответ 5xx и 4xx; ответы 503
+    очереди записи учитываются отдельно как отказ из-за перегрузки.
+    """
+    summary = {}
+    for endpoint, items in sorted(samples.items()):
+        latencies = [latency for _, latency in items]
+        statuses = [status for status, _ in items]
+        summary[endpoint] = {
+            'requests': len(items),
+            'rps': len(items) / seconds,
+            'p50': percentile(latencies, 50),
+            'p95': percentile(latencies, 95),
+            'p99': percentile(latencies, 99),
+            'errors': sum(
+                status is None or (status >= 400 and status != 503)
+                for status in statuses
+            ) / len(items),
+            'rejected': statuses.count(503) / len(items),
+            'histogram': histogram(latencies),
+            'statuses': {
+                str(status): statuses.count(status)
+                for status in sorted(set(statuses), key=str)
+            },
+        }
+    return summary
@@ -0,0 +1,15 @@
+from django.core.mail.backends.base import BaseEmailBackend
+
+from .tasks import enqueue, send_email, serialize_email
+
+
+class QueuedEmailBackend(BaseEmailBackend):
+    """Ставит письма в фоновую очередь вместо отправки в запросе.
+
+    Настоящий бэкенд задаётся настройкой QUEUED_EMAIL_BACKEND.
+    """
+
+    def send_messages(self, email_messages):
+        for message in email_messages:
+            enqueue(send_email, serialize_email(message))
+        return len(email_messages)
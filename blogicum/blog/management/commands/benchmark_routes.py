@@ -0,0 +1,79 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+from django.test.utils import (override_settings, setup_databases,
+                               setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+from django.utils.timezone import now
+
+from blog import benchmarks, seeding
+from blog.caching import separate_caches
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет все маршруты blog и pages на отдельной базе с '
+        'сгенерированными данными и сохраняет результат в JSON.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output', help='Файл JSON для результатов прогона.',
+        )
+        parser.add_argument(
+            '--iterations', type=int, default=20,
+            help='Сколько раз вызывать каждый маршрут.',
+        )
+        parser.add_argument(
+            '--warm', action='store_true',
+            help='Не сбрасывать кеш между вызовами.',
+        )
+        parser.add_argument(
+            '--posts', type=int, default=300,
+            help='Сколько публикаций сгенерировать.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора данных.',
+        )
+
+    def handle(self, *args, output, iterations, warm, posts, seed,
+               **options):
+        # Тестовая база и DEBUG=False, как у тестов: замер не трогает
+        # рабочую базу и не включает панель отладки.
+        setup_test_environment(debug=False)
+        databases = setup_databases(verbosity=0, interactive=False)
+        try:
+            with tempfile.TemporaryDirectory() as media, override_settings(
+                MEDIA_ROOT=media, BLOG_READ_REPLICAS=[],
+                CACHES=separate_caches(media),
+            ):
+                seeding.seed(posts=posts, comments=posts * 5, seed=seed)
+                results = benchmarks.run(iterations, warm)
+        finally:
+            teardown_databases(databases, verbosity=0)
+            teardown_test_environment()
+        self.report(results)
+        if output:
+            Path(output).write_text(json.dumps({
+                'created': now().isoformat(),
+                'iterations': iterations,
+                'warm': warm,
+                'posts': posts,
+                'seed': seed,
+                'routes': results,
+            }, ensure_ascii=False, indent=2))
+
+    def report(self, results):
+        self.stdout.write(
+            f'{"маршрут":<24} {"код":>4} {"p50":>7} {"p95":>7} {"p99":>7} '
+            f'{"SQL":>5} {"байт":>8}'
+        )
+        for name, metrics in results.items():
+            self.stdout.write(
+                f'{name:<24} {metrics["status"]:>4} {metrics["p50"]:>7.1f} '
+                f'{metrics["p95"]:>7.1f} {metrics["p99"]:>7.1f} '
+                f'{metrics["queries"]:>5g} {metrics["bytes"]:>8}'
+            )
@@ -0,0 +1,201 @@
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from blog import pragmas
+from blog.models import Comment, Post
+from blog.timeline import timeline
+
+# Так Django настраивает SQLite по умолчанию: журнал отката, без mmap.
+BASELINE = 'django'
+BASELINE_PRAGMAS = {'journal_mode': 'DELETE'}
+# Страницы записываются без кеша, чтобы в смеси были все их запросы;
+# без кеша повторяются и запросы, которые обычно берутся из него, так
+# что поиск N+1 на время записи выключен.
+RECORD_SETTINGS = {
+    'ALLOWED_HOSTS': ['*'],
+    'CACHES': {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+        },
+    },
+    'BLOG_NPLUSONE': None,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает наборы прагм SQLite на запросах блога: страницах лент '
+        'и публикации и добавлении комментария.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--presets', nargs='+', choices=list(pragmas.PRESETS),
+            default=list(pragmas.PRESETS),
+            help='Наборы из blog.pragmas.PRESETS.',
+        )
+        parser.add_argument(
+            '--seconds', type=float, default=5.0,
+            help='Сколько секунд нагружать каждый набор.',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=4,
+            help='Сколько соединений работают одновременно.',
+        )
+        parser.add_argument(
+            '--write-share', type=float, default=0.1,
+            help='Доля операций, которые добавляют комментарий.',
+        )
+
+    def handle(self, *args, presets, seconds, threads, write_share,
+               **options):
+        source = connections[DEFAULT_DB_ALIAS]
+        if source.vendor != 'sqlite':
+            raise CommandError('Команда сравнивает только настройки SQLite.')
+        self.seconds = seconds
+        self.threads = threads
+        self.write_share = write_share
+        with override_settings(**RECORD_SETTINGS):
+            pages, writes = self.record_pages(), self.record_writes()
+        candidates = {BASELINE: BASELINE_PRAGMAS}
+        candidates.update(
+            (name, pragmas.preset_pragmas(name)) for name in presets
+        )
+        self.stdout.write(
+            f'{"набор":<12} {"страниц/с":>10} {"записей/с":>10} '
+            f'{"p95, мс":>8} {"блокировок":>10}'
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            for name, values in candidates.items():
+                path = Path(directory) / f'{name}.sqlite3'
+                self.copy_database(source, path, values)
+                self.report(name, self.measure(path, values, pages, writes))
+
+    def record_pages(self):
+        """SQL страниц блога: по списку запросов на каждую страницу."""
+        urls = [reverse('blog:index')]
+        post = Post.objects.published().with_related_data().first()
+        if post is not None:
+            urls += [
+                reverse('blog:post_detail', args=[post.pk]),
+                reverse('blog:category_posts', args=[post.category.slug]),
+                reverse('blog:profile', args=[post.author.username]),
+            ]
+        client = Client()
+        pages = []
+        for url in urls:
+            timeline.reset()
+            with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as page:
+                client.get(url)
+            pages.append([
+                query['sql'] for query in page.captured_queries
+                if query['sql'].startswith('SELECT')
+            ])
+        return pages
+
+    def record_writes(self):
+        """SQL добавления комментария вместе с работой сигналов."""
+        post = Post.objects.published().first()
+        if post is None:
+            return []
+        connection = connections[DEFAULT_DB_ALIAS]
+        with CaptureQueriesContext(connection) as queries:
+            with transaction.atomic():
+                Comment.objects.create(
+                    post=post, author_id=post.author_id,
+                    text='Комментарий для замера',
+                )
+                transaction.set_rollback(True)
+        return [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+        ]
+
+    def copy_database(self, source, path, values):
+        source.ensure_connection()
+        destination = sqlite3.connect(path)
+        try:
+            source.connection.backup(destination)
+            # WAL хранится в файле: включаем его один раз, пока потоки
+            # замера ещё не открыли копию.
+            database_pragmas, _ = pragmas.split_pragmas(values)
+            pragmas.apply_pragmas(destination.cursor(), database_pragmas)
+        finally:
+            destination.close()
+
+    def measure(self, path, values, pages, writes):
+        deadline = time.monotonic() + self.seconds
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            results = list(pool.map(
+                lambda seed: self.work(
+                    path, values, pages, writes, deadline, seed
+                ),
+                range(self.threads),
+            ))
+        stats = sum((counter for counter, _ in results), Counter())
+        latencies = [value for _, values in results for value in values]
+        return stats, latencies
+
+    def work(self, path, values, pages, writes, deadline, seed):
+        # Соединение открывается как в Django: автокоммит и BEGIN
+        # в транзакциях; таймаут модуля sqlite3 — 5 секунд.
+        database = sqlite3.connect(
+            path, isolation_level=None, check_same_thread=False
+        )
+        _, connection_pragmas = pragmas.split_pragmas(values)
+        pragmas.apply_pragmas(database.cursor(), connection_pragmas)
+        rng = random.Random(seed)
+        stats = Counter()
+        latencies = []
+        try:
+            while time.monotonic() < deadline:
+                kind = 'writes' if (
+                    writes and rng.random() < self.write_share
+                ) else 'pages'
+                started = time.perf_counter()
+                try:
+                    if kind == 'writes':
+                        self.write(database, writes)
+                    else:
+                        for sql in rng.choice(pages):
+                            database.execute(sql).fetchall()
+                except sqlite3.OperationalError:
+                    if database.in_transaction:
+                        database.execute('ROLLBACK')
+                    stats['locked'] += 1
+                    continue
+                stats[kind] += 1
+                latencies.append(time.perf_counter() - started)
+        finally:
+            database.close()
+        return stats, latencies
+
+    def write(self, database, statements):
+        database.execute('BEGIN')
+        for sql in statements:
+            database.execute(sql)
+        database.execute('COMMIT')
+
+    def report(self, name, result):
+        stats, latencies = result
+        p95 = (
+            statistics.quantiles(latencies, n=20)[-1] * 1000
+            if len(latencies) > 1 else 0
+        )
+        self.stdout.write(
+            f'{name:<12} {stats["pages"] / self.seconds:>10.1f} '
+            f'{stats["writes"] / self.seconds:>10.1f} {p95:>8.1f} '
+            f'{stats["locked"]:>10}'
+        )
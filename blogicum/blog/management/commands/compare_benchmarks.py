@@ -0,0 +1,43 @@
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from blog.benchmarks import compare
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает прогон benchmark_routes с базовым и завершается с '
+        'ошибкой, если какой-то маршрут стал хуже больше чем на порог.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline', help='JSON базового прогона.')
+        parser.add_argument('current', help='JSON нового прогона.')
+        parser.add_argument(
+            '--threshold', type=float, default=0.2,
+            help='Допустимый рост метрики, доля: 0.2 — на 20%%.',
+        )
+
+    def handle(self, *args, baseline, current, threshold, **options):
+        baseline, current = (
+            json.loads(Path(path).read_text())['routes']
+            for path in (baseline, current)
+        )
+        for name in baseline.keys() - current.keys():
+            self.stdout.write(f'{name}: нет в новом прогоне')
+        regressions = compare(baseline, current, threshold)
+        for name, metric, before, after in regressions:
+            self.stdout.write(
+                f'{name} {metric}: {before:g} -> {after:g} '
+                f'(+{self.growth(before, after)})'
+            )
+        if regressions:
+            raise CommandError(f'Ухудшений: {len(regressions)}.')
+        self.stdout.write(self.style.SUCCESS('Ухудшений нет.'))
+
+    def growth(self, before, after):
+        if not before:
+            return f'{after:g}'
+        return f'{(after - before) / before:.0%}'
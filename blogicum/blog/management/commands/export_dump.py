@@ -0,0 +1,146 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from django.apps import apps
+from django.core import serializers
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Q
+from django.utils.timezone import now
+
+from blog.dumps import FixtureWriter, iter_keyset, open_dump
+
+DEFAULT_MODELS = (
+    'auth.User', 'blog.Category', 'blog.Location', 'blog.Post',
+    'blog.Comment',
+)
+# Поля, которые не выгружаются для аналитики; производные поля
+# публикации load_dump и loaddata заполняют заново.
+EXCLUDED_FIELDS = {
+    'auth.user': ('password', 'groups', 'user_permissions'),
+    'blog.post': ('excerpt', 'text_html'),
+}
+# Поля, по которым инкрементальная выгрузка находит новые и изменённые строки.
+CHANGE_FIELDS = ('created_at', 'updated_at', 'date_joined', 'last_login')
+# У комментария нет своего времени правки, но правка или перенос
+# комментария сдвигает updated_at публикации (blog.signals). Поэтому
+# выгружаются все комментарии изменённых публикаций: лишние строки, но
+# без пропущенных правок.
+RELATED_CHANGE_FIELDS = {
+    'blog.comment': ('post__updated_at',),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает публикации, комментарии, категории, места и '
+        'пользователей в NDJSON или формат фикстур, не держа выборку '
+        'в памяти.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'output', help='Каталог; в нём будет по файлу на модель.',
+        )
+        parser.add_argument(
+            '--models', nargs='+', default=DEFAULT_MODELS,
+            help='Модели в виде app.Model.',
+        )
+        parser.add_argument(
+            '--format', choices=('ndjson', 'json'), default='ndjson',
+            help='NDJSON или JSON-массив фикстуры Django.',
+        )
+        parser.add_argument(
+            '--gzip', action='store_true', help='Сжимать файлы gzip.',
+        )
+        parser.add_argument(
+            '--since', type=datetime.fromisoformat,
+            help='Только строки, созданные или изменённые с этого момента.',
+        )
+        parser.add_argument(
+            '--watermark',
+            help='Файл с моментом прошлой выгрузки; обновляется по '
+                 'завершении.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Сколько строк читать одним запросом.',
+        )
+        parser.add_argument(
+            '--jobs', type=int, default=1,
+            help='Сколько моделей выгружать параллельно.',
+        )
+
+    def handle(self, *args, output, models, format, gzip, since, watermark,
+               batch_size, jobs, **options):
+        try:
+            models = [apps.get_model(label) for label in models]
+        except (LookupError, ValueError) as error:
+            raise CommandError(error)
+        started = now()
+        if watermark and since is None:
+            since = self.read_watermark(watermark)
+        directory = Path(output)
+        directory.mkdir(parents=True, exist_ok=True)
+        suffix = f'.{format}' + ('.gz' if gzip else '')
+        self.format = format
+        self.since = since
+        self.batch_size = batch_size
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            results = pool.map(
+                lambda model: self.export_model(
+                    model, directory / f'{model._meta.label_lower}{suffix}'
+                ),
+                models,
+            )
+            for model, count in zip(models, results):
+                self.stdout.write(f'{model._meta.label}: {count}')
+        if watermark:
+            Path(watermark).write_text(
+                json.dumps({'since': started.isoformat()})
+            )
+
+    def read_watermark(self, path):
+        try:
+            data = json.loads(Path(path).read_text())
+        except FileNotFoundError:
+            return None
+        return datetime.fromisoformat(data['since'])
+
+    def get_queryset(self, model):
+        queryset = model._base_manager.all()
+        names = {field.name for field in model._meta.concrete_fields}
+        fields = [
+            *(name for name in CHANGE_FIELDS if name in names),
+            *RELATED_CHANGE_FIELDS.get(model._meta.label_lower, ()),
+        ]
+        if self.since is not None and fields:
+            condition = Q()
+            for name in fields:
+                condition |= Q(**{f'{name}__gte': self.since})
+            queryset = queryset.filter(condition)
+        return queryset
+
+    def export_model(self, model, path):
+        excluded = EXCLUDED_FIELDS.get(model._meta.label_lower, ())
+        fields = [
+            field.name
+            for field in (*model._meta.concrete_fields,
+                          *model._meta.many_to_many)
+            if field.name not in excluded and not field.primary_key
+        ]
+        try:
+            with open_dump(path, 'w') as stream, FixtureWriter(
+                stream, ndjson=self.format == 'ndjson'
+            ) as writer:
+                rows = iter_keyset(self.get_queryset(model), self.batch_size)
+                for obj in rows:
+                    writer.write(serializers.serialize(
+                        'python', [obj], fields=fields
+                    )[0])
+            return writer.count
+        finally:
+            # У каждого потока своё соединение с базой.
+            connection.close()
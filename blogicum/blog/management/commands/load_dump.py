@@ -0,0 +1,194 @@
+import json
+import tempfile
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.apps import apps
+from django.core import serializers
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.timezone import now
+
+from blog import pragmas, search, writes
+from blog.dumps import dependency_order, iter_fixture, matches, open_dump
+from blog.models import Category, Comment, Post
+
+
+@contextmanager
+def raw_timestamps(model):
+    """Сохранить created_at и updated_at из дампа, как loaddata."""
+    fields = [
+        field for field in model._meta.concrete_fields
+        if getattr(field, 'auto_now', False)
+        or getattr(field, 'auto_now_add', False)
+    ]
+    flags = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield fields
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, flags):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает дамп в формате фикстур Django пакетами bulk_create, '
+        'не читая файл в память целиком.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'fixtures', nargs='+',
+            help='Файлы .json или .json.gz; «-» — стандартный ввод.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=2000,
+            help='Сколько объектов вставлять в одной транзакции.',
+        )
+        parser.add_argument(
+            '--database', default=DEFAULT_DB_ALIAS,
+            help='Псевдоним базы данных для загрузки.',
+        )
+        parser.add_argument(
+            '-e', '--exclude', action='append', default=[],
+            help='Пропустить приложение или модель (app или app.Model).',
+        )
+        parser.add_argument(
+            '--ignore-conflicts', action='store_true',
+            help='Пропускать объекты, которые уже есть в базе.',
+        )
+
+    def handle(self, *args, fixtures, batch_size, database, exclude,
+               ignore_conflicts, **options):
+        self.using = database
+        self.batch_size = batch_size
+        self.ignore_conflicts = ignore_conflicts
+        connection = connections[database]
+        with tempfile.TemporaryDirectory() as spool:
+            counts = self.spool(fixtures, Path(spool), exclude)
+            models = dependency_order(counts)
+            try:
+                # Сайт на время загрузки ждёт в очереди записи или
+                # получает 503, а не «database is locked».
+                with writes.serialized_write():
+                    self.load(connection, models, Path(spool))
+            except writes.WriteQueueFull as error:
+                raise CommandError(f'База занята: {error}')
+        # Загрузка идёт в обход сигналов и может задеть любую страницу.
+        # Кэш общий для процессов сервера: очистка сбрасывает и поколения.
+        cache.clear()
+        for model in models:
+            self.stdout.write(f'{model._meta.label}: {counts[model]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено объектов: {sum(counts.values())}'
+        ))
+
+    def load(self, connection, models, spool):
+        with pragmas.bulk_load(connection):
+            with connection.constraint_checks_disabled():
+                for model in models:
+                    self.load_model(model, spool)
+            connection.check_constraints(
+                table_names=[model._meta.db_table for model in models]
+            )
+            self.reset_sequences(connection, models)
+        self.rebuild_derived(models)
+
+    def spool(self, fixtures, spool, exclude):
+        """Разложить объекты дампа по файлам NDJSON — по одному на модель."""
+        counts = {}
+        with ExitStack() as stack:
+            files = {}
+            for fixture in fixtures:
+                stream = stack.enter_context(open_dump(fixture))
+                for obj in iter_fixture(stream):
+                    try:
+                        model = apps.get_model(obj['model'])
+                    except (KeyError, LookupError) as error:
+                        raise CommandError(
+                            f'Неизвестная модель в дампе: {error}'
+                        )
+                    if matches(model, exclude):
+                        continue
+                    if model not in files:
+                        files[model] = stack.enter_context(open(
+                            spool / f'{model._meta.label_lower}.ndjson',
+                            'w', encoding='utf-8',
+                        ))
+                    files[model].write(
+                        json.dumps(obj, ensure_ascii=False) + '\n'
+                    )
+                    counts[model] = counts.get(model, 0) + 1
+        return counts
+
+    def load_model(self, model, spool):
+        path = spool / f'{model._meta.label_lower}.ndjson'
+        with raw_timestamps(model) as timestamps, \
+                open(path, encoding='utf-8') as lines:
+            batch = []
+            for line in lines:
+                batch.extend(serializers.deserialize(
+                    'python', [json.loads(line)], using=self.using,
+                    ignorenonexistent=True,
+                ))
+                if len(batch) >= self.batch_size:
+                    self.insert(model, batch, timestamps)
+                    batch = []
+            self.insert(model, batch, timestamps)
+
+    def insert(self, model, batch, timestamps):
+        if not batch:
+            return
+        moment = now()
+        objects = []
+        for item in batch:
+            for field in timestamps:
+                if getattr(item.object, field.attname) is None:
+                    setattr(item.object, field.attname, moment)
+            objects.append(item.object)
+        with transaction.atomic(using=self.using):
+            model._base_manager.using(self.using).bulk_create(
+                objects, ignore_conflicts=self.ignore_conflicts
+            )
+            self.insert_m2m(model, batch)
+
+    def insert_m2m(self, model, batch):
+        for field in model._meta.many_to_many:
+            through = field.remote_field.through
+            if not through._meta.auto_created:
+                # Явная промежуточная модель лежит в дампе отдельно.
+                continue
+            source = field.m2m_field_name() + '_id'
+            target = field.m2m_reverse_field_name() + '_id'
+            rows = [
+                through(**{source: item.object.pk, target: related_pk})
+                for item in batch if item.object.pk is not None
+                for related_pk in item.m2m_data.get(field.name, ())
+            ]
+            through._base_manager.using(self.using).bulk_create(
+                rows, ignore_conflicts=True
+            )
+
+    def reset_sequences(self, connection, models):
+        statements = connection.ops.sequence_reset_sql(no_style(), models)
+        if statements:
+            with connection.cursor() as cursor:
+                for sql in statements:
+                    cursor.execute(sql)
+
+    def rebuild_derived(self, models):
+        """Досчитать то, что при обычном сохранении делают сигналы."""
+        if not {Category, Post, Comment} & set(models):
+            return
+        posts = Post.objects.using(self.using)
+        posts.sync_visibility()
+        posts.reconcile_comment_count()
+        posts.filter(text_html='').render_text(self.batch_size)
+        if search.is_supported(connections[self.using]):
+            search.rebuild(
+                posts, Comment.objects.using(self.using), using=self.using
+            )
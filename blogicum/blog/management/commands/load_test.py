@@ -0,0 +1,196 @@
+import json
+import multiprocessing
+import socket
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import override_settings
+
+from blog import loadtest, seeding, writes
+from blog.caching import separate_caches
+from blog.models import Category, Post
+
+User = get_user_model()
+PASSWORD = 'load-test-password'
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает блог несколькими процессами сервера и клиентов на '
+        'отдельной базе SQLite и выводит пропускную способность, задержки '
+        'и долю ошибок по конечным точкам.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--server', choices=loadtest.SERVERS, default='wsgi',
+            help='WSGI (wsgiref) или ASGI (нужен uvicorn).',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Сколько процессов сервера запустить.',
+        )
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='Сколько потоков в каждом процессе WSGI-сервера.',
+        )
+        parser.add_argument(
+            '--clients', type=int, default=8,
+            help='Сколько процессов-клиентов создают нагрузку.',
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10.0,
+            help='Сколько секунд длится нагрузка.',
+        )
+        parser.add_argument(
+            '--mix', type=loadtest.parse_mix,
+            default=loadtest.parse_mix('read=80,comment=15,post=5'),
+            help='Веса сценариев read, comment и post.',
+        )
+        parser.add_argument(
+            '--posts', type=int, default=300,
+            help='Сколько публикаций сгенерировать перед прогоном.',
+        )
+        parser.add_argument(
+            '--preset',
+            help='Набор прагм SQLite вместо BLOG_SQLITE_PRESETS.',
+        )
+        parser.add_argument(
+            '--write-lock', choices=('settings', 'on', 'off'),
+            default='settings',
+            help='Очередь записи (blog.writes): как в BLOG_WRITE_LOCK, '
+                 'включить или выключить.',
+        )
+        parser.add_argument(
+            '--output', help='Сохранить сводку в JSON.',
+        )
+
+    def handle(self, *args, **options):
+        if 'fork' not in multiprocessing.get_all_start_methods():
+            raise CommandError('Нужна ОС с fork(): Linux или macOS.')
+        if options['server'] == 'asgi':
+            try:
+                import uvicorn  # noqa: F401
+            except ImportError:
+                raise CommandError('Для --server asgi установите uvicorn.')
+        with tempfile.TemporaryDirectory() as directory:
+            with override_settings(**self.get_settings(options, directory)):
+                data = self.prepare(Path(directory), options['posts'])
+                summary = self.run(data, options)
+        self.report(summary, options['duration'])
+        if options['output']:
+            Path(options['output']).write_text(
+                json.dumps(summary, ensure_ascii=False, indent=2)
+            )
+
+    def get_settings(self, options, directory):
+        changed = {
+            'DEBUG': False,
+            'ALLOWED_HOSTS': ['127.0.0.1', 'localhost'],
+            'MEDIA_ROOT': Path(directory) / 'media',
+            'CACHES': separate_caches(directory),
+            'BLOG_READ_REPLICAS': [],
+            'BLOG_TASKS_EAGER': False,
+        }
+        write_lock = settings.BLOG_WRITE_LOCK
+        if options['write_lock'] == 'on':
+            write_lock = write_lock or writes.DEFAULT_OPTIONS
+        elif options['write_lock'] == 'off':
+            write_lock = None
+        if write_lock is not None:
+            write_lock = {**write_lock, 'PATH': Path(directory) / 'db.lock'}
+        changed['BLOG_WRITE_LOCK'] = write_lock
+        if options['preset']:
+            changed['BLOG_SQLITE_PRESETS'] = {'default': options['preset']}
+        return changed
+
+    def prepare(self, directory, posts):
+        """Создать и наполнить отдельную базу; вернуть данные сценариев."""
+        database = connections['default']
+        if database.vendor != 'sqlite':
+            raise CommandError('Нагрузочный прогон рассчитан на SQLite.')
+        database.close()
+        # Все процессы сервера откроют этот файл: они наследуют настройки.
+        database.settings_dict['NAME'] = str(directory / 'load.sqlite3')
+        call_command('migrate', verbosity=0)
+        seeding.seed(posts=posts, comments=posts * 5)
+        User.objects.update(password=make_password(PASSWORD))
+        data = {
+            'posts': list(Post.published.values_list('pk', flat=True)),
+            'categories': list(Category.objects.filter(
+                is_published=True
+            ).values_list('slug', flat=True)),
+            'category_ids': list(Category.objects.filter(
+                is_published=True
+            ).values_list('pk', flat=True)),
+            'usernames': list(User.objects.values_list(
+                'username', flat=True
+            )),
+            'password': PASSWORD,
+            'image': loadtest.sample_image(),
+        }
+        connections.close_all()
+        return data
+
+    def run(self, data, options):
+        context = multiprocessing.get_context('fork')
+        listener = socket.create_server(('127.0.0.1', 0), backlog=1024)
+        base_url = 'http://127.0.0.1:{}'.format(listener.getsockname()[1])
+        workers = [
+            context.Process(
+                target=loadtest.SERVERS[options['server']],
+                args=(listener, options['threads']), daemon=True,
+            )
+            for _ in range(options['workers'])
+        ]
+        for worker in workers:
+            worker.start()
+        queue = context.Queue()
+        deadline = time.monotonic() + options['duration']
+        clients = [
+            context.Process(
+                target=loadtest.run_client,
+                args=(index, base_url, options['mix'], data, deadline,
+                      queue),
+            )
+            for index in range(options['clients'])
+        ]
+        try:
+            for client in clients:
+                client.start()
+            parts = [queue.get() for _ in clients]
+            for client in clients:
+                client.join()
+        finally:
+            for worker in workers:
+                worker.terminate()
+                worker.join()
+            listener.close()
+        return loadtest.summarize(loadtest.merge(parts), options['duration'])
+
+    def report(self, summary, seconds):
+        bounds = ' '.join(f'≤{bound}' for bound in loadtest.BUCKETS)
+        self.stdout.write(
+            f'{"точка":<20} {"запр.":>6} {"в сек":>7} {"p50":>7} {"p95":>7} '
+            f'{"p99":>7} {"ошибки":>7} {"503":>6}  гистограмма, мс: '
+            f'{bounds} >{loadtest.BUCKETS[-1]}'
+        )
+        for endpoint, item in summary.items():
+            self.stdout.write(
+                f'{endpoint:<20} {item["requests"]:>6} {item["rps"]:>7.1f} '
+                f'{item["p50"]:>7.1f} {item["p95"]:>7.1f} '
+                f'{item["p99"]:>7.1f} {item["errors"]:>7.1%} '
+                f'{item["rejected"]:>6.1%}  '
+                + ' '.join(str(count) for count in item['histogram'])
+            )
+        total = sum(item['requests'] for item in summary.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего запросов: {total}, {total / seconds:.1f} в секунду.'
+        ))
@@ -0,0 +1,46 @@
+import time
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.utils.timezone import now
+
+from blog.scheduling import invalidate_published_since
+
+WATERMARK_KEY = 'blog:scheduling:watermark'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сбрасывает кэш лент, в которых наступило время отложенных '
+        'публикаций.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Повторять проверку каждые N секунд (0 — один раз).',
+        )
+        parser.add_argument(
+            '--lookback', type=int, default=3600,
+            help='Сколько секунд назад смотреть при первом запуске.',
+        )
+
+    def handle(self, *args, interval, lookback, **options):
+        while True:
+            self.run_once(lookback)
+            if not interval:
+                break
+            time.sleep(interval)
+
+    def run_once(self, lookback):
+        until = now()
+        since = cache.get(WATERMARK_KEY) or until - timedelta(
+            seconds=lookback
+        )
+        published = invalidate_published_since(since, until)
+        cache.set(WATERMARK_KEY, until, None)
+        if published:
+            self.stdout.write(
+                f'Вышло отложенных публикаций: {published}'
+            )
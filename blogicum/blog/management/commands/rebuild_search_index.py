@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from blog import search
+from blog.models import Comment, Post
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает полнотекстовый индекс публикаций и комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, batch_size, **options):
+        if not search.is_supported():
+            raise CommandError(
+                'Полнотекстовый поиск работает только с SQLite.'
+            )
+        with transaction.atomic():
+            search.rebuild(
+                Post.objects.all(), Comment.objects.all(), batch_size
+            )
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс перестроен.'))
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Сверяет Post.comment_count с фактическим числом комментариев.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько публикаций проверять за одну транзакцию.',
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать расхождения, ничего не исправлять.',
+        )
+
+    def handle(self, *args, batch_size, dry_run, **options):
+        fixed = 0
+        last_pk = 0
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    Post.objects.filter(pk__gt=last_pk)
+                    .order_by('pk')
+                    .with_actual_comment_count()
+                    .values_list('pk', 'comment_count', 'actual_comment_count')
+                    [:batch_size]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1][0]
+                drifted = [
+                    pk for pk, stored, actual in batch if stored != actual
+                ]
+                for pk, stored, actual in batch:
+                    if stored != actual:
+                        self.stdout.write(
+                            f'Публикация {pk}: {stored} -> {actual}'
+                        )
+                if drifted and not dry_run:
+                    Post.objects.filter(
+                        pk__in=drifted
+                    ).reconcile_comment_count()
+                fixed += len(drifted)
+        verb = 'Найдено' if dry_run else 'Исправлено'
+        self.stdout.write(self.style.SUCCESS(f'{verb} расхождений: {fixed}'))
@@ -0,0 +1,61 @@
+import os
+import sqlite3
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from blog.caching import REPLICA_TAG, bump_generation
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновляет SQLite-реплики копией основной базы через backup API.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help='Псевдонимы реплик; по умолчанию BLOG_READ_REPLICAS.',
+        )
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help='Повторять каждые N секунд (0 — один раз).',
+        )
+
+    def handle(self, *args, aliases, interval, **options):
+        aliases = aliases or settings.BLOG_READ_REPLICAS
+        if not aliases:
+            raise CommandError('Не задано ни одной реплики.')
+        source = connections[DEFAULT_DB_ALIAS]
+        if source.vendor != 'sqlite':
+            raise CommandError('Команда копирует только базы SQLite.')
+        while True:
+            for alias in aliases:
+                self.refresh(source, alias)
+            # Страницы и счётчики, прочитанные со старой копии, больше
+            # не отдаются.
+            bump_generation(REPLICA_TAG, 'posts')
+            if not interval:
+                break
+            time.sleep(interval)
+
+    def refresh(self, source, alias):
+        target = Path(connections[alias].settings_dict['NAME'])
+        temp = target.with_name(target.name + '.tmp')
+        source.ensure_connection()
+        destination = sqlite3.connect(temp)
+        try:
+            # backup() даёт согласованный снимок, не блокируя запись
+            # в основную базу дольше, чем на копирование одной порции.
+            source.connection.backup(destination, pages=1024)
+            # Копия без WAL: чужой файл -wal не применится к новой реплике.
+            destination.execute('PRAGMA journal_mode = DELETE')
+        finally:
+            destination.close()
+        # Открытые соединения дочитают старый файл, новые откроют копию.
+        os.replace(temp, target)
+        connections[alias].close()
+        self.stdout.write(f'Реплика {alias} обновлена: {target}')
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from blog.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        'Заново заполняет анонс и HTML текста публикаций, например после '
+        'изменения текста в обход Post.save().'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Сколько публикаций обновлять одним запросом.',
+        )
+        parser.add_argument(
+            '--missing', action='store_true',
+            help='Только публикации, у которых HTML текста ещё не заполнен.',
+        )
+
+    def handle(self, *args, batch_size, missing, **options):
+        posts = Post.objects.all()
+        if missing:
+            posts = posts.filter(text_html='')
+        posts.render_text(batch_size)
+        self.stdout.write(self.style.SUCCESS('Тексты публикаций обновлены.'))
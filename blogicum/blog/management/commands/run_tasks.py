@@ -0,0 +1,67 @@
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from blog.tasks import claim, execute
+
+EXECUTORS = {
+    'thread': ThreadPoolExecutor,
+    'process': ProcessPoolExecutor,
+}
+
+
+def init_process():
+    # Для запуска процессов через spawn Django нужно настроить заново.
+    django.setup()
+
+
+class Command(BaseCommand):
+    help = 'Выполняет задачи фоновой очереди.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Сколько задач выполнять одновременно.',
+        )
+        parser.add_argument(
+            '--executor', choices=EXECUTORS, default='thread',
+            help='Пул потоков или процессов.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Пауза в секундах, когда очередь пуста.',
+        )
+        parser.add_argument(
+            '--once', action='store_true',
+            help='Выполнить задачи, которые пора выполнить, и выйти.',
+        )
+
+    def handle(self, *args, workers, executor, poll_interval, once,
+               **options):
+        options = {'max_workers': workers}
+        if executor == 'process':
+            # Дочерние процессы не должны делить соединение с родителем.
+            connections.close_all()
+            options['initializer'] = init_process
+        counts = {}
+        with EXECUTORS[executor](**options) as pool:
+            try:
+                while True:
+                    claimed = claim(workers * 2)
+                    for status in pool.map(execute, claimed):
+                        counts[status] = counts.get(status, 0) + 1
+                    if once and not claimed:
+                        break
+                    if not claimed:
+                        time.sleep(poll_interval)
+            except KeyboardInterrupt:
+                pass
+        summary = ', '.join(
+            f'{status}: {count}' for status, count in sorted(counts.items())
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Обработано задач — {summary or 0}')
+        )
@@ -0,0 +1,126 @@
+import os
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.utils.timezone import make_aware
+
+from blog import pragmas, seeding
+
+DEFAULT_DUMP = settings.BASE_DIR.parent / 'db.json'
+
+
+def moment(value):
+    parsed = datetime.fromisoformat(value)
+    return make_aware(parsed) if parsed.tzinfo is None else parsed
+
+
+class Command(BaseCommand):
+    help = (
+        'Быстро наполняет базу синтетическими пользователями, категориями, '
+        'местами, публикациями и комментариями. Распределения снимаются с '
+        'дампа, данные зависят только от --seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--posts', type=int, default=10000,
+            help='Сколько публикаций создать; остальное масштабируется.',
+        )
+        for kind in ('users', 'categories', 'locations', 'comments'):
+            parser.add_argument(
+                f'--{kind}', type=int,
+                help='Задать число явно вместо масштабирования по дампу.',
+            )
+        parser.add_argument(
+            '--dump', default=str(DEFAULT_DUMP),
+            help='Дамп-образец для распределений (.json или .json.gz).',
+        )
+        parser.add_argument(
+            '--no-dump', action='store_true',
+            help='Распределения по умолчанию вместо дампа.',
+        )
+        parser.add_argument(
+            '--unpublished', type=float,
+            help='Доля снятых с публикации; по умолчанию как в дампе.',
+        )
+        parser.add_argument(
+            '--scheduled', type=float, default=0.02,
+            help='Доля отложенных публикаций.',
+        )
+        parser.add_argument(
+            '--images', type=float, default=0.0,
+            help='Доля публикаций с картинкой.',
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней до --now распределить публикации.',
+        )
+        parser.add_argument(
+            '--now', type=moment,
+            help='Момент, от которого отсчитываются даты; по умолчанию '
+                 'текущий. Задайте, чтобы повторить базу в точности.',
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Зерно генератора данных.',
+        )
+        parser.add_argument(
+            '--workers', type=int, default=min(4, os.cpu_count() or 1),
+            help='Сколько процессов строят пачки.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=seeding.BATCH_SIZE,
+            help='Сколько объектов вставлять в одной транзакции.',
+        )
+
+    def handle(self, *args, **options):
+        plan = self.get_plan(options)
+        created = dict.fromkeys(seeding.MODELS, 0)
+
+        def progress(kind, count):
+            created[kind] += count
+
+        started = time.perf_counter()
+        connection = connections[seeding.Post.objects.db]
+        with pragmas.bulk_load(connection):
+            seeding.generate(
+                plan, options['workers'], options['batch_size'], progress
+            )
+        elapsed = time.perf_counter() - started
+        for kind, model in seeding.MODELS.items():
+            self.stdout.write(f'{model._meta.label}: {created[kind]}')
+        total = sum(created.values())
+        self.stdout.write(self.style.SUCCESS(
+            f'Создано объектов: {total} за {elapsed:.1f} с '
+            f'({total / elapsed:.0f} в секунду).'
+        ))
+
+    def get_shape(self, options):
+        try:
+            shape = (
+                seeding.Shape() if options['no_dump']
+                else seeding.Shape.from_dump(options['dump'])
+            )
+        except (OSError, ValueError) as error:
+            raise CommandError(f'Не удалось прочитать дамп: {error}')
+        if options['unpublished'] is not None:
+            shape.unpublished = options['unpublished']
+        return shape
+
+    def get_plan(self, options):
+        shape = self.get_shape(options)
+        counts = shape.counts(options['posts'])
+        for kind in counts:
+            if options.get(kind) is not None:
+                counts[kind] = options[kind]
+        try:
+            return seeding.Plan(
+                shape, counts, seed=options['seed'],
+                scheduled=options['scheduled'], images=options['images'],
+                days=options['days'], moment=options['now'],
+            )
+        except ValueError as error:
+            raise CommandError(error)
@@ -1,9 +1,53 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
 from django.db import models
+from django.db.models import (Case, Count, Exists, OuterRef, Q, Subquery,
+                              When)
+from django.db.models.functions import Coalesce
 from django.utils.timezone import now
-from django.db.models import Count
 
+from .loaders import BatchLoadingQuerySet
+
+# Публикации, которые удаляет текущий вызов delete() вместе с
+# комментариями; None — удаления публикаций сейчас нет.
+_deleting_posts = ContextVar('blog_deleting_posts', default=None)
+
+
+@contextmanager
+def post_deletion():
+    """Область удаления публикаций: отметки живут только внутри блока.
+
+    Если удаление упадёт или откатится между pre_delete и post_delete,
+    отметка всё равно снимется и не будет мешать следующим запросам
+    того же потока.
+    """
+    token = _deleting_posts.set(set(_deleting_posts.get() or ()))
+    try:
+        yield
+    finally:
+        _deleting_posts.reset(token)
+
+
+def mark_post_deleting(post_id):
+    posts = _deleting_posts.get()
+    if posts is not None:
+        posts.add(post_id)
+
+
+def is_post_deleting(post_id):
+    posts = _deleting_posts.get()
+    return posts is not None and post_id in posts
+
+
+class PostQuerySet(BatchLoadingQuerySet):
+    def delete(self):
+        with post_deletion():
+            return super().delete()
+
+    delete.alters_data = True
+    delete.queryset_only = True
 
-class PostQuerySet(models.QuerySet):
     def with_related_data(self):
         return self.select_related(
             'author',
@@ -12,23 +56,79 @@ class PostQuerySet(models.QuerySet):
         )
 
     def published(self):
+        # is_visible хранит is_published публикации и её категории,
+        # поэтому лента читается одним индексом без JOIN категории.
         return self.filter(
-            is_published=True,
+            is_visible=True,
             pub_date__lt=now(),
-            category__is_published=True
         )
 
-    def with_comment_count(self):
+    def for_feed(self):
+        """Опубликованные посты с данными карточки, без полного текста."""
+        return self.with_related_data().published().defer('text')
+
+    def visible_to(self, user):
+        """Публикации, которые может открыть user: опубликованные и свои."""
+        queryset = self.published()
+        if user.is_authenticated:
+            queryset |= self.filter(author=user)
+        return queryset
+
+    def sync_visibility(self):
+        """Пересчитать is_visible по флагам публикации и категории."""
+        categories = self.model.category.field.related_model.objects.filter(
+            pk=OuterRef('category_id'), is_published=True
+        )
+        return self.update(is_visible=Case(
+            When(Q(is_published=True) & Exists(categories), then=True),
+            default=False,
+        ))
+
+    def _actual_comment_count(self):
+        comments = (
+            self.model.comments.rel.related_model.objects
+            .filter(post=OuterRef('pk'))
+            .order_by()
+            .values('post')
+            .annotate(count=Count('pk'))
+            .values('count')
+        )
+        return Coalesce(Subquery(comments), 0)
+
+    def with_actual_comment_count(self):
+        """Посчитать комментарии подзапросом, минуя поле comment_count."""
         return self.annotate(
-            comment_count=Count('comments')
+            actual_comment_count=self._actual_comment_count()
         )
 
+    def render_text(self, batch_size=1000):
+        """Заполнить excerpt и text_html по text пачками по batch_size."""
+        posts = self.only('pk', 'text').order_by('pk')
+        last_pk = 0
+        while True:
+            batch = list(posts.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                return
+            for post in batch:
+                post.render_text()
+            self.model._base_manager.using(self.db).bulk_update(
+                batch, ('excerpt', 'text_html')
+            )
+            last_pk = batch[-1].pk
+
+    def reconcile_comment_count(self):
+        """Записать в comment_count фактическое число комментариев."""
+        return self.update(
+            comment_count=self._actual_comment_count(),
+            updated_at=now(),
+        )
+
+
+class CommentQuerySet(BatchLoadingQuerySet):
+    pass
+
 
 class PublishedPostManager(models.Manager):
     def get_queryset(self) -> PostQuerySet:
-        return (
-            PostQuerySet(self.model)
-            .with_related_data()
-            .published()
-            .with_comment_count()
-        )
+        # Карточкам хватает анонса, полный текст из базы не читается.
+        return PostQuerySet(self.model).for_feed()
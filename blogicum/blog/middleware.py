@@ -0,0 +1,145 @@
+import logging
+import time
+from http import HTTPStatus
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.module_loading import import_string
+
+from . import loaders, queries, routers, writes
+from .constants import REPLICA_PIN_SECONDS, WRITE_RETRY_AFTER
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+PIN_SESSION_KEY = 'blog_primary_until'
+
+logger = logging.getLogger('blog.nplusone')
+
+
+class IdentityMapMiddleware:
+    """Даёт каждому запросу свою карту загруженных объектов."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with loaders.identity_map():
+            return self.get_response(request)
+
+
+class ReplicaMiddleware:
+    """Разрешает чтение с реплик представлениям с read_from_replica.
+
+    После успешного изменяющего запроса сессия на REPLICA_PIN_SECONDS
+    закрепляется за основной базой, чтобы автор сразу видел свою
+    публикацию или комментарий, даже если реплика ещё не обновилась.
+    Без реплик сессия не трогается: её сохранение было бы ещё одной
+    записью в SQLite на каждый POST.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = routers.allow_replica_reads(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.reset_replica_reads(token)
+        if self.should_pin(request, response):
+            request.session[PIN_SESSION_KEY] = (
+                time.time() + REPLICA_PIN_SECONDS
+            )
+        return response
+
+    def should_pin(self, request, response):
+        return (
+            request.method not in SAFE_METHODS
+            and response.status_code < HTTPStatus.BAD_REQUEST
+            and bool(routers.replica_aliases())
+            and hasattr(request, 'session')
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'view_class', None)
+        if (request.method in SAFE_METHODS
+                and getattr(view_class, 'read_from_replica', False)
+                and not self.is_pinned(request)):
+            routers.allow_replica_reads()
+
+    def is_pinned(self, request):
+        session = getattr(request, 'session', None)
+        return (
+            session is not None
+            and session.get(PIN_SESSION_KEY, 0) > time.time()
+        )
+
+
+class SerializedWriteMiddleware:
+    """Выполняет представления изменяющих запросов через очередь записи.
+
+    Очередь держится только на время вызова представления: тело запроса
+    к этому моменту уже разобрано CsrfViewMiddleware, а шаблон ответа
+    рисуется после. Поэтому middleware стоит последним в MIDDLEWARE.
+    Если очередь полна или ждать пришлось дольше таймаута, отвечает 503
+    с Retry-After вместо «database is locked».
+    """
+
+    def __init__(self, get_response):
+        if settings.BLOG_WRITE_LOCK is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if request.method in SAFE_METHODS:
+            return None
+        try:
+            with writes.serialized_write():
+                return view_func(request, *view_args, **view_kwargs)
+        except writes.WriteQueueFull:
+            response = import_string(settings.BLOG_WRITE_BUSY_VIEW)(request)
+            response['Retry-After'] = WRITE_RETRY_AFTER
+            return response
+
+
+class NPlusOneMiddleware:
+    """Находит N+1 — одинаковые запросы, повторённые за один запрос.
+
+    Для разработки и стенда. В отчёте — представление, внешний ключ,
+    который загружается лениво, строка шаблона и строки кода. Отчёт
+    пишется в журнал blog.nplusone, а с RAISE выбрасывается
+    NPlusOneError, чтобы на N+1 падали тесты.
+    """
+
+    def __init__(self, get_response):
+        if settings.BLOG_NPLUSONE is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.threshold = settings.BLOG_NPLUSONE['THRESHOLD']
+        self.raise_error = settings.BLOG_NPLUSONE['RAISE']
+
+    def __call__(self, request):
+        recorder = queries.QueryRecorder()
+        with recorder.record():
+            response = self.get_response(request)
+        groups = recorder.repeated(self.threshold)
+        if groups:
+            self.report(request, groups)
+        return response
+
+    def report(self, request, groups):
+        match = request.resolver_match
+        view = (
+            f'{match.view_name} ({match._func_path})' if match
+            else request.path
+        )
+        message = '\n'.join(
+            f'N+1 в {view}: {len(group)} одинаковых запросов.\n'
+            + queries.describe(group[:1])
+            for group in groups
+        )
+        if self.raise_error:
+            raise queries.NPlusOneError(message)
+        logger.warning(message)
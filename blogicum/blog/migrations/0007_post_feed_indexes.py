@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0006_auto_20240921_1952'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['pub_date'], name='post_published_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['category', 'pub_date'], name='post_category_pub_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'pub_date'], name='post_author_pub_date_idx'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:13
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_comment_count(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    comments = (
+        Comment.objects.filter(post=OuterRef('pk'))
+        .order_by()
+        .values('post')
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    Post.objects.update(comment_count=Coalesce(Subquery(comments), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_post_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество комментариев'),
+        ),
+        migrations.RunPython(fill_comment_count, migrations.RunPython.noop),
+    ]
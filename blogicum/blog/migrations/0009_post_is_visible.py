@@ -0,0 +1,34 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:14
+
+from django.db import migrations, models
+
+
+def fill_is_visible(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    Post.objects.filter(
+        is_published=True, category__is_published=True
+    ).update(is_visible=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_post_comment_count'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='post',
+            name='post_published_pub_date_idx',
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='is_visible',
+            field=models.BooleanField(default=False, editable=False, help_text='Публикация и её категория опубликованы; заполняется автоматически.', verbose_name='Видна читателям'),
+        ),
+        migrations.RunPython(fill_is_visible, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(condition=models.Q(('is_visible', True)), fields=['pub_date'], name='post_visible_pub_date_idx'),
+        ),
+    ]
@@ -0,0 +1,79 @@
+import re
+
+import snowballstemmer
+from django.db import migrations
+
+# Копия логики blog.search на момент миграции: код приложения может
+# измениться, а миграция должна строить тот же индекс, что и тогда.
+SEARCH_TABLE = 'blog_search'
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+BATCH_SIZE = 1000
+
+
+def stem_text(stemmer, text):
+    words = WORD_RE.findall((text or '').lower())
+    return ' '.join(stemmer.stemWords(words))
+
+
+def insert_rows(cursor, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            flush(cursor, batch)
+    flush(cursor, batch)
+
+
+def flush(cursor, batch):
+    if batch:
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} '
+            '(rowid, kind, post_id, title, body) VALUES (%s, %s, %s, %s, %s)',
+            batch,
+        )
+        batch.clear()
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    stemmer = snowballstemmer.stemmer('russian')
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+            'kind UNINDEXED, post_id UNINDEXED, title, body, '
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        # Публикации и комментарии делят rowid: чётные и нечётные номера.
+        insert_rows(cursor, (
+            (pk * 2, 'post', pk, stem_text(stemmer, title),
+             stem_text(stemmer, text))
+            for pk, title, text in Post.objects.using(
+                connection.alias
+            ).values_list('pk', 'title', 'text').iterator()
+        ))
+        insert_rows(cursor, (
+            (pk * 2 + 1, 'comment', post_id, '', stem_text(stemmer, text))
+            for pk, post_id, text in Comment.objects.using(
+                connection.alias
+            ).values_list('pk', 'post_id', 'text').iterator()
+        ))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0009_post_is_visible'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
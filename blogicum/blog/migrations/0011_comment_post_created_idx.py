@@ -0,0 +1,17 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0010_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', 'created_at'], name='comment_post_created_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_comment_post_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Версия объекта для ключей кэша фрагментов шаблонов.', verbose_name='Изменено'),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='version',
+            field=models.PositiveIntegerField(default=0, editable=False, help_text='Растёт при каждой правке; входит в ключ кэша фрагмента.', verbose_name='Версия'),
+        ),
+        migrations.AddField(
+            model_name='location',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Версия объекта для ключей кэша фрагментов шаблонов.', verbose_name='Изменено'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, help_text='Версия объекта для ключей кэша фрагментов шаблонов.', verbose_name='Изменено'),
+        ),
+    ]
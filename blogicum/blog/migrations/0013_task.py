@@ -0,0 +1,43 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:31
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0012_fragment_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Task',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=256, verbose_name='Функция')),
+                ('payload', models.JSONField(default=dict, verbose_name='Аргументы')),
+                ('dedup_key', models.CharField(blank=True, help_text='Пока задача с этим ключом не выполнена, такая же задача не ставится повторно.', max_length=256, null=True, verbose_name='Ключ дедупликации')),
+                ('status', models.CharField(choices=[('pending', 'Ожидает'), ('running', 'Выполняется'), ('done', 'Выполнена'), ('failed', 'Ошибка')], default='pending', max_length=16, verbose_name='Состояние')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попыток')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=3, verbose_name='Максимум попыток')),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Выполнить после')),
+                ('locked_until', models.DateTimeField(blank=True, help_text='После этого времени задачу упавшего обработчика заберёт другой.', null=True, verbose_name='Занята до')),
+                ('last_error', models.TextField(blank=True, verbose_name='Последняя ошибка')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Добавлено')),
+            ],
+            options={
+                'verbose_name': 'фоновая задача',
+                'verbose_name_plural': 'Фоновые задачи',
+                'ordering': ('run_after', 'id'),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['status', 'run_after'], name='task_status_run_after_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='task',
+            constraint=models.UniqueConstraint(condition=models.Q(('status__in', ('pending', 'running'))), fields=('dedup_key',), name='task_active_dedup_key'),
+        ),
+    ]
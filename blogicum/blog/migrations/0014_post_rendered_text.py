@@ -0,0 +1,56 @@
+# Generated by Django 3.2.16 on 2026-10-18 20:49
+
+from django.db import migrations, models
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+
+# Копия blog.models.render_post_text на момент миграции.
+EXCERPT_WORDS = 10
+MAX_LENGTH_FIELD = 256
+
+
+def render_post_text(text):
+    excerpt = Truncator(text).words(EXCERPT_WORDS, truncate=' …')
+    return (
+        Truncator(excerpt).chars(MAX_LENGTH_FIELD),
+        linebreaksbr(text, autoescape=True),
+    )
+
+
+def fill_rendered_text(apps, schema_editor):
+    Post = apps.get_model('blog', 'Post')
+    posts = Post.objects.using(schema_editor.connection.alias).only(
+        'pk', 'text'
+    ).order_by('pk')
+    last_pk = 0
+    while True:
+        batch = list(posts.filter(pk__gt=last_pk)[:1000])
+        if not batch:
+            return
+        for post in batch:
+            post.excerpt, post.text_html = render_post_text(post.text)
+        Post.objects.using(schema_editor.connection.alias).bulk_update(
+            batch, ('excerpt', 'text_html')
+        )
+        last_pk = batch[-1].pk
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0013_task'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='excerpt',
+            field=models.CharField(default='', editable=False, help_text='Начало текста для карточки; заполняется автоматически.', max_length=256, verbose_name='Анонс'),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='text_html',
+            field=models.TextField(default='', editable=False, help_text='Текст с переносами строк; заполняется автоматически.', verbose_name='Текст в HTML'),
+        ),
+        migrations.RunPython(fill_rendered_text, migrations.RunPython.noop),
+    ]
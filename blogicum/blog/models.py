@@ -1,12 +1,25 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.template.defaultfilters import linebreaksbr
+from django.utils.text import Truncator
+from django.utils.timezone import now
 
-from .constants import MAX_LENGTH_FIELD
-from .managers import PostQuerySet, PublishedPostManager
+from .constants import EXCERPT_WORDS, MAX_LENGTH_FIELD
+from .managers import (CommentQuerySet, PostQuerySet, PublishedPostManager,
+                       post_deletion)
 
 User = get_user_model()
 
 
+def render_post_text(text):
+    """Анонс и HTML текста так, как их выводили фильтры шаблонов."""
+    excerpt = Truncator(text).words(EXCERPT_WORDS, truncate=' …')
+    return (
+        Truncator(excerpt).chars(MAX_LENGTH_FIELD),
+        linebreaksbr(text, autoescape=True),
+    )
+
+
 class BaseCreated(models.Model):
 
     created_at = models.DateTimeField(
@@ -25,6 +38,11 @@ class BasePublished(BaseCreated):
         default=True,
         help_text='Снимите галочку, чтобы скрыть публикацию.'
     )
+    updated_at = models.DateTimeField(
+        'Изменено',
+        auto_now=True,
+        help_text='Версия объекта для ключей кэша фрагментов шаблонов.'
+    )
 
     class Meta:
         abstract = True
@@ -63,6 +81,19 @@ class Category(BasePublished):
 class Post(BasePublished):
     title = models.CharField('Заголовок', max_length=MAX_LENGTH_FIELD)
     text = models.TextField('Текст')
+    excerpt = models.CharField(
+        'Анонс',
+        max_length=MAX_LENGTH_FIELD,
+        default='',
+        editable=False,
+        help_text='Начало текста для карточки; заполняется автоматически.'
+    )
+    text_html = models.TextField(
+        'Текст в HTML',
+        default='',
+        editable=False,
+        help_text='Текст с переносами строк; заполняется автоматически.'
+    )
     pub_date = models.DateTimeField(
         'Дата и время публикации',
         help_text='Если установить дату и время в будущем — '
@@ -91,6 +122,18 @@ class Post(BasePublished):
         upload_to='post_images',
         blank=True
     )
+    comment_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    is_visible = models.BooleanField(
+        'Видна читателям',
+        default=False,
+        editable=False,
+        help_text='Публикация и её категория опубликованы; '
+                  'заполняется автоматически.'
+    )
 
     objects = PostQuerySet.as_manager()
     published = PublishedPostManager()
@@ -100,10 +143,46 @@ class Post(BasePublished):
         verbose_name = 'публикация'
         verbose_name_plural = 'Публикации'
         ordering = ('-pub_date', )
+        indexes = (
+            models.Index(
+                fields=('pub_date',),
+                condition=models.Q(is_visible=True),
+                name='post_visible_pub_date_idx',
+            ),
+            models.Index(
+                fields=('category', 'pub_date'),
+                name='post_category_pub_date_idx',
+            ),
+            models.Index(
+                fields=('author', 'pub_date'),
+                name='post_author_pub_date_idx',
+            ),
+        )
 
     def __str__(self):
         return self.title
 
+    def render_text(self):
+        self.excerpt, self.text_html = render_post_text(self.text)
+
+    def save(self, *args, **kwargs):
+        self.is_visible = self.is_published and (
+            self.category_id is not None and self.category.is_published
+        )
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = {*update_fields, 'is_visible', 'updated_at'}
+            if 'text' in update_fields:
+                update_fields |= {'excerpt', 'text_html'}
+            kwargs['update_fields'] = update_fields
+        if update_fields is None or 'text' in update_fields:
+            self.render_text()
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with post_deletion():
+            return super().delete(*args, **kwargs)
+
 
 class Comment(BaseCreated):
     author = models.ForeignKey(
@@ -125,11 +204,98 @@ class Comment(BaseCreated):
         auto_now_add=True,
     )
 
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=0,
+        editable=False,
+        help_text='Растёт при каждой правке; входит в ключ кэша фрагмента.'
+    )
+
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         default_related_name = 'comments'
         verbose_name = 'комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('created_at', )
+        indexes = (
+            models.Index(
+                fields=('post', 'created_at'),
+                name='comment_post_created_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            self.version += 1
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            kwargs['update_fields'] = {*update_fields, 'version'}
+        super().save(*args, **kwargs)
+
+
+class Task(models.Model):
+    """Отложенное действие для фоновой очереди (см. blog.tasks)."""
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'Ожидает'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Функция', max_length=MAX_LENGTH_FIELD)
+    payload = models.JSONField('Аргументы', default=dict)
+    dedup_key = models.CharField(
+        'Ключ дедупликации',
+        max_length=MAX_LENGTH_FIELD,
+        null=True,
+        blank=True,
+        help_text='Пока задача с этим ключом не выполнена, '
+                  'такая же задача не ставится повторно.'
+    )
+    status = models.CharField(
+        'Состояние', max_length=16, choices=STATUSES, default=PENDING
+    )
+    attempts = models.PositiveSmallIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveSmallIntegerField(
+        'Максимум попыток', default=3
+    )
+    run_after = models.DateTimeField('Выполнить после', default=now)
+    locked_until = models.DateTimeField(
+        'Занята до',
+        null=True,
+        blank=True,
+        help_text='После этого времени задачу упавшего обработчика '
+                  'заберёт другой.'
+    )
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created_at = models.DateTimeField('Добавлено', auto_now_add=True)
+
+    class Meta:
+        verbose_name = 'фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        ordering = ('run_after', 'id')
+        indexes = (
+            models.Index(
+                fields=('status', 'run_after'),
+                name='task_status_run_after_idx',
+            ),
+        )
+        constraints = (
+            models.UniqueConstraint(
+                fields=('dedup_key',),
+                condition=models.Q(status__in=('pending', 'running')),
+                name='task_active_dedup_key',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.name} ({self.get_status_display()})'
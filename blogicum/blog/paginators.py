@@ -0,0 +1,210 @@
+"""Постраничный вывод публикаций."""
+import base64
+import binascii
+import hashlib
+from datetime import datetime
+
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db.models import Q, QuerySet
+from django.utils.functional import cached_property
+
+from .caching import get_generation
+from .constants import (PAGINATOR_ON_EACH_SIDE, PAGINATOR_ON_ENDS,
+                        POST_COUNT_CACHE_TIMEOUT)
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(direction, key, pk):
+    raw = f'{direction}|{key.isoformat()}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(
+            token + '=' * (-len(token) % 4)
+        ).decode()
+        direction, key, pk = raw.split('|')
+        if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS):
+            raise ValueError(direction)
+        return direction, datetime.fromisoformat(key), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError) as error:
+        raise InvalidCursor('Некорректный курсор страницы.') from error
+
+
+class KeysetPage:
+    """Страница, выбранная по ключу (поле даты, id) без OFFSET."""
+
+    cursor_mode = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return f'<KeysetPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    @property
+    def next_cursor(self):
+        if self._has_next and self.object_list:
+            return self.paginator.cursor(CURSOR_NEXT, self.object_list[-1])
+        return None
+
+    @property
+    def previous_cursor(self):
+        if self._has_previous and self.object_list:
+            return self.paginator.cursor(
+                CURSOR_PREVIOUS, self.object_list[0]
+            )
+        return None
+
+
+class KeysetPaginator:
+    """Курсорная пагинация по паре (key_field, id).
+
+    По умолчанию это лента публикаций в порядке ('-pub_date', '-id').
+    Каждая страница выбирается условием по индексу и LIMIT, поэтому
+    глубокие страницы стоят столько же, сколько первая.
+
+    `seek(condition)` строит выборку с условием курсора; по умолчанию оно
+    добавляется к `object_list` через filter(). Ленты передают свою
+    функцию, которая ставит условие курсора раньше собственных фильтров:
+    SQLite берёт границу диапазона индекса из первого подходящего условия
+    WHERE, и граница `pub_date < now()` из published() заставила бы
+    читать индекс с начала.
+    """
+
+    def __init__(self, object_list, per_page, key_field='pub_date',
+                 descending=True, seek=None):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.key_field = key_field
+        self.descending = descending
+        self.seek = seek or self.object_list.filter
+
+    def cursor(self, direction, obj):
+        return encode_cursor(direction, getattr(obj, self.key_field), obj.pk)
+
+    def _ordering(self, descending):
+        prefix = '-' if descending else ''
+        return f'{prefix}{self.key_field}', f'{prefix}id'
+
+    def _after(self, key, pk, descending):
+        """Объекты, идущие после (key, pk) в порядке `descending`."""
+        lookup = 'lt' if descending else 'gt'
+        field = self.key_field
+        return Q(**{f'{field}__{lookup}e': key}) & (
+            Q(**{f'{field}__{lookup}': key})
+            | Q(**{field: key, f'pk__{lookup}': pk})
+        )
+
+    def page(self, cursor=None):
+        if not cursor:
+            return self._build_page(
+                self.object_list.order_by(*self._ordering(self.descending)),
+                has_next=None, has_previous=False,
+            )
+        direction, key, pk = decode_cursor(cursor)
+        if direction == CURSOR_NEXT:
+            queryset = self.seek(
+                self._after(key, pk, self.descending)
+            ).order_by(*self._ordering(self.descending))
+            return self._build_page(
+                queryset, has_next=None, has_previous=True
+            )
+        queryset = self.seek(
+            self._after(key, pk, not self.descending)
+        ).order_by(*self._ordering(not self.descending))
+        return self._build_page(
+            queryset, has_next=True, has_previous=None, reverse=True
+        )
+
+    def _build_page(self, queryset, has_next, has_previous, reverse=False):
+        objects = list(queryset[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if reverse:
+            objects.reverse()
+        if has_next is None:
+            has_next = has_more
+        if has_previous is None:
+            has_previous = has_more
+        return KeysetPage(objects, self, has_next, has_previous)
+
+
+class WindowedPage(Page):
+    """Страница, которая отдаёт в шаблон только окно номеров страниц."""
+
+    @property
+    def elided_page_range(self):
+        return self.paginator.get_elided_page_range(
+            self.number,
+            on_each_side=PAGINATOR_ON_EACH_SIDE,
+            on_ends=PAGINATOR_ON_ENDS,
+        )
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator, который хранит COUNT(*) ленты в кэше.
+
+    Ключ строится из `count_key` представления (или из SQL запроса) и
+    поколения публикаций, которое сдвигается при изменении Post и
+    Category, поэтому устаревшие значения просто перестают читаться.
+    """
+
+    def __init__(self, *args, count_key=None,
+                 count_timeout=POST_COUNT_CACHE_TIMEOUT, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.count_key = count_key
+        self.count_timeout = count_timeout
+
+    def _get_count_cache_key(self):
+        if self.count_key is None:
+            sql, params = self.object_list.query.sql_with_params()
+            self.count_key = hashlib.md5(
+                f'{sql}{params}'.encode()
+            ).hexdigest()
+        return 'blog:count:{}:{}'.format(
+            get_generation('posts'), self.count_key
+        )
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+        key = self._get_count_cache_key()
+        count = cache.get(key)
+        if count is None:
+            count = self.object_list.order_by().count()
+            cache.set(key, count, self.count_timeout)
+        return count
+
+    def _get_page(self, *args, **kwargs):
+        return WindowedPage(*args, **kwargs)
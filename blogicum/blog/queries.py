@@ -0,0 +1,128 @@
+"""Запись SQL-запросов вместе с местом, откуда они выполнены.
+
+Для каждого запроса запоминаются ближайшие строки кода проекта, узел
+шаблона, который в этот момент рисовался, и внешний ключ, если запрос —
+ленивая загрузка ``post.author``. По этим данным NPlusOneMiddleware
+находит повторяющиеся запросы, а тесты — превышение бюджета запросов.
+"""
+import re
+import sys
+from collections import Counter, namedtuple
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.fields.related_descriptors import (
+    ForwardManyToOneDescriptor, ReverseOneToOneDescriptor)
+
+# Списки IN (%s, ...) разной длины и LIMIT/OFFSET, которые Django
+# подставляет числом, не делают запросы разными.
+NORMALIZE = (
+    (re.compile(r'\(%s(?:, %s)*\)'), '(...)'),
+    (re.compile(r'\b(LIMIT|OFFSET) \d+'), r'\1 ?'),
+)
+STACK_DEPTH = 4
+SQL_PREVIEW = 300
+
+Query = namedtuple('Query', 'sql stack template relation')
+
+
+class NPlusOneError(Exception):
+    """Одинаковые запросы повторяются за время одного запроса к сайту."""
+
+
+def shape(sql):
+    """SQL без различий, которые не меняют сам запрос."""
+    for pattern, replacement in NORMALIZE:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+def template_frame(frame):
+    """Шаблон, строка и тег, если кадр рисует узел шаблона Django."""
+    if frame.f_code.co_name != 'render_annotated':
+        return None
+    node = frame.f_locals.get('self')
+    origin = getattr(node, 'origin', None)
+    token = getattr(node, 'token', None)
+    if origin is None or token is None:
+        return None
+    return f'{origin.template_name}:{token.lineno} ({token.contents})'
+
+
+def relation_frame(frame):
+    """Поле вида ``blog.Post.author``, если кадр — ленивая загрузка."""
+    if frame.f_code.co_name != '__get__':
+        return None
+    descriptor = frame.f_locals.get('self')
+    if isinstance(descriptor, ForwardManyToOneDescriptor):
+        field = descriptor.field
+        return f'{field.model._meta.label}.{field.name}'
+    if isinstance(descriptor, ReverseOneToOneDescriptor):
+        related = descriptor.related
+        return f'{related.model._meta.label}.{related.get_accessor_name()}'
+    return None
+
+
+def inspect_stack(frame):
+    """Строки проекта, ближайший узел шаблона и загружаемый ключ."""
+    project = str(settings.BASE_DIR)
+    stack = []
+    template = relation = None
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if filename.startswith(project) and filename != __file__:
+            if len(stack) < STACK_DEPTH:
+                stack.append(
+                    f'{Path(filename).relative_to(project)}:'
+                    f'{frame.f_lineno} в {frame.f_code.co_name}'
+                )
+        elif template is None:
+            template = template_frame(frame)
+        if relation is None:
+            relation = relation_frame(frame)
+        frame = frame.f_back
+    return stack, template, relation
+
+
+class QueryRecorder:
+    """Обёртка execute: запрос и его происхождение для каждого вызова."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        self.queries.append(Query(sql, *inspect_stack(sys._getframe(1))))
+        return execute(sql, params, many, context)
+
+    @contextmanager
+    def record(self):
+        """Записывать запросы ко всем базам, включая реплики."""
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(self))
+            yield self
+
+    def shapes(self):
+        return Counter(shape(query.sql) for query in self.queries)
+
+    def repeated(self, threshold):
+        """Группы запросов одной формы, которых не меньше `threshold`."""
+        groups = {}
+        for query in self.queries:
+            groups.setdefault(shape(query.sql), []).append(query)
+        return [group for group in groups.values() if len(group) >= threshold]
+
+
+def describe(queries):
+    lines = []
+    for number, query in enumerate(queries, 1):
+        lines.append(f'{number}. {query.sql[:SQL_PREVIEW]}')
+        origin = [
+            *([f'поле {query.relation}'] if query.relation else []),
+            *([query.template] if query.template else []),
+            *query.stack,
+        ]
+        lines.extend(f'     ← {line}' for line in origin or ['(вне проекта)'])
+    return '\n'.join(lines)
@@ -0,0 +1,176 @@
+"""Уменьшенные копии картинок публикаций с дисковым кэшем.
+
+Копия строится Pillow при первом запросе и кладётся в
+``MEDIA_ROOT/renditions``. Имя файла — хэш пути, размера и времени
+изменения оригинала, поэтому заменённая картинка получает новую копию.
+Общий размер каталога ограничен: при переполнении удаляются копии,
+которые дольше всего не запрашивались. Размер ведётся счётчиком в общем
+кэше, а каталог обходится, только когда счётчик превысит предел; тогда
+удаляется запас до RENDITION_CACHE_EVICT_TO, чтобы обход не повторялся
+на каждой новой копии.
+"""
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.core.cache import cache
+from django.urls import reverse
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from .constants import (RENDITION_CACHE_EVICT_TO, RENDITION_CACHE_MAX_BYTES,
+                        RENDITION_QUALITY, RENDITION_SIZES)
+
+RENDITIONS_DIR = 'renditions'
+SIZE_KEY = 'renditions:bytes'
+FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+}
+
+
+class RenditionError(Exception):
+    pass
+
+
+def cache_root():
+    return Path(settings.MEDIA_ROOT) / RENDITIONS_DIR
+
+
+def negotiate_format(accept):
+    return 'webp' if 'image/webp' in (accept or '') else 'jpeg'
+
+
+def source_path(name):
+    root = Path(settings.MEDIA_ROOT).resolve()
+    path = (root / name).resolve()
+    if root not in path.parents or cache_root().resolve() in path.parents:
+        raise RenditionError(f'Недопустимый путь: {name}')
+    if not path.is_file():
+        raise RenditionError(f'Файл не найден: {name}')
+    return path
+
+
+def get_rendition(name, width, height, image_format):
+    """Вернуть путь к копии картинки `name`, построив её при необходимости."""
+    if (width, height) not in RENDITION_SIZES:
+        raise RenditionError(f'Размер {width}x{height} не поддерживается')
+    source = source_path(name)
+    stat = source.stat()
+    key = hashlib.sha1(
+        f'{name}:{stat.st_size}:{stat.st_mtime_ns}:'
+        f'{width}x{height}:{image_format}'.encode()
+    ).hexdigest()
+    path = cache_root() / key[:2] / f'{key}.{image_format}'
+    try:
+        # Время изменения служит отметкой последнего обращения для LRU.
+        os.utime(path)
+        return path
+    except FileNotFoundError:
+        # Копии ещё нет или её только что удалил evict() соседнего запроса.
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    try:
+        render(source, path, width, height, image_format)
+    except UnidentifiedImageError as error:
+        raise RenditionError(f'Не удалось прочитать {name}') from error
+    if add_cache_size(path.stat().st_size) > RENDITION_CACHE_MAX_BYTES:
+        evict(RENDITION_CACHE_EVICT_TO)
+    return path
+
+
+def open_rendition(name, width, height, image_format):
+    """Открыть копию картинки для отдачи, построив её при необходимости.
+
+    Между get_rendition() и открытием копию может удалить evict() из
+    соседнего запроса; тогда она строится заново.
+    """
+    for _ in range(2):
+        path = get_rendition(name, width, height, image_format)
+        try:
+            return open(path, 'rb')
+        except FileNotFoundError:
+            continue
+    raise RenditionError(f'Копия {name} удалена во время отдачи')
+
+
+def render(source, path, width, height, image_format):
+    pil_format, _ = FORMATS[image_format]
+    with Image.open(source) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((width, height or width * 10))
+        if image.mode not in ('RGB', 'RGBA') or pil_format == 'JPEG':
+            image = image.convert('RGB')
+        # Пишем во временный файл и переименовываем, чтобы параллельный
+        # запрос не отдал недописанную копию.
+        descriptor, temp_name = tempfile.mkstemp(dir=path.parent)
+        try:
+            with os.fdopen(descriptor, 'wb') as temp_file:
+                image.save(
+                    temp_file, pil_format, quality=RENDITION_QUALITY
+                )
+            os.replace(temp_name, path)
+        except BaseException:
+            os.unlink(temp_name)
+            raise
+
+
+def add_cache_size(size):
+    """Прибавить `size` к счётчику размера кэша и вернуть новое значение.
+
+    Счётчик приблизителен: копии, удалённые вручную или записанные
+    параллельно, он учтёт при следующем обходе в evict().
+    """
+    try:
+        return cache.incr(SIZE_KEY, size)
+    except ValueError:
+        # Счётчика нет в кэше: считаем размер каталога заново.
+        total = sum(entry_size for _, entry_size, _ in scan())
+        cache.set(SIZE_KEY, total, None)
+        return total
+
+
+def scan():
+    """Пары (время обращения, размер, путь) всех копий в кэше."""
+    entries = []
+    root = cache_root()
+    if not root.is_dir():
+        return entries
+    for directory in root.iterdir():
+        for entry in os.scandir(directory):
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return entries
+
+
+def evict(max_bytes):
+    """Удалить давно не запрошенные копии, пока кэш больше `max_bytes`."""
+    entries = scan()
+    total = sum(size for _, size, _ in entries)
+    if total > max_bytes:
+        for _, size, path in sorted(entries):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                continue
+            total -= size
+            if total <= max_bytes:
+                break
+    cache.set(SIZE_KEY, total, None)
+
+
+def srcset(name):
+    """Значение атрибута srcset для всех поддерживаемых ширин картинки."""
+    return ', '.join(
+        '{} {}w'.format(
+            reverse('blog:image_rendition', kwargs={
+                'width': width, 'height': height, 'path': name
+            }),
+            width,
+        )
+        for width, height in RENDITION_SIZES
+    )
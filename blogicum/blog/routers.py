@@ -0,0 +1,49 @@
+"""Чтение лент с реплик базы данных.
+
+Маршрутизатор отправляет запросы на чтение в реплику, только когда это
+разрешило текущее представление (см. ReplicaMiddleware); всё остальное,
+включая любые записи, идёт в основную базу.
+"""
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_replica_reads = ContextVar('blog_replica_reads', default=False)
+
+
+def allow_replica_reads(allowed=True):
+    """Разрешить чтение с реплик до reset_replica_reads(token)."""
+    return _replica_reads.set(allowed)
+
+
+def reset_replica_reads(token):
+    _replica_reads.reset(token)
+
+
+def replica_aliases():
+    return settings.BLOG_READ_REPLICAS
+
+
+def reads_from_replica():
+    """Читает ли текущий запрос с реплик."""
+    return bool(replica_aliases()) and _replica_reads.get()
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        if reads_from_replica():
+            return random.choice(replica_aliases())
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии основной базы, объекты из них совместимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in replica_aliases()
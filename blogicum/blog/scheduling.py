@@ -0,0 +1,84 @@
+"""Границы отложенных публикаций для расчёта времени жизни кэша."""
+import math
+
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.timezone import now
+
+from .caching import bump_generation, get_generation, post_tags
+from .models import Post
+
+NEXT_PUBLICATION_KEY = 'blog:next-publication:{}:{}'
+NO_PUBLICATION = 'none'
+
+
+def scope_tag(category_id=None, author_id=None):
+    if category_id is not None:
+        return f'category:{category_id}'
+    if author_id is not None:
+        return f'author:{author_id}'
+    return 'feed'
+
+
+def next_publication(category_id=None, author_id=None):
+    """Время ближайшей отложенной публикации ленты или None.
+
+    Ответ хранится в кэше до самой границы и привязан к поколению тега
+    ленты, поэтому новая или перенесённая публикация сбрасывает его.
+    Граница читается из основной базы: реплика могла ещё не получить
+    публикацию, сдвинувшую поколение.
+    """
+    tag = scope_tag(category_id, author_id)
+    key = NEXT_PUBLICATION_KEY.format(get_generation(tag), tag)
+    current = now()
+    boundary = cache.get(key)
+    if boundary == NO_PUBLICATION:
+        return None
+    if boundary is not None and boundary > current:
+        return boundary
+    posts = Post.objects.using(DEFAULT_DB_ALIAS).filter(
+        is_visible=True, pub_date__gte=current
+    )
+    if category_id is not None:
+        posts = posts.filter(category_id=category_id)
+    if author_id is not None:
+        posts = posts.filter(author_id=author_id)
+    boundary = (
+        posts.order_by('pub_date').values_list('pub_date', flat=True).first()
+    )
+    if boundary is None:
+        cache.set(key, NO_PUBLICATION, None)
+    else:
+        cache.set(key, boundary, seconds_until(boundary))
+    return boundary
+
+
+def seconds_until(moment):
+    return max(1, math.ceil((moment - now()).total_seconds()))
+
+
+def publication_ttl(timeout, scope):
+    """Сократить `timeout`, чтобы кэш ленты истёк к ближайшей публикации."""
+    if scope is None:
+        return timeout
+    boundary = next_publication(**scope)
+    if boundary is None:
+        return timeout
+    return min(timeout, seconds_until(boundary))
+
+
+def invalidate_published_since(since, until=None):
+    """Сбросить кэш лент, в которых с `since` вышли отложенные публикации.
+
+    Возвращает число вышедших публикаций.
+    """
+    until = until or now()
+    posts = Post.objects.filter(
+        is_visible=True, pub_date__gte=since, pub_date__lt=until
+    ).only('pk', 'author_id', 'category_id', 'location_id')
+    tags = set()
+    for post in posts:
+        tags |= post_tags(post)
+    if tags:
+        bump_generation('posts', 'feed', *tags)
+    return len(posts)
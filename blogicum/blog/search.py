@@ -0,0 +1,210 @@
+"""Полнотекстовый поиск по публикациям и комментариям.
+
+Индекс — виртуальная таблица SQLite FTS5. В неё пишутся уже
+нормализованные основы слов (стеммер Snowball для русского языка), и
+запрос приводится к тем же основам, поэтому «путешествия» находит
+«путешествие».
+"""
+import re
+from functools import lru_cache
+
+import snowballstemmer
+from django.db import (DEFAULT_DB_ALIAS, connection, connections,
+                       transaction)
+from django.db.models.expressions import RawSQL
+from django.utils.timezone import now
+
+from .models import Post
+
+SEARCH_TABLE = 'blog_search'
+POST_KIND = 'post'
+COMMENT_KIND = 'comment'
+# Веса bm25 по колонкам: kind, post_id, title, body.
+RANK = 'bm25(0, 0, 10.0, 1.0)'
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+# Словарь текстов много меньше их объёма: основа слова считается один раз.
+STEM_CACHE_SIZE = 100000
+stemmer = snowballstemmer.stemmer('russian')
+stem_word = lru_cache(maxsize=STEM_CACHE_SIZE)(stemmer.stemWord)
+
+
+def is_supported(using=connection):
+    return using.vendor == 'sqlite'
+
+
+def stem_text(text):
+    words = WORD_RE.findall((text or '').lower())
+    return ' '.join(map(stem_word, words))
+
+
+def build_match(query):
+    """Собрать выражение MATCH, в котором каждое слово взято в кавычки."""
+    stems = stem_text(query).split()
+    return ' '.join(f'"{stem}"' for stem in stems)
+
+
+def create_table(using=DEFAULT_DB_ALIAS):
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5('
+            'kind UNINDEXED, post_id UNINDEXED, title, body, '
+            "tokenize = 'unicode61 remove_diacritics 2')"
+        )
+
+
+def _rowid(kind, pk):
+    # Публикации и комментарии делят rowid: чётные и нечётные номера.
+    return pk * 2 + (kind == COMMENT_KIND)
+
+
+def index_document(kind, pk, post_id, title, body):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT OR REPLACE INTO {SEARCH_TABLE} '
+            '(rowid, kind, post_id, title, body) VALUES (%s, %s, %s, %s, %s)',
+            [_rowid(kind, pk), kind, post_id, stem_text(title),
+             stem_text(body)],
+        )
+
+
+def remove_document(kind, pk):
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+            [_rowid(kind, pk)],
+        )
+
+
+def remove_documents(kind, pks):
+    """Удалить из индекса сразу много документов одного вида."""
+    if not is_supported():
+        return
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f'DELETE FROM {SEARCH_TABLE} WHERE rowid = %s',
+            [(_rowid(kind, pk),) for pk in pks],
+        )
+
+
+def index_post(post):
+    index_document(POST_KIND, post.pk, post.pk, post.title, post.text)
+
+
+def index_comment(comment):
+    index_document(
+        COMMENT_KIND, comment.pk, comment.post_id, '', comment.text
+    )
+
+
+def rebuild(posts, comments, batch_size=1000, using=DEFAULT_DB_ALIAS):
+    """Перестроить индекс базы `using` по публикациям и комментариям.
+
+    Всё в одной транзакции: поиск не видит наполовину пустой индекс, а
+    FTS5 не сбрасывает сегмент на диск после каждой строки.
+    """
+    with transaction.atomic(using=using):
+        create_table(using)
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'DELETE FROM {SEARCH_TABLE}')
+        rows = (
+            (_rowid(POST_KIND, pk), POST_KIND, pk, stem_text(title),
+             stem_text(text))
+            for pk, title, text in posts.values_list('pk', 'title', 'text')
+            .iterator(chunk_size=batch_size)
+        )
+        _insert_rows(using, rows, batch_size)
+        rows = (
+            (_rowid(COMMENT_KIND, pk), COMMENT_KIND, post_id, '',
+             stem_text(text))
+            for pk, post_id, text in comments.values_list(
+                'pk', 'post_id', 'text'
+            ).iterator(chunk_size=batch_size)
+        )
+        _insert_rows(using, rows, batch_size)
+
+
+def _insert_rows(using, rows, batch_size):
+    batch = []
+    with connections[using].cursor() as cursor:
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_size:
+                _flush(cursor, batch)
+        _flush(cursor, batch)
+
+
+def _flush(cursor, batch):
+    if batch:
+        cursor.executemany(
+            f'INSERT INTO {SEARCH_TABLE} '
+            '(rowid, kind, post_id, title, body) VALUES (%s, %s, %s, %s, %s)',
+            batch,
+        )
+        batch.clear()
+
+
+def matching_post_ids(query):
+    """Подзапрос с id публикаций, подходящих под `query` (для filter)."""
+    return RawSQL(
+        f'SELECT post_id FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s',
+        [build_match(query)],
+    )
+
+
+class SearchResults:
+    """Ленивая выборка опубликованных постов в порядке релевантности.
+
+    Поддерживает count() и срезы, поэтому её можно отдать Paginator:
+    каждая страница — один запрос к индексу с LIMIT/OFFSET и один
+    запрос за самими публикациями.
+    """
+
+    def __init__(self, query):
+        self.match = build_match(query)
+        self.moment = connection.ops.adapt_datetimefield_value(now())
+
+    def _from(self):
+        # bm25() нельзя вызвать внутри агрегата, поэтому ранг берётся из
+        # скрытой колонки rank, а публикация получает лучший из рангов.
+        return (
+            f'FROM (SELECT post_id, rank FROM {SEARCH_TABLE} '
+            f"WHERE {SEARCH_TABLE} MATCH %s AND rank MATCH '{RANK}') "
+            'AS matches '
+            'INNER JOIN blog_post ON blog_post.id = matches.post_id '
+            'WHERE blog_post.is_visible AND blog_post.pub_date < %s'
+        )
+
+    def count(self):
+        if not self.match:
+            return 0
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(DISTINCT post_id) {self._from()}',
+                [self.match, self.moment],
+            )
+            return cursor.fetchone()[0]
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            return self[index:index + 1][0]
+        if not self.match:
+            return []
+        start = index.start or 0
+        limit = (index.stop - start) if index.stop is not None else -1
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT post_id {self._from()} GROUP BY post_id '
+                'ORDER BY MIN(rank), post_id LIMIT %s OFFSET %s',
+                [self.match, self.moment, limit, start],
+            )
+            post_ids = [row[0] for row in cursor.fetchall()]
+        posts = Post.published.in_bulk(post_ids)
+        return [posts[pk] for pk in post_ids if pk in posts]
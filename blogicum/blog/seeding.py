@@ -0,0 +1,564 @@
+"""Наполнение базы правдоподобными данными для замеров.
+
+Объекты создаются пачками executemany с заранее известными ключами, и
+каждый объект строится своим генератором случайных чисел от `seed`,
+вида и номера объекта. Поэтому пачки можно строить параллельно в
+нескольких процессах, а два прогона на одинаковых параметрах дают одну
+и ту же базу и сравнимые замеры при любом числе процессов и размере
+пачки.
+
+Распределения — перекос авторов, категорий и мест, длины заголовков и
+текстов, словарь — задаёт `Shape`; `Shape.from_dump` снимает их с
+дампа, например с db.json.
+"""
+import math
+import multiprocessing
+import random
+import re
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+from functools import lru_cache
+from io import BytesIO
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management.color import no_style
+from django.db import connections, transaction
+from django.utils.timezone import localtime, now
+from PIL import Image
+
+from . import search
+from .caching import bump_generation
+from .constants import MAX_LENGTH_FIELD
+from .dumps import iter_fixture, open_dump
+from .models import Category, Comment, Location, Post, render_post_text
+
+User = get_user_model()
+
+WORDS = (
+    'путешествие', 'город', 'море', 'горы', 'дорога', 'утро', 'вечер',
+    'кофе', 'книга', 'поезд', 'река', 'лес', 'музей', 'улица', 'друг',
+    'зима', 'лето', 'осень', 'весна', 'солнце', 'дождь', 'мост', 'парк',
+    'история', 'фотография', 'прогулка', 'рынок', 'вокзал', 'площадь',
+    'берег', 'ветер', 'небо', 'озеро', 'остров', 'дом', 'окно',
+)
+USERNAME_PREFIX = 'seed'
+BATCH_SIZE = 2000
+WORD_RE = re.compile(r'[^\W\d_]+')
+SENTENCE_END_RE = re.compile(r'[.!?…]+')
+VOCABULARY_SIZE = 2000
+# По нескольким десяткам строк образца крутизна перекоса переоценивается:
+# у автора-лидера оказывается треть всех публикаций.
+MAX_SKEW = 1.2
+# Днём и вечером пишут чаще, чем ночью.
+HOUR_WEIGHTS = (
+    1, 1, 1, 1, 1, 1, 2, 3, 4, 5, 5, 5, 6, 5, 5, 5, 5, 6, 7, 8, 8, 6, 4, 2,
+)
+SCHEDULE_DAYS = 30
+IMAGE_VARIANTS = 8
+IMAGE_SIZE = (1200, 800)
+# Множитель перестановки рангов в ключи: популярные авторы и публикации
+# не идут подряд по pk.
+SCATTER = 2654435761
+# Вид объектов и модель в порядке создания: ссылки идут на уже
+# созданные строки.
+MODELS = {
+    'users': User,
+    'categories': Category,
+    'locations': Location,
+    'posts': Post,
+    'comments': Comment,
+}
+
+
+def last_pk(model):
+    return model.objects.order_by('-pk').values_list(
+        'pk', flat=True
+    ).first() or 0
+
+
+def share(part, whole):
+    return part / whole if whole else 0.0
+
+
+def zipf_exponent(counts, default=1.0):
+    """Показатель закона Ципфа: наклон log(частоты) от log(ранга)."""
+    values = sorted((count for count in counts if count), reverse=True)
+    if len(values) < 2:
+        return default
+    xs = [math.log(rank) for rank in range(1, len(values) + 1)]
+    ys = [math.log(value) for value in values]
+    mean_x, mean_y = sum(xs) / len(xs), sum(ys) / len(ys)
+    slope = sum(
+        (x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)
+    ) / sum((x - mean_x) ** 2 for x in xs)
+    return min(MAX_SKEW, max(0.0, -slope))
+
+
+def zipf_index(rng, count, exponent):
+    """Номер от 0 до count - 1; меньшие номера выпадают чаще."""
+    top = count + 1
+    if abs(exponent - 1) < 1e-9:
+        rank = top ** rng.random()
+    else:
+        power = 1 - exponent
+        rank = (1 + rng.random() * (top ** power - 1)) ** (1 / power)
+    return min(count - 1, int(rank) - 1)
+
+
+@lru_cache(maxsize=None)
+def scatter_multiplier(count):
+    multiplier = SCATTER % count or 1
+    while math.gcd(multiplier, count) != 1:
+        multiplier += 1
+    return multiplier
+
+
+def scatter(index, count):
+    """Перестановка номеров 0..count - 1."""
+    return index * scatter_multiplier(count) % count
+
+
+class Shape:
+    """Распределения синтетических данных.
+
+    Перекосы — показатели закона Ципфа для числа публикаций у автора,
+    категории и места и числа комментариев у публикации в зависимости
+    от ранга. Длины берутся из образца с разбросом ±25%.
+    """
+
+    def __init__(self, sample_posts=300, sample_users=20,
+                 sample_categories=5, sample_locations=10,
+                 comments_per_post=5.0, author_skew=1.0, category_skew=1.0,
+                 location_skew=1.0, comment_skew=1.0, no_location=0.3,
+                 unpublished=0.05, hidden_categories=0.1,
+                 hidden_locations=0.0, title_lengths=(10, 20, 30, 45),
+                 text_lengths=(80, 200, 400, 800, 1600),
+                 comment_lengths=(20, 60, 120, 250), paragraph_break=0.3,
+                 words=WORDS, word_weights=None):
+        self.sample_posts = sample_posts
+        self.sample_users = sample_users
+        self.sample_categories = sample_categories
+        self.sample_locations = sample_locations
+        self.comments_per_post = comments_per_post
+        self.author_skew = author_skew
+        self.category_skew = category_skew
+        self.location_skew = location_skew
+        self.comment_skew = comment_skew
+        self.no_location = no_location
+        self.unpublished = unpublished
+        self.hidden_categories = hidden_categories
+        self.hidden_locations = hidden_locations
+        self.title_lengths = tuple(title_lengths)
+        self.text_lengths = tuple(text_lengths)
+        self.comment_lengths = tuple(comment_lengths)
+        self.paragraph_break = paragraph_break
+        self.words = tuple(words)
+        self.word_weights = tuple(word_weights or [1] * len(self.words))
+
+    @classmethod
+    def from_dump(cls, path):
+        sample = DumpSample()
+        with open_dump(path) as stream:
+            for obj in iter_fixture(stream):
+                sample.add(obj)
+        return sample.shape()
+
+    def counts(self, posts):
+        """Сколько объектов каждого вида создать для `posts` публикаций.
+
+        Пользователей на публикацию столько же, сколько в образце;
+        категорий и мест становится больше медленнее — как корень из
+        роста числа публикаций.
+        """
+        growth = share(posts, self.sample_posts)
+        return {
+            'users': max(1, round(self.sample_users * growth)),
+            'categories': max(
+                1, round(self.sample_categories * math.sqrt(growth))
+            ),
+            'locations': max(
+                1, round(self.sample_locations * math.sqrt(growth))
+            ),
+            'posts': posts,
+            'comments': round(posts * self.comments_per_post),
+        }
+
+
+class DumpSample:
+    """Счётчики дампа, по которым строится Shape."""
+
+    def __init__(self):
+        self.counts = Counter()
+        self.hidden = Counter()
+        self.posts_by = {
+            'author': Counter(), 'category': Counter(), 'location': Counter(),
+        }
+        self.comments_by_post = Counter()
+        self.lengths = {'title': [], 'text': [], 'comment': []}
+        self.words = Counter()
+        self.no_location = 0
+        self.sentences = 0
+        self.breaks = 0
+
+    def add(self, obj):
+        model = obj.get('model', '').lower()
+        fields = obj.get('fields', {})
+        self.counts[model] += 1
+        if not fields.get('is_published', True):
+            self.hidden[model] += 1
+        if model == 'blog.post':
+            self.add_post(fields)
+        elif model == 'blog.comment':
+            self.comments_by_post[fields['post']] += 1
+            self.add_text('comment', fields['text'])
+
+    def add_post(self, fields):
+        for name, counter in self.posts_by.items():
+            if fields.get(name) is not None:
+                counter[fields[name]] += 1
+        self.no_location += fields.get('location') is None
+        self.lengths['title'].append(len(fields['title']))
+        self.words.update(WORD_RE.findall(fields['title'].lower()))
+        self.add_text('text', fields['text'])
+
+    def add_text(self, kind, text):
+        self.lengths[kind].append(len(text))
+        self.words.update(WORD_RE.findall(text.lower()))
+        self.sentences += max(1, len(SENTENCE_END_RE.findall(text)))
+        self.breaks += text.count('\n')
+
+    def shape(self):
+        """Shape по образцу; чего в дампе нет, берётся по умолчанию."""
+        posts = self.counts['blog.post']
+        if not posts:
+            raise ValueError('В дампе нет публикаций.')
+        default = Shape()
+        comments = self.counts['blog.comment']
+        words = self.words.most_common(VOCABULARY_SIZE)
+        return Shape(
+            sample_posts=posts,
+            sample_users=max(1, self.counts['auth.user']),
+            sample_categories=max(1, self.counts['blog.category']),
+            sample_locations=max(1, self.counts['blog.location']),
+            comments_per_post=(
+                share(comments, posts) if comments
+                else default.comments_per_post
+            ),
+            author_skew=zipf_exponent(self.posts_by['author'].values()),
+            category_skew=zipf_exponent(self.posts_by['category'].values()),
+            location_skew=zipf_exponent(self.posts_by['location'].values()),
+            comment_skew=zipf_exponent(self.comments_by_post.values()),
+            no_location=share(self.no_location, posts),
+            unpublished=share(self.hidden['blog.post'], posts),
+            hidden_categories=share(
+                self.hidden['blog.category'], self.counts['blog.category']
+            ),
+            hidden_locations=share(
+                self.hidden['blog.location'], self.counts['blog.location']
+            ),
+            title_lengths=self.lengths['title'],
+            text_lengths=self.lengths['text'],
+            comment_lengths=(
+                self.lengths['comment'] or default.comment_lengths
+            ),
+            paragraph_break=share(self.breaks, self.sentences),
+            words=[word for word, _ in words] or default.words,
+            word_weights=[count for _, count in words] or None,
+        )
+
+
+class Plan:
+    """Сколько объектов создать, с каких ключей и в какой период."""
+
+    def __init__(self, shape, counts, seed=0, scheduled=0.02, images=0.0,
+                 days=365, moment=None):
+        if counts['posts'] and not (counts['users'] and counts['categories']):
+            raise ValueError('Публикациям нужны пользователи и категории.')
+        self.shape = shape
+        self.counts = dict(counts)
+        if not self.counts['posts']:
+            self.counts['comments'] = 0
+        self.seed = seed
+        self.scheduled = scheduled
+        self.image_share = images
+        self.images = []
+        self.days = days
+        self.moment = moment or now()
+        self.password = f'{UNUSABLE_PASSWORD_PREFIX}{USERNAME_PREFIX}{seed}'
+        self.first = {
+            kind: last_pk(model) + 1 for kind, model in MODELS.items()
+        }
+        self.cum_weights = list(accumulate(shape.word_weights))
+
+    def pick(self, rng, kind, exponent):
+        """Ключ объекта вида `kind` с перекосом `exponent`."""
+        count = self.counts[kind]
+        if not count:
+            return None
+        return self.first[kind] + scatter(
+            zipf_index(rng, count, exponent), count
+        )
+
+    def text(self, rng, lengths, sentences=True):
+        size = max(1, round(rng.choice(lengths) * rng.uniform(0.75, 1.25)))
+        parts = []
+        length = 0
+        while length < size:
+            words = rng.choices(
+                self.shape.words, cum_weights=self.cum_weights,
+                k=rng.randint(4, 12) if sentences else 1,
+            )
+            part = ' '.join(words)
+            if sentences:
+                part = part.capitalize() + '.'
+            if parts:
+                paragraph = (
+                    sentences and rng.random() < self.shape.paragraph_break
+                )
+                parts.append('\n' if paragraph else ' ')
+            parts.append(part)
+            length += len(part) + 1
+        text = ''.join(parts)
+        return text if sentences else text.capitalize()
+
+    def title(self, rng):
+        return self.text(
+            rng, self.shape.title_lengths, sentences=False
+        )[:MAX_LENGTH_FIELD]
+
+    def pub_date(self, rng):
+        """Свежих публикаций больше, чем старых: блог растёт."""
+        if rng.random() < self.scheduled:
+            return self.moment + timedelta(
+                days=rng.uniform(0, SCHEDULE_DAYS)
+            )
+        day = int(self.days * (1 - math.sqrt(rng.random())))
+        midnight = localtime(self.moment).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        moment = midnight - timedelta(days=day) + timedelta(
+            hours=rng.choices(range(24), HOUR_WEIGHTS)[0],
+            minutes=rng.randrange(60),
+        )
+        return moment if moment < self.moment else moment - timedelta(days=1)
+
+    def image(self, rng):
+        if self.images and rng.random() < self.image_share:
+            return rng.choice(self.images)
+        return ''
+
+
+def build_user(plan, rng, pk):
+    return User(
+        pk=pk, username=f'{USERNAME_PREFIX}{plan.seed}-{pk:06d}',
+        password=plan.password,
+    )
+
+
+def build_category(plan, rng, pk):
+    return Category(
+        pk=pk,
+        title=plan.title(rng),
+        description=plan.text(rng, plan.shape.comment_lengths),
+        slug=f'{USERNAME_PREFIX}{plan.seed}-{pk}',
+        # Первая категория всегда опубликована: лента не пуста.
+        is_published=(
+            pk == plan.first['categories']
+            or rng.random() >= plan.shape.hidden_categories
+        ),
+    )
+
+
+def build_location(plan, rng, pk):
+    return Location(
+        pk=pk, name=plan.title(rng),
+        is_published=rng.random() >= plan.shape.hidden_locations,
+    )
+
+
+def build_post(plan, rng, pk):
+    shape = plan.shape
+    text = plan.text(rng, shape.text_lengths)
+    excerpt, text_html = render_post_text(text)
+    return Post(
+        pk=pk,
+        title=plan.title(rng),
+        text=text,
+        excerpt=excerpt,
+        text_html=text_html,
+        author_id=plan.pick(rng, 'users', shape.author_skew),
+        category_id=plan.pick(rng, 'categories', shape.category_skew),
+        location_id=(
+            None if rng.random() < shape.no_location
+            else plan.pick(rng, 'locations', shape.location_skew)
+        ),
+        pub_date=plan.pub_date(rng),
+        is_published=rng.random() >= shape.unpublished,
+        image=plan.image(rng),
+    )
+
+
+def build_comment(plan, rng, pk):
+    return Comment(
+        pk=pk,
+        post_id=plan.pick(rng, 'posts', plan.shape.comment_skew),
+        author_id=plan.pick(rng, 'users', plan.shape.author_skew),
+        text=plan.text(rng, plan.shape.comment_lengths),
+    )
+
+
+BUILDERS = {
+    'users': build_user,
+    'categories': build_category,
+    'locations': build_location,
+    'posts': build_post,
+    'comments': build_comment,
+}
+_plan = None
+
+
+def set_plan(plan):
+    global _plan
+    _plan = plan
+
+
+def insert_sql(model, connection):
+    quote = connection.ops.quote_name
+    fields = model._meta.concrete_fields
+    return (
+        f'INSERT INTO {quote(model._meta.db_table)} '
+        f'({", ".join(quote(field.column) for field in fields)}) '
+        f'VALUES ({", ".join(["%s"] * len(fields))})'
+    )
+
+
+def build_batch(task):
+    """Строки пачки, готовые для executemany.
+
+    У каждого объекта свой генератор от seed и номера объекта. Значения
+    приводятся к виду базы здесь же, в процессе-строителе, — как это
+    сделал бы bulk_create.
+    """
+    kind, start, stop = task
+    build = BUILDERS[kind]
+    model = MODELS[kind]
+    connection = connections[model.objects.db]
+    fields = model._meta.concrete_fields
+    rows = []
+    for pk in range(start, stop):
+        obj = build(_plan, random.Random(
+            f'{_plan.seed}:{kind}:{pk - _plan.first[kind]}'
+        ), pk)
+        rows.append([
+            field.get_db_prep_save(field.pre_save(obj, True), connection)
+            for field in fields
+        ])
+    return rows
+
+
+def batches(plan, kind, batch_size):
+    first = plan.first[kind]
+    stop = first + plan.counts[kind]
+    for start in range(first, stop, batch_size):
+        yield kind, start, min(start + batch_size, stop)
+
+
+def bounded_map(pool, function, tasks, window):
+    """Как pool.map, но готовится не больше `window` пачек впереди."""
+    pending = deque()
+    for task in tasks:
+        pending.append(pool.submit(function, task))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def save_sample_images(plan):
+    """Несколько картинок, которые делят между собой публикации."""
+    rng = random.Random(f'{plan.seed}:images')
+    for number in range(IMAGE_VARIANTS):
+        stream = BytesIO()
+        color = tuple(rng.randrange(256) for _ in range(3))
+        Image.new('RGB', IMAGE_SIZE, color=color).save(stream, format='JPEG')
+        plan.images.append(default_storage.save(
+            f'{Post.image.field.upload_to}/{USERNAME_PREFIX}{plan.seed}'
+            f'-{number}.jpg',
+            ContentFile(stream.getvalue()),
+        ))
+
+
+def generate(plan, workers=1, batch_size=BATCH_SIZE, progress=None):
+    """Создать объекты по плану; пачки строят `workers` процессов.
+
+    Пишет в базу только текущий процесс — executemany, по транзакции на
+    пачку, в порядке пачек. `progress(kind, count)` вызывается после
+    каждой пачки.
+    """
+    if plan.counts['posts'] and plan.image_share:
+        save_sample_images(plan)
+    set_plan(plan)
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context('fork'),
+            initializer=set_plan, initargs=(plan,),
+        )
+    try:
+        for kind, model in MODELS.items():
+            tasks = batches(plan, kind, batch_size)
+            results = (
+                bounded_map(pool, build_batch, tasks, workers * 2)
+                if pool else map(build_batch, tasks)
+            )
+            connection = connections[model.objects.db]
+            sql = insert_sql(model, connection)
+            for rows in results:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.executemany(sql, rows)
+                if progress:
+                    progress(kind, len(rows))
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    reset_sequences()
+    if plan.counts['posts']:
+        rebuild_derived(Post.objects.filter(pk__gte=plan.first['posts']))
+
+
+def reset_sequences():
+    connection = connections[Post.objects.db]
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), list(MODELS.values())
+    )
+    with connection.cursor() as cursor:
+        for sql in statements:
+            cursor.execute(sql)
+
+
+def seed(users=20, categories=5, locations=10, posts=300, comments=1500,
+         seed=0):
+    """Создать пользователей, категории, места, публикации и комментарии."""
+    generate(Plan(Shape(), {
+        'users': users, 'categories': categories, 'locations': locations,
+        'posts': posts, 'comments': comments,
+    }, seed=seed))
+
+
+def rebuild_derived(posts):
+    """Досчитать поля, которые при обычном сохранении заполняют модели."""
+    posts.sync_visibility()
+    posts.reconcile_comment_count()
+    posts.filter(text_html='').render_text()
+    using = Post.objects.db
+    if search.is_supported(connections[using]):
+        search.rebuild(
+            Post.objects.using(using), Comment.objects.using(using),
+            using=using,
+        )
+    bump_generation('posts', 'feed', 'timeline')
@@ -0,0 +1,199 @@
+"""Обработчики сигналов моделей блога."""
+from django.contrib.auth import get_user_model
+from django.db.models import F
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils.timezone import now
+
+from . import search, tasks
+from .caching import bump_generation, post_tags
+from .managers import is_post_deleting, mark_post_deleting
+from .models import Category, Comment, Location, Post
+
+User = get_user_model()
+
+
+@receiver(pre_delete, sender=Post)
+def remember_deleting_post(sender, instance, **kwargs):
+    # Каскад удалит комментарии по одному, и для каждого сработают
+    # сигналы. Счётчик и кэш публикации, которой уже не будет, не
+    # трогаем, а строки комментариев убираем из индекса одним запросом.
+    # Отметка действует только внутри Post.delete() и QuerySet.delete();
+    # при каскаде от автора комментарии обрабатываются по одному.
+    mark_post_deleting(instance.pk)
+    search.remove_documents(
+        search.COMMENT_KIND,
+        instance.comments.order_by().values_list('pk', flat=True),
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_post_counts(sender, **kwargs):
+    bump_generation('posts')
+
+
+@receiver(post_save, sender=Post)
+def sync_loaded_post_visibility(sender, instance, raw, **kwargs):
+    # loaddata сохраняет объекты в обход Post.save().
+    if raw:
+        Post.objects.filter(pk=instance.pk).sync_visibility()
+
+
+@receiver(post_save, sender=Post)
+def render_loaded_post_text(sender, instance, raw, **kwargs):
+    if raw:
+        Post.objects.filter(pk=instance.pk).render_text()
+
+
+@receiver(post_save, sender=Category)
+def sync_category_visibility(sender, instance, **kwargs):
+    instance.posts.filter(is_published=True).exclude(
+        is_visible=instance.is_published
+    ).update(is_visible=instance.is_published)
+
+
+@receiver(pre_delete, sender=Category)
+def hide_category_posts(sender, instance, **kwargs):
+    # Публикации останутся без категории (SET_NULL) и пропадут из лент.
+    instance.posts.filter(is_visible=True).update(is_visible=False)
+
+
+@receiver(pre_save, sender=Comment)
+def remember_comment_post(sender, instance, **kwargs):
+    instance._previous_post_id = None
+    if instance.pk is not None:
+        instance._previous_post_id = (
+            Comment.objects.filter(pk=instance.pk)
+            .values_list('post_id', flat=True)
+            .first()
+        )
+
+
+@receiver(post_save, sender=Comment)
+def increment_comment_count(sender, instance, created, **kwargs):
+    previous_post_id = getattr(instance, '_previous_post_id', None)
+    if created:
+        change_comment_count(instance.post_id, 1)
+    elif previous_post_id and previous_post_id != instance.post_id:
+        change_comment_count(previous_post_id, -1)
+        change_comment_count(instance.post_id, 1)
+    else:
+        # Правка комментария тоже меняет версию его публикации.
+        Post.objects.filter(pk=instance.post_id).update(updated_at=now())
+
+
+@receiver(post_delete, sender=Comment)
+def decrement_comment_count(sender, instance, **kwargs):
+    if not is_post_deleting(instance.post_id):
+        change_comment_count(instance.post_id, -1)
+
+
+def change_comment_count(post_id, delta):
+    posts = Post.objects.filter(pk=post_id)
+    if delta < 0:
+        # Не уводим счётчик в минус, если он уже разошёлся с данными.
+        posts = posts.filter(comment_count__gte=-delta)
+    # Счётчик выводится в карточке, поэтому сдвигаем и версию публикации.
+    posts.update(comment_count=F('comment_count') + delta, updated_at=now())
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_tags(sender, instance, **kwargs):
+    instance._previous_tags = set()
+    if instance.pk is not None:
+        previous = Post.objects.filter(pk=instance.pk).only(
+            'author_id', 'category_id', 'location_id'
+        ).first()
+        if previous is not None:
+            instance._previous_tags = post_tags(previous)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_pages(sender, instance, **kwargs):
+    bump_generation(
+        'feed',
+        *post_tags(instance),
+        *getattr(instance, '_previous_tags', ()),
+    )
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def invalidate_category_pages(sender, instance, **kwargs):
+    # Смена флага категории меняет состав лент её авторов, а изменения
+    # идут через update() в обход сигналов Post.
+    author_ids = (
+        instance.posts.order_by().values_list('author_id', flat=True)
+        .distinct()
+    )
+    bump_generation(
+        'feed',
+        f'category:{instance.pk}',
+        *(f'author:{author_id}' for author_id in author_ids),
+    )
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_location_pages(sender, instance, **kwargs):
+    bump_generation(f'location:{instance.pk}', 'timeline')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_pages(sender, instance, **kwargs):
+    if is_post_deleting(instance.post_id):
+        # Теги сдвинет удаление самой публикации.
+        return
+    # Карточки в буфере главной ленты выводят счётчик комментариев.
+    tags = {f'post:{instance.post_id}', 'timeline'}
+    previous_post_id = getattr(instance, '_previous_post_id', None)
+    if previous_post_id:
+        tags.add(f'post:{previous_post_id}')
+    bump_generation(*tags)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_author_pages(sender, instance, update_fields=None,
+                            **kwargs):
+    tags = [f'author:{instance.pk}']
+    # Вход обновляет только last_login, которого нет в карточках.
+    if update_fields is None or set(update_fields) != {'last_login'}:
+        tags.append('timeline')
+    bump_generation(*tags)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    search.index_post(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    search.remove_document(search.POST_KIND, instance.pk)
+
+
+@receiver(post_save, sender=Comment)
+def index_comment(sender, instance, **kwargs):
+    search.index_comment(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def unindex_comment(sender, instance, **kwargs):
+    if not is_post_deleting(instance.post_id):
+        search.remove_document(search.COMMENT_KIND, instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def schedule_renditions(sender, instance, raw, **kwargs):
+    if instance.image and not raw:
+        tasks.enqueue(
+            tasks.warm_renditions, instance.pk,
+            dedup_key=f'renditions:{instance.pk}',
+        )
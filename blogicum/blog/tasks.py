@@ -0,0 +1,221 @@
+"""Фоновая очередь задач в базе данных.
+
+Задача — строка в таблице Task с путём к функции и JSON-аргументами.
+Она добавляется в той же транзакции, что и изменение, которое её
+породило, а выполняет её команда ``run_tasks`` в пуле потоков или
+процессов. Упавшая задача повторяется с растущей паузой, а ключ
+дедупликации не даёт поставить одну и ту же работу дважды.
+"""
+import traceback
+from base64 import b64decode, b64encode
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+
+from . import renditions, writes
+from .constants import (RENDITION_SIZES, TASK_LEASE, TASK_MAX_ATTEMPTS,
+                        TASK_RETRY_DELAY)
+from .models import Post, Task
+
+
+def task_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def enqueue(func, *args, dedup_key=None, delay=0,
+            max_attempts=TASK_MAX_ATTEMPTS, **kwargs):
+    """Поставить вызов func(*args, **kwargs) в очередь.
+
+    Если задача с тем же `dedup_key` ещё ждёт или выполняется, новая не
+    создаётся и возвращается существующая.
+    """
+    fields = {
+        'name': task_name(func),
+        'payload': {'args': list(args), 'kwargs': kwargs},
+        'dedup_key': dedup_key,
+        'max_attempts': max_attempts,
+        'run_after': now() + timedelta(seconds=delay),
+    }
+    if settings.BLOG_TASKS_EAGER:
+        func(*args, **kwargs)
+        return Task(status=Task.DONE, attempts=1, **fields)
+    try:
+        with transaction.atomic():
+            return Task.objects.create(**fields)
+    except IntegrityError:
+        if dedup_key is None:
+            raise
+        return Task.objects.filter(
+            dedup_key=dedup_key, status__in=(Task.PENDING, Task.RUNNING)
+        ).first()
+
+
+ABANDONED_ERROR = 'Обработчик не завершил задачу до конца аренды.'
+
+
+def abandoned(moment):
+    """Условие для задач, чей обработчик не вернулся до конца аренды.
+
+    Например, процесс, строивший копии огромной картинки, убит из-за
+    нехватки памяти, и задача так и осталась RUNNING.
+    """
+    return Q(status=Task.RUNNING, locked_until__lt=moment)
+
+
+def due_tasks(limit):
+    """Задачи, которые пора выполнить, включая брошенные обработчиками."""
+    moment = now()
+    return Task.objects.filter(
+        Q(status=Task.PENDING, run_after__lte=moment)
+        | abandoned(moment) & Q(attempts__lt=F('max_attempts'))
+    ).order_by('run_after', 'id').values_list('pk', flat=True)[:limit]
+
+
+def fail_abandoned():
+    """Отметить FAILED брошенные задачи, у которых кончились попытки.
+
+    Иначе задача, которая каждый раз роняет обработчик, забиралась бы
+    заново бесконечно.
+    """
+    exhausted = Task.objects.filter(
+        abandoned(now()), attempts__gte=F('max_attempts')
+    )
+    # Проверка чтением: пустой UPDATE тоже занял бы блокировку записи.
+    if not exhausted.exists():
+        return 0
+    with writes.serialized_write():
+        return exhausted.update(
+            status=Task.FAILED, locked_until=None,
+            last_error=ABANDONED_ERROR,
+        )
+
+
+def claim(limit, lease=TASK_LEASE):
+    """Забрать до `limit` задач; каждая достаётся только одному обработчику.
+
+    Задача переводится в RUNNING условным UPDATE, поэтому из нескольких
+    обработчиков, выбравших её одновременно, её получит один.
+    """
+    claimed = []
+    try:
+        fail_abandoned()
+    except writes.WriteQueueFull:
+        return claimed
+    for pk in list(due_tasks(limit)):
+        moment = now()
+        try:
+            with writes.serialized_write():
+                taken = Task.objects.filter(
+                    Q(status=Task.PENDING)
+                    | abandoned(moment) & Q(attempts__lt=F('max_attempts')),
+                    pk=pk,
+                ).update(
+                    status=Task.RUNNING,
+                    attempts=F('attempts') + 1,
+                    locked_until=moment + timedelta(seconds=lease),
+                )
+        except writes.WriteQueueFull:
+            # Очередь записи занята сайтом: остальное заберём позже.
+            break
+        if taken:
+            claimed.append(pk)
+    return claimed
+
+
+def execute(pk):
+    """Выполнить задачу `pk` и записать результат. Вернуть новое состояние.
+
+    Если результат не удалось записать из-за очереди записи, задача
+    остаётся RUNNING и после аренды будет выполнена снова.
+    """
+    close_old_connections()
+    try:
+        task = Task.objects.get(pk=pk)
+        try:
+            func = import_string(task.name)
+            func(*task.payload.get('args', ()),
+                 **task.payload.get('kwargs', {}))
+        except Exception:
+            return fail(task, traceback.format_exc())
+        with writes.serialized_write():
+            Task.objects.filter(pk=pk).update(
+                status=Task.DONE, locked_until=None, last_error=''
+            )
+        return Task.DONE
+    except writes.WriteQueueFull:
+        return Task.RUNNING
+    finally:
+        close_old_connections()
+
+
+def fail(task, error):
+    if task.attempts < task.max_attempts:
+        # Пауза удваивается с каждой неудачной попыткой.
+        delay = TASK_RETRY_DELAY * 2 ** (task.attempts - 1)
+        status = Task.PENDING
+        run_after = now() + timedelta(seconds=delay)
+    else:
+        status = Task.FAILED
+        run_after = task.run_after
+    with writes.serialized_write():
+        Task.objects.filter(pk=task.pk).update(
+            status=status, run_after=run_after, locked_until=None,
+            last_error=error,
+        )
+    return status
+
+
+def send_email(message):
+    """Отправить письмо, сохранённое serialize_email(), настоящим бэкендом."""
+    email = EmailMultiAlternatives(
+        subject=message['subject'],
+        body=message['body'],
+        from_email=message['from_email'],
+        to=message['to'],
+        cc=message['cc'],
+        bcc=message['bcc'],
+        reply_to=message['reply_to'],
+        headers=message['headers'],
+        alternatives=[tuple(item) for item in message['alternatives']],
+        connection=get_connection(settings.QUEUED_EMAIL_BACKEND),
+    )
+    for filename, content, mimetype in message['attachments']:
+        email.attach(filename, b64decode(content), mimetype)
+    email.send()
+
+
+def serialize_email(email):
+    attachments = []
+    for filename, content, mimetype in email.attachments:
+        if isinstance(content, str):
+            content = content.encode()
+        attachments.append((filename, b64encode(content).decode(), mimetype))
+    return {
+        'subject': email.subject,
+        'body': email.body,
+        'from_email': email.from_email,
+        'to': email.to,
+        'cc': email.cc,
+        'bcc': email.bcc,
+        'reply_to': email.reply_to,
+        'headers': email.extra_headers,
+        'alternatives': getattr(email, 'alternatives', []),
+        'attachments': attachments,
+    }
+
+
+def warm_renditions(post_id):
+    """Заранее построить уменьшенные копии картинки публикации."""
+    post = Post.objects.filter(pk=post_id).only('image').first()
+    if post is None or not post.image:
+        return
+    for width, height in RENDITION_SIZES:
+        for image_format in renditions.FORMATS:
+            renditions.get_rendition(
+                post.image.name, width, height, image_format
+            )
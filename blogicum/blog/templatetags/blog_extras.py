@@ -0,0 +1,29 @@
+from django import template
+from django.urls import reverse
+
+from blog import renditions
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def query_replace(context, **kwargs):
+    """Текущая строка запроса с заменёнными параметрами, например page."""
+    query = context['request'].GET.copy()
+    for key, value in kwargs.items():
+        query[key] = value
+    return f'?{query.urlencode()}'
+
+
+@register.simple_tag
+def rendition_url(image, width, height=0):
+    """Адрес уменьшенной копии картинки для атрибута src."""
+    return reverse('blog:image_rendition', kwargs={
+        'width': width, 'height': height, 'path': image.name
+    })
+
+
+@register.simple_tag
+def image_srcset(image):
+    """Значение srcset со всеми поддерживаемыми ширинами картинки."""
+    return renditions.srcset(image.name)
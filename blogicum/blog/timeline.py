@@ -0,0 +1,76 @@
+"""Материализованная главная лента.
+
+Каждый процесс держит кольцевой буфер с готовыми к выводу карточками
+самых новых видимых публикаций (вместе с автором, категорией и местом),
+поэтому первые страницы главной не читают JOIN публикаций, категорий и
+пользователей. Буфер помнит поколения тегов ``feed`` и ``timeline``, с
+которыми собран, и время ближайшей отложенной публикации: сигналы
+моделей сдвигают теги, и при следующем чтении буфер пересобирается.
+
+Поколения лежат в общем кэше, поэтому запись в любом процессе видна
+буферам остальных. На случай записи в обход сигналов (update(), SQL)
+буфер всё равно живёт не дольше TIMELINE_MAX_AGE секунд.
+
+Буфер всегда читает основную базу: реплика может ещё не получить
+запись, которая сдвинула теги, а собранный с неё буфер прожил бы под
+новым поколением до следующей записи.
+"""
+import threading
+from collections import deque
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.timezone import now
+
+from .caching import get_generations
+from .constants import TIMELINE_MAX_AGE, TIMELINE_SIZE
+from .models import Post
+from .scheduling import next_publication
+
+TIMELINE_TAGS = ('feed', 'timeline')
+
+
+class Timeline:
+    """Кольцевой буфер из `size` новейших публикаций главной ленты."""
+
+    def __init__(self, size):
+        self.size = size
+        self._posts = deque(maxlen=size)
+        self._version = None
+        self._valid_until = None
+        self._lock = threading.Lock()
+
+    def _is_fresh(self, version):
+        return self._version == version and now() < self._valid_until
+
+    def posts(self):
+        """Публикации ленты от новых к старым, не больше `size` штук."""
+        version = get_generations(TIMELINE_TAGS)
+        if not self._is_fresh(version):
+            with self._lock:
+                if not self._is_fresh(version):
+                    self._rebuild(version)
+        return list(self._posts)
+
+    def _rebuild(self, version):
+        # Границу берём до выборки: публикация, вышедшая между ними,
+        # просто сразу сделает буфер устаревшим.
+        valid_until = now() + timedelta(seconds=TIMELINE_MAX_AGE)
+        boundary = next_publication()
+        if boundary is not None:
+            valid_until = min(valid_until, boundary)
+        posts = Post.published.using(DEFAULT_DB_ALIAS).order_by(
+            '-pub_date', '-id'
+        )[:self.size]
+        self._posts.clear()
+        self._posts.extend(posts)
+        self._version = version
+        self._valid_until = valid_until
+
+    def reset(self):
+        with self._lock:
+            self._posts.clear()
+            self._version = None
+
+
+timeline = Timeline(TIMELINE_SIZE)
@@ -24,6 +24,11 @@ posts = [
         views.PostDetailView.as_view(),
         name='post_detail',
     ),
+    path(
+        '<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments',
+    ),
     path('<int:post_id>/comment', views.add_comment, name='add_comment'),
     path(
         '<int:post_id>/edit_comment/<int:comment_id>/',
@@ -54,9 +59,19 @@ category = [
          name='category_posts')
 ]
 
+media = [
+    path(
+        'r/<int:width>x<int:height>/<path:path>',
+        views.image_rendition,
+        name='image_rendition',
+    )
+]
+
 urlpatterns = [
     path('', include(index)),
+    path('search/', views.SearchView.as_view(), name='search'),
     path('posts/', include(posts)),
     path('profile/', include(profile)),
-    path('category/', include(category))
+    path('category/', include(category)),
+    path('media/', include(media)),
 ]
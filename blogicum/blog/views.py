@@ -1,28 +1,49 @@
+from http import HTTPStatus
 from typing import Any, Dict
 
 from django.contrib.auth import get_user_model, update_session_auth_hash
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.paginator import InvalidPage, Paginator
+from django.db.models import Q
 from django.db.models.query import QuerySet
-from django.http import Http404, HttpResponseForbidden
+from django.http import FileResponse, Http404, HttpResponseForbidden
 from django.http.response import HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
-from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.views.generic import (CreateView, DeleteView, DetailView, ListView,
                                   UpdateView)
 
-from .constants import POSTS_FOR_PAGINATOR
+from . import loaders, routers
+from .caching import (REPLICA_TAG, get_cached_page, is_page_cacheable,
+                      post_tags, store_page)
+from .constants import (COMMENTS_PER_PAGE, PAGE_CACHE_TIMEOUT,
+                        POST_COUNT_CACHE_TIMEOUT, POSTS_FOR_PAGINATOR,
+                        RENDITION_MAX_AGE)
 from .forms import CommentForm, PasswordChangeForm, PostForm
 from .models import Category, Comment, Post
+from .paginators import (CachedCountPaginator, InvalidCursor, KeysetPaginator,
+                         WindowedPage)
+from .renditions import (FORMATS, RenditionError, negotiate_format,
+                         open_rendition)
+from .scheduling import publication_ttl
+from .search import SearchResults
+from .timeline import timeline
 
 User = get_user_model()
 
 
 class DirectionMixin(LoginRequiredMixin):
 
+    def get_object(self, queryset=None):
+        # dispatch() и get()/post() представления читают объект один раз.
+        if not hasattr(self, '_object'):
+            self._object = super().get_object(queryset)
+        return self._object
+
     def dispatch(self, request, *args, **kwargs) -> HttpResponse:
-        if self.get_object().author != request.user:
+        if self.get_object().author_id != request.user.pk:
             return redirect(
                 'blog:post_detail',
                 post_id=self.kwargs[self.pk_url_kwarg]
@@ -30,10 +51,166 @@ class DirectionMixin(LoginRequiredMixin):
         return super().dispatch(request, *args, **kwargs)
 
 
-class UserProfileListView(ListView):
+class AnonymousPageCacheMixin:
+    """Кэширует страницу целиком для анонимных читателей.
+
+    Страница хранится вместе с поколениями тегов объектов, которые на ней
+    показаны, и перестаёт отдаваться, как только сигнал сдвинет любой тег.
+    """
+
+    page_cache_timeout = PAGE_CACHE_TIMEOUT
+
+    def get_publication_scope(self):
+        """Лента, состав которой меняют отложенные публикации, или None."""
+        return None
+
+    def get_page_cache_timeout(self):
+        return publication_ttl(
+            self.page_cache_timeout, self.get_publication_scope()
+        )
+
+    def get_page_cache_tags(self, context):
+        tags = set()
+        for post in context.get('page_obj') or ():
+            tags |= post_tags(post)
+        return tags
+
+    def get_context_data(self, **kwargs):
+        # Подклассы дополняют этот же словарь после вызова super(),
+        # поэтому теги считаются при сохранении страницы.
+        self.page_context = super().get_context_data(**kwargs)
+        return self.page_context
+
+    def dispatch(self, request, *args, **kwargs) -> HttpResponse:
+        if not is_page_cacheable(request):
+            return super().dispatch(request, *args, **kwargs)
+        response = get_cached_page(request)
+        if response is None:
+            response = super().dispatch(request, *args, **kwargs)
+            if (response.status_code == HTTPStatus.OK
+                    and hasattr(response, 'add_post_render_callback')):
+                response.add_post_render_callback(self.store_page)
+        return response
+
+    def store_page(self, response):
+        tags = self.get_page_cache_tags(self.page_context)
+        if routers.reads_from_replica():
+            # Реплика могла отстать от записи, которая сдвинула теги:
+            # такая страница живёт до следующего обновления реплики.
+            tags.add(REPLICA_TAG)
+        store_page(
+            self.request, response, tags, self.get_page_cache_timeout(),
+        )
+
+
+class PostPaginationMixin:
+    """Пагинация лент: по номеру страницы или по курсору.
+
+    Курсорный режим включается параметром ``?cursor=`` в запросе или
+    атрибутом ``pagination_mode = 'cursor'`` у представления; ссылки
+    вида ``?page=N`` продолжают работать в обоих случаях.
+    """
 
-    template_name = 'blog/profile.html'
     paginate_by = POSTS_FOR_PAGINATOR
+    paginator_class = CachedCountPaginator
+    pagination_mode = 'offset'
+    cursor_kwarg = 'cursor'
+    count_key = None
+
+    def get_count_key(self):
+        return self.count_key
+
+    def get_publication_scope(self):
+        return {}
+
+    def get_queryset(self) -> QuerySet[Any]:
+        return self.get_feed_queryset()
+
+    def get_feed_queryset(self, seek=Q()) -> QuerySet[Any]:
+        """Публикации ленты; `seek` — условие курсорной страницы.
+
+        Условие курсора фильтруется раньше условий ленты, чтобы SQLite
+        взял из него границу диапазона индекса (см. KeysetPaginator).
+        """
+        raise NotImplementedError
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return super().get_paginator(
+            queryset, per_page,
+            count_key=self.get_count_key(),
+            count_timeout=publication_ttl(
+                POST_COUNT_CACHE_TIMEOUT, self.get_publication_scope()
+            ),
+            **kwargs,
+        )
+
+    def use_cursor_pagination(self) -> bool:
+        if self.cursor_kwarg in self.request.GET:
+            return True
+        return (
+            self.pagination_mode == 'cursor'
+            and self.page_kwarg not in self.request.GET
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        if not self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        paginator = KeysetPaginator(
+            queryset, page_size, seek=self.get_feed_queryset
+        )
+        try:
+            page = paginator.page(self.request.GET.get(self.cursor_kwarg))
+        except InvalidCursor as error:
+            raise Http404(str(error))
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+def paginate_comments(post, number=None, cursor=None):
+    """Страница комментариев к post: по номеру или по курсору.
+
+    Без номера страницы комментарии выбираются по ключу (created_at, id)
+    после курсора, поэтому следующая порция не зависит от длины ветки.
+    """
+    comments = post.comments.select_related('author').order_by(
+        'created_at', 'id'
+    )
+    if number is not None:
+        paginator = Paginator(comments, COMMENTS_PER_PAGE)
+        # Число комментариев уже хранится в публикации.
+        paginator.count = post.comment_count
+        try:
+            return paginator.page(number)
+        except InvalidPage as error:
+            raise Http404(str(error))
+    paginator = KeysetPaginator(
+        comments, COMMENTS_PER_PAGE, key_field='created_at', descending=False
+    )
+    try:
+        return paginator.page(cursor)
+    except InvalidCursor as error:
+        raise Http404(str(error))
+
+
+class UserProfileListView(AnonymousPageCacheMixin, PostPaginationMixin,
+                          ListView):
+
+    template_name = 'blog/profile.html'
+    read_from_replica = True
+
+    def get_count_key(self):
+        return 'profile:{}:{}'.format(
+            self.author.pk, self.author == self.request.user
+        )
+
+    def get_publication_scope(self):
+        if self.author == self.request.user:
+            return None
+        return {'author_id': self.author.pk}
+
+    def get_page_cache_tags(self, context):
+        return super().get_page_cache_tags(context) | {
+            f'author:{self.author.pk}'
+        }
 
     def get_queryset(self) -> QuerySet[Any]:
 
@@ -41,11 +218,17 @@ class UserProfileListView(ListView):
             User,
             username=self.kwargs['username']
         )
+        loaders.remember(self.author)
+        return super().get_queryset()
 
+    def get_feed_queryset(self, seek=Q()) -> QuerySet[Any]:
+        posts = self.author.posts.filter(seek)
         if self.author != self.request.user:
-            return self.author.posts(manager='published').order_by('-pub_date')
+            return posts.for_feed().order_by('-pub_date')
         else:
-            return self.author.posts.with_comment_count().order_by('-pub_date')
+            return posts.with_related_data().defer(
+                'text'
+            ).order_by('-pub_date')
 
     def get_context_data(self, **kwargs) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
@@ -145,24 +328,77 @@ class DeletePostView(DirectionMixin, DeleteView):
         return context
 
 
-class PostListView(ListView):
+class PostListView(AnonymousPageCacheMixin, PostPaginationMixin, ListView):
     template_name = 'blog/index.html'
-    paginate_by = POSTS_FOR_PAGINATOR
+    read_from_replica = True
+    count_key = 'index'
 
-    def get_queryset(self) -> QuerySet[Any]:
-        return Post.published.order_by('-pub_date')
+    def get_publication_scope(self):
+        return {}
+
+    def get_page_cache_tags(self, context):
+        return super().get_page_cache_tags(context) | {'feed'}
+
+    def get_feed_queryset(self, seek=Q()) -> QuerySet[Any]:
+        return Post.objects.filter(seek).for_feed().order_by(
+            '-pub_date', '-id'
+        )
+
+    def paginate_queryset(self, queryset, page_size):
+        # Первые страницы отдаются из буфера ленты, остальные — из базы.
+        if self.use_cursor_pagination():
+            return super().paginate_queryset(queryset, page_size)
+        try:
+            number = int(self.request.GET.get(self.page_kwarg) or 1)
+        except ValueError:
+            return super().paginate_queryset(queryset, page_size)
+        posts = timeline.posts()
+        is_complete = len(posts) < timeline.size
+        if number < 1 or (number * page_size > len(posts)
+                          and not is_complete):
+            return super().paginate_queryset(queryset, page_size)
+        paginator = self.get_paginator(queryset, page_size)
+        if is_complete:
+            # Вся лента в буфере, COUNT(*) не нужен.
+            paginator.count = len(posts)
+        try:
+            number = paginator.validate_number(number)
+        except InvalidPage as error:
+            raise Http404(str(error))
+        bottom = (number - 1) * page_size
+        page = WindowedPage(
+            posts[bottom:bottom + page_size], number, paginator
+        )
+        return (paginator, page, page.object_list, page.has_other_pages())
 
 
-class CategoryPostView(ListView):
+class CategoryPostView(AnonymousPageCacheMixin, PostPaginationMixin,
+                       ListView):
     template_name = 'blog/category.html'
-    paginate_by = POSTS_FOR_PAGINATOR
+    read_from_replica = True
 
     def get_queryset(self) -> QuerySet[Any]:
         self.category = get_object_or_404(
             Category, is_published=True,
             slug=self.kwargs['category_slug'],
         )
-        return self.category.posts(manager='published').order_by('-pub_date')
+        return super().get_queryset()
+
+    def get_feed_queryset(self, seek=Q()) -> QuerySet[Any]:
+        return self.category.posts.filter(seek).for_feed().order_by(
+            '-pub_date'
+        )
+
+    def get_count_key(self):
+        return f'category:{self.category.pk}'
+
+    def get_publication_scope(self):
+        return {'category_id': self.category.pk}
+
+    def get_page_cache_tags(self, context):
+        return super().get_page_cache_tags(context) | {
+            f'category:{self.category.pk}'
+        }
 
     def get_context_data(self, **kwargs) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
@@ -170,36 +406,59 @@ class CategoryPostView(ListView):
         return context
 
 
-class PostDetailView(DetailView):
+class SearchView(ListView):
+    template_name = 'blog/search.html'
+    paginate_by = POSTS_FOR_PAGINATOR
+    paginator_class = CachedCountPaginator
+
+    def get_queryset(self):
+        self.query = self.request.GET.get('q', '').strip()
+        return SearchResults(self.query)
+
+    def get_context_data(self, **kwargs) -> Dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        context['query'] = self.query
+        return context
+
+
+class PostDetailView(AnonymousPageCacheMixin, DetailView):
     template_name = 'blog/detail.html'
+    read_from_replica = True
     pk_url_kwarg = 'post_id'
     model = Post
 
     def get_queryset(self) -> QuerySet[Any]:
-        return super().get_queryset().select_related(
-            'author',
-            'location',
-            'category',
-        )
-
-    def get_object(self, queryset=None):
-        post = super().get_object(queryset)
-        if post.author != self.request.user and (
-            post.is_published is False
-            or post.category.is_published is False
-            or post.pub_date > timezone.now()
-        ):
-            raise Http404
-        return post
+        return Post.objects.visible_to(
+            self.request.user
+        ).with_related_data().defer('text')
 
     def get_context_data(self, **kwargs) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
         context['form'] = CommentForm()
-        context['comments'] = self.object.comments.select_related(
-            'author'
+        context['comments'] = paginate_comments(
+            self.object, self.request.GET.get('comments_page')
         )
         return context
 
+    def get_page_cache_tags(self, context):
+        return post_tags(self.object) | {
+            f'author:{comment.author_id}' for comment in context['comments']
+        }
+
+
+def post_comments(request, post_id):
+    """Следующая порция комментариев к публикации в виде HTML-фрагмента."""
+    post = get_object_or_404(
+        Post.objects.visible_to(request.user), pk=post_id
+    )
+    context = {
+        'post': post,
+        'comments': paginate_comments(
+            post, request.GET.get('page'), request.GET.get('cursor')
+        ),
+    }
+    return render(request, 'includes/comment_list.html', context)
+
 
 @login_required
 def add_comment(request, post_id):
@@ -217,7 +476,7 @@ def add_comment(request, post_id):
 @login_required
 def edit_comment(request, post_id, comment_id):
     comment = get_object_or_404(Comment, id=comment_id)
-    if comment.author != request.user:
+    if comment.author_id != request.user.pk:
         return HttpResponseForbidden(
             'У вас нет прав для редактирования этого комментария.'
         )
@@ -240,7 +499,7 @@ def edit_comment(request, post_id, comment_id):
 @login_required
 def delete_comment(request, post_id, comment_id):
     comment = get_object_or_404(Comment, id=comment_id)
-    if comment.author != request.user:
+    if comment.author_id != request.user.pk:
         return HttpResponseForbidden(
             "У вас нет прав для удаления этого комментария."
         )
@@ -254,3 +513,16 @@ def delete_comment(request, post_id, comment_id):
         'is_delete': True,
     }
     return render(request, 'blog/comment.html', context)
+
+
+def image_rendition(request, width, height, path):
+    image_format = negotiate_format(request.headers.get('Accept'))
+    try:
+        rendition = open_rendition(path, width, height, image_format)
+    except RenditionError as error:
+        raise Http404(str(error))
+    _, content_type = FORMATS[image_format]
+    response = FileResponse(rendition, content_type=content_type)
+    patch_vary_headers(response, ('Accept',))
+    patch_cache_control(response, public=True, max_age=RENDITION_MAX_AGE)
+    return response
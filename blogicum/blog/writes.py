@@ -0,0 +1,121 @@
+"""Запись в SQLite по одному писателю.
+
+SQLite допускает одного писателя на файл базы; остальные ждут блокировку
+и по истечении busy_timeout получают «database is locked». Здесь
+изменяющие запросы выстраиваются в очередь заранее: внутри процесса —
+на threading.Lock, между процессами — на блокировке файла. Очередь
+ограничена, и запрос, которому не хватило места или времени, получает
+WriteQueueFull вместо ошибки базы.
+
+Очередь необязательна (BLOG_WRITE_LOCK = None по умолчанию). Когда она
+включена, через неё пишут представления (SerializedWriteMiddleware),
+обработчик фоновых задач и load_dump.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from functools import lru_cache
+
+from django.conf import settings
+
+try:
+    import fcntl
+except ImportError:  # Windows: только очередь внутри процесса.
+    fcntl = None
+
+LOCK_POLL_INTERVAL = 0.005
+LOCK_POLL_MAX_INTERVAL = 0.05
+# Размер очереди и ожидание, если BLOG_WRITE_LOCK задаёт только PATH.
+DEFAULT_OPTIONS = {'MAX_WAITERS': 32, 'TIMEOUT': 10}
+
+
+class WriteQueueFull(Exception):
+    """Запись не дождалась своей очереди."""
+
+
+class WriteLock:
+    """Очередь писателей: не больше max_waiters, ожидание до timeout."""
+
+    def __init__(self, path, max_waiters, timeout):
+        self.path = path
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_waiters)
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def hold(self):
+        if getattr(self._local, 'depth', 0):
+            # Вложенная запись в том же потоке уже владеет блокировкой.
+            self._local.depth += 1
+            try:
+                yield
+            finally:
+                self._local.depth -= 1
+            return
+        if not self._slots.acquire(blocking=False):
+            raise WriteQueueFull('Очередь записи переполнена.')
+        try:
+            deadline = time.monotonic() + self.timeout
+            if not self._lock.acquire(timeout=self.timeout):
+                raise WriteQueueFull('Запись не дождалась очереди.')
+            try:
+                with self._file_lock(deadline):
+                    self._local.depth = 1
+                    try:
+                        yield
+                    finally:
+                        self._local.depth = 0
+            finally:
+                self._lock.release()
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def _file_lock(self, deadline):
+        if fcntl is None or self.path is None:
+            yield
+            return
+        with open(self.path, 'a') as lock_file:
+            interval = LOCK_POLL_INTERVAL
+            while True:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    break
+                except BlockingIOError:
+                    if time.monotonic() >= deadline:
+                        raise WriteQueueFull(
+                            'Базу держит писатель из другого процесса.'
+                        ) from None
+                    time.sleep(interval)
+                    interval = min(interval * 2, LOCK_POLL_MAX_INTERVAL)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+@lru_cache(maxsize=None)
+def _write_lock(path, max_waiters, timeout):
+    return WriteLock(path, max_waiters, timeout)
+
+
+def get_write_lock():
+    """Очередь записи по BLOG_WRITE_LOCK или None, если она выключена."""
+    if settings.BLOG_WRITE_LOCK is None:
+        return None
+    options = {**DEFAULT_OPTIONS, **settings.BLOG_WRITE_LOCK}
+    return _write_lock(
+        options.get('PATH'), options['MAX_WAITERS'], options['TIMEOUT'],
+    )
+
+
+@contextmanager
+def serialized_write():
+    """Выполнить блок, дождавшись очереди записи."""
+    write_lock = get_write_lock()
+    if write_lock is None:
+        yield
+        return
+    with write_lock.hold():
+        yield
@@ -26,13 +26,18 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'blog.middleware.NPlusOneMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'blog.middleware.IdentityMapMiddleware',
+    'blog.middleware.ReplicaMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
+    # Последним: очередь записи охватывает только вызов представления.
+    'blog.middleware.SerializedWriteMiddleware',
 ]
 
 ROOT_URLCONF = 'blogicum.urls'
@@ -50,6 +55,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'blog.context_processors.fragment_cache',
             ],
         },
     },
@@ -62,6 +68,60 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'CONN_MAX_AGE': 60,
+    },
+    # Копия основной базы, обновляется командой refresh_replica.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        # Постоянные соединения увидят новую копию после переподключения.
+        'CONN_MAX_AGE': 60,
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+# Очередь записи в SQLite (blog.writes), по умолчанию выключена, например:
+# BLOG_WRITE_LOCK = {
+#     # Блокировка файла согласует запись между процессами сервера.
+#     'PATH': BASE_DIR / 'db.sqlite3.lock',
+#     'MAX_WAITERS': 32,
+#     'TIMEOUT': 10,
+# }
+# None — писать без очереди, ожидая блокировку SQLite по busy_timeout.
+BLOG_WRITE_LOCK = None
+
+BLOG_WRITE_BUSY_VIEW = 'pages.views.service_unavailable'
+
+# Поиск N+1 (blog.middleware.NPlusOneMiddleware): сколько одинаковых
+# запросов за один запрос к сайту считать N+1 и выбрасывать ли
+# исключение вместо записи в журнал; None — не искать.
+BLOG_NPLUSONE = {
+    'THRESHOLD': 3,
+    'RAISE': False,
+} if DEBUG else None
+
+# Наборы прагм SQLite из blog.pragmas.PRESETS для каждого псевдонима.
+BLOG_SQLITE_PRESETS = {
+    'default': 'write-heavy',
+    'replica': 'read-heavy',
+}
+
+DATABASE_ROUTERS = ['blog.routers.ReplicaRouter']
+
+# Псевдонимы реплик для чтения лент, например ['replica'].
+BLOG_READ_REPLICAS = []
+
+# Поколения тегов (blog.caching) сбрасывают кэш во всех процессах, только
+# если кэш у процессов общий: обработчики сервера, run_tasks и
+# publish_scheduled пишут в один каталог. LocMemCache здесь не подходит.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            # Страницы, фрагменты и поколения тегов; по умолчанию 300.
+            'MAX_ENTRIES': 10000,
+        },
     }
 }
 
@@ -122,6 +182,12 @@ MEDIA_URL = '/media/'
 
 CSRF_FAILURE_VIEW = 'pages.views.csrf_failure'
 
-EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+EMAIL_BACKEND = 'blog.mail.QueuedEmailBackend'
+
+# Письма уходят из фоновой очереди (manage.py run_tasks) этим бэкендом.
+QUEUED_EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
+
+# True — выполнять фоновые задачи сразу при постановке в очередь.
+BLOG_TASKS_EAGER = False
 
 EMAIL_FILE_PATH = BASE_DIR / 'sent_emails'
@@ -9,5 +9,9 @@ def server_error(request):
     return render(request, 'pages/500.html', status=500)
 
 
+def service_unavailable(request):
+    return render(request, 'pages/503.html', status=503)
+
+
 def csrf_failure(request, reason=''):
     return render(request, 'pages/403csrf.html', status=403)
@@ -0,0 +1,22 @@
+// Подгружает следующую порцию комментариев вместо перехода по ссылке.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('.js-more-comments');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  fetch(link.href, {headers: {'X-Requested-With': 'XMLHttpRequest'}})
+    .then(function (response) {
+      if (!response.ok) {
+        throw new Error(response.statusText);
+      }
+      return response.text();
+    })
+    .then(function (html) {
+      link.insertAdjacentHTML('afterend', html);
+      link.remove();
+    })
+    .catch(function () {
+      window.location = link.href;
+    });
+});
@@ -10,6 +10,7 @@ from typing import (Any, Iterable, List, NamedTuple, Optional, Tuple, Type,
 import pytest
 from django.apps import apps
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.db.models import Field, Model
 from django.forms import BaseForm
 from django.http import HttpResponse
@@ -32,6 +33,27 @@ def enable_debug_false():
         yield
 
 
+@pytest.fixture(autouse=True)
+def cache_dir(settings, tmp_path):
+    settings.CACHES = {
+        "default": {
+            **settings.CACHES["default"], "LOCATION": tmp_path / "cache",
+        },
+    }
+
+
+@pytest.fixture(autouse=True)
+def clear_cache(cache_dir):
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def raise_on_n_plus_one(settings):
+    settings.BLOG_NPLUSONE = {"THRESHOLD": 3, "RAISE": True}
+
+
 class SafeImportFromContextManager:
     def __init__(
             self,
@@ -83,6 +105,7 @@ pytest_plugins = [
     "fixtures.locations",
     "fixtures.categories",
     "fixtures.comments",
+    "fixtures.query_budget",
     "adapters.comment",
 ]
 
@@ -0,0 +1,61 @@
+"""Бюджет SQL-запросов на страницу.
+
+Фикстура ``query_budget`` открывает страницу, записывает каждый запрос
+вместе со строками кода проекта, из которых он выполнен, и падает, если
+запросов больше бюджета или их число растёт вместе с данными. В
+сообщении об ошибке — сами запросы и места в коде.
+"""
+import pytest
+from django.core.cache import cache
+
+from blog.queries import QueryRecorder, describe, shape
+from blog.timeline import timeline
+
+
+class QueryBudget:
+
+    def record(self, client, url):
+        """Открыть `url` с холодным кешем и вернуть записанные запросы."""
+        cache.clear()
+        timeline.reset()
+        with QueryRecorder().record() as recorder:
+            response = client.get(url)
+        assert response.status_code == 200, (
+            f"Страница `{url}` вернула код {response.status_code}."
+        )
+        return recorder
+
+    def check(self, client, url, budget, grow, sizes):
+        """Сравнить число запросов с бюджетом при разных объёмах данных.
+
+        `grow(size)` доводит данные до `size` объектов на странице.
+        """
+        baseline = None
+        for size in sizes:
+            grow(size)
+            recorder = self.record(client, url)
+            count = len(recorder.queries)
+            if count > budget:
+                pytest.fail(
+                    f"Страница `{url}` при {size} объектах выполняет "
+                    f"{count} SQL-запросов, бюджет — {budget}:\n"
+                    f"{describe(recorder.queries)}"
+                )
+            if baseline is None:
+                baseline = recorder
+                continue
+            extra = recorder.shapes() - baseline.shapes()
+            if count > len(baseline.queries) or extra:
+                pytest.fail(
+                    f"Число запросов страницы `{url}` растёт с данными: "
+                    f"{len(baseline.queries)} -> {count} при {size} "
+                    "объектах. Лишние запросы:\n" + describe([
+                        query for query in recorder.queries
+                        if shape(query.sql) in extra
+                    ])
+                )
+
+
+@pytest.fixture
+def query_budget():
+    return QueryBudget()
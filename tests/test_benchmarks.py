@@ -0,0 +1,57 @@
+import json
+from http import HTTPStatus
+
+import pytest
+from django.core.management import call_command
+from django.core.management.base import CommandError
+
+from blog import benchmarks, seeding
+
+
+@pytest.mark.django_db
+def test_every_route_is_measured(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    seeding.seed(users=3, categories=2, locations=2, posts=15, comments=30)
+    results = benchmarks.run(iterations=2)
+    assert set(results) == {name for name, _ in benchmarks.iter_routes()}
+    assert {"blog:index", "blog:post_detail", "blog:profile",
+            "pages:about"} <= set(results), (
+        "Убедитесь, что замеряются маршруты blog и pages."
+    )
+    for name, metrics in results.items():
+        assert metrics["status"] < HTTPStatus.BAD_REQUEST, (
+            f"Убедитесь, что маршрут {name} отвечает без ошибки."
+        )
+    assert results["blog:edit_post"]["status"] == HTTPStatus.OK, (
+        "Убедитесь, что страницы автора замеряются от его имени."
+    )
+    assert results["blog:index"]["queries"] > 0
+    assert results["blog:index"]["bytes"] > 0
+
+
+def metrics(p95=10.0, queries=3, status=200):
+    return {"status": status, "p50": p95, "p95": p95, "p99": p95,
+            "queries": queries, "bytes": 1000}
+
+
+def test_compare_flags_growth_above_threshold():
+    baseline = {"blog:index": metrics(), "pages:about": metrics()}
+    current = {
+        "blog:index": metrics(p95=11.5, queries=5),
+        "pages:about": metrics(p95=10.5),
+    }
+    regressions = benchmarks.compare(baseline, current, threshold=0.2)
+    assert regressions == [("blog:index", "queries", 3, 5)], (
+        "Убедитесь, что сравнение отмечает только рост больше порога."
+    )
+
+
+def test_compare_command_fails_on_regression(tmp_path):
+    paths = []
+    for name, route in (("base", metrics()), ("new", metrics(p95=30.0))):
+        path = tmp_path / f"{name}.json"
+        path.write_text(json.dumps({"routes": {"blog:index": route}}))
+        paths.append(str(path))
+    with pytest.raises(CommandError):
+        call_command("compare_benchmarks", *paths, "--threshold", "0.5")
+    call_command("compare_benchmarks", *paths, "--threshold", "3")
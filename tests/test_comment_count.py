@@ -0,0 +1,107 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models.signals import post_delete
+from django.test.utils import CaptureQueriesContext
+
+from blog.search import SEARCH_TABLE
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_comment_count_follows_comments(
+        mixer, user, post_with_published_location, another_user
+):
+    post = post_with_published_location
+    comments = mixer.cycle(3).blend("blog.Comment", post=post)
+    post.refresh_from_db()
+    assert post.comment_count == 3
+
+    comments[0].delete()
+    post.refresh_from_db()
+    assert post.comment_count == 2
+
+    mixer.blend("blog.Comment", post=post, author=another_user)
+    another_user.delete()
+    post.refresh_from_db()
+    assert post.comment_count == 2, (
+        "Убедитесь, что счётчик комментариев уменьшается при каскадном"
+        " удалении комментариев."
+    )
+
+
+def test_post_delete_skips_per_comment_work(
+        mixer, post_with_published_location
+):
+    post = post_with_published_location
+    mixer.cycle(5).blend("blog.Comment", post=post)
+    with CaptureQueriesContext(connection) as queries:
+        post.delete()
+    statements = [query["sql"] for query in queries.captured_queries]
+    assert not [sql for sql in statements if sql.startswith(
+        'UPDATE "blog_post"'
+    )], (
+        "Убедитесь, что удаление публикации не пересчитывает её счётчик "
+        "комментариев по одному."
+    )
+    deletes = [sql for sql in statements if sql.startswith(
+        f"DELETE FROM {SEARCH_TABLE}"
+    )]
+    assert len(deletes) <= 2, (
+        "Убедитесь, что комментарии убираются из индекса одним запросом."
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {SEARCH_TABLE}")
+        assert cursor.fetchone()[0] == 0
+
+
+class DeleteFailed(Exception):
+    pass
+
+
+@pytest.mark.parametrize("bulk", [False, True])
+def test_failed_post_delete_does_not_leave_mark(
+        bulk, mixer, post_with_published_location
+):
+    from blog.models import Comment, Post
+
+    post = post_with_published_location
+    comments = mixer.cycle(2).blend("blog.Comment", post=post)
+
+    def fail(sender, instance, **kwargs):
+        raise DeleteFailed
+
+    post_delete.connect(fail, sender=Comment)
+    try:
+        with pytest.raises(DeleteFailed), transaction.atomic():
+            if bulk:
+                Post.objects.filter(pk=post.pk).delete()
+            else:
+                post.delete()
+    finally:
+        post_delete.disconnect(fail, sender=Comment)
+
+    comments[0].delete()
+    post.refresh_from_db()
+    assert post.comment_count == 1, (
+        "Убедитесь, что неудачное удаление публикации не отключает"
+        " пересчёт счётчика для её комментариев."
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {SEARCH_TABLE} WHERE kind = 'comment'"
+        )
+        assert cursor.fetchone()[0] == 1
+
+
+def test_reconcile_comment_counts(mixer, post_with_published_location):
+    post = post_with_published_location
+    mixer.cycle(2).blend("blog.Comment", post=post)
+    type(post).objects.filter(pk=post.pk).update(comment_count=7)
+
+    call_command("reconcile_comment_counts", stdout=StringIO())
+
+    post.refresh_from_db()
+    assert post.comment_count == 2
@@ -0,0 +1,69 @@
+from http import HTTPStatus
+
+import pytest
+
+from blog.constants import COMMENTS_PER_PAGE
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def many_comments(mixer, post_with_published_location):
+    return mixer.cycle(COMMENTS_PER_PAGE * 2 + 3).blend(
+        "blog.Comment", post=post_with_published_location
+    )
+
+
+def test_detail_page_shows_first_comments(
+        client, post_with_published_location, many_comments
+):
+    response = client.get(f"/posts/{post_with_published_location.id}/")
+    comments = response.context["comments"]
+    assert [comment.id for comment in comments] == [
+        comment.id for comment in many_comments[:COMMENTS_PER_PAGE]
+    ], (
+        "Убедитесь, что на странице поста выводится только первая порция"
+        " комментариев в порядке их добавления."
+    )
+    assert "Показать ещё" in response.content.decode("utf-8")
+
+
+def test_comment_fragment_walks_thread(
+        client, post_with_published_location, many_comments
+):
+    post_id = post_with_published_location.id
+    comments = client.get(f"/posts/{post_id}/").context["comments"]
+    seen = [comment.id for comment in comments]
+    while comments.has_next():
+        response = client.get(
+            f"/posts/{post_id}/comments/?cursor={comments.next_cursor}"
+        )
+        assert response.status_code == HTTPStatus.OK
+        comments = response.context["comments"]
+        seen += [comment.id for comment in comments]
+    assert seen == [comment.id for comment in many_comments]
+
+    response = client.get(f"/posts/{post_id}/comments/?page=3")
+    assert [comment.id for comment in response.context["comments"]] == [
+        comment.id for comment in many_comments[COMMENTS_PER_PAGE * 2:]
+    ]
+
+
+def test_comment_fragment_rejects_bad_input(
+        client, post_with_published_location
+):
+    post_id = post_with_published_location.id
+    for query in ("cursor=bm90LWEtY3Vyc29y", "page=9"):
+        response = client.get(f"/posts/{post_id}/comments/?{query}")
+        assert response.status_code == HTTPStatus.NOT_FOUND, query
+
+
+def test_comment_fragment_hides_unpublished_post(
+        client, post_with_published_location
+):
+    post_with_published_location.is_published = False
+    post_with_published_location.save()
+    response = client.get(
+        f"/posts/{post_with_published_location.id}/comments/"
+    )
+    assert response.status_code == HTTPStatus.NOT_FOUND
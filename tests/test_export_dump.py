@@ -0,0 +1,82 @@
+import gzip
+import json
+from datetime import timedelta
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.utils import timezone
+
+from blog.dumps import iter_fixture
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db(transaction=True)]
+
+
+def read_ndjson(path):
+    return [json.loads(line) for line in path.read_text().splitlines()]
+
+
+def test_export_ndjson_in_batches(
+        tmp_path, many_posts_with_published_locations
+):
+    call_command(
+        "export_dump", str(tmp_path), "--batch-size", "3", "--jobs", "3",
+        stdout=StringIO(),
+    )
+    rows = read_ndjson(tmp_path / "blog.post.ndjson")
+    assert [row["pk"] for row in rows] == sorted(
+        post.pk for post in many_posts_with_published_locations
+    )
+    users = read_ndjson(tmp_path / "auth.user.ndjson")
+    assert users and all("password" not in row["fields"] for row in users)
+
+
+def test_export_gzip_fixture(tmp_path, post_with_published_location):
+    call_command(
+        "export_dump", str(tmp_path), "--format", "json", "--gzip",
+        "--models", "blog.Post", stdout=StringIO(),
+    )
+    with gzip.open(tmp_path / "blog.post.json.gz", "rt") as stream:
+        objects = list(iter_fixture(stream))
+    assert [obj["pk"] for obj in objects] == [post_with_published_location.pk]
+    assert objects[0]["model"] == "blog.post"
+
+
+def test_incremental_export(tmp_path, post_with_published_location):
+    watermark = tmp_path / "watermark.json"
+    output = tmp_path / "out"
+    args = ("export_dump", str(output), "--models", "blog.Post",
+            "--watermark", str(watermark))
+    call_command(*args, stdout=StringIO())
+    assert len(read_ndjson(output / "blog.post.ndjson")) == 1
+
+    call_command(*args, stdout=StringIO())
+    assert read_ndjson(output / "blog.post.ndjson") == []
+
+    Post.objects.filter(pk=post_with_published_location.pk).update(
+        updated_at=timezone.now() + timedelta(seconds=1)
+    )
+    call_command(*args, stdout=StringIO())
+    assert len(read_ndjson(output / "blog.post.ndjson")) == 1
+
+
+def test_incremental_export_finds_edited_comments(
+        tmp_path, comment_to_a_post
+):
+    comment = comment_to_a_post
+    watermark = tmp_path / "watermark.json"
+    output = tmp_path / "out"
+    args = ("export_dump", str(output), "--models", "blog.Comment",
+            "--watermark", str(watermark))
+    call_command(*args, stdout=StringIO())
+    call_command(*args, stdout=StringIO())
+    assert read_ndjson(output / "blog.comment.ndjson") == []
+
+    comment.text = "Исправленный комментарий"
+    comment.save()
+    call_command(*args, stdout=StringIO())
+    rows = read_ndjson(output / "blog.comment.ndjson")
+    assert [row["fields"]["text"] for row in rows] == [comment.text], (
+        "Убедитесь, что инкрементальная выгрузка находит правки комментариев."
+    )
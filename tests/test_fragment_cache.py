@@ -0,0 +1,47 @@
+import pytest
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_post_card_is_cached_by_version(
+        user_client, post_with_published_location
+):
+    post = post_with_published_location
+    user_client.get("/")
+    # update() не меняет updated_at, поэтому карточка берётся из кэша.
+    type(post).objects.filter(pk=post.pk).update(title="Новый заголовок")
+    assert "Новый заголовок" not in user_client.get("/").content.decode()
+
+    post.refresh_from_db()
+    post.save()
+    assert "Новый заголовок" in user_client.get("/").content.decode(), (
+        "Убедитесь, что сохранение публикации меняет ключ её карточки."
+    )
+
+
+def test_category_change_rerenders_cards(
+        user_client, post_with_published_location
+):
+    category = post_with_published_location.category
+    user_client.get("/")
+    category.title = "Другая категория"
+    category.save()
+    assert "Другая категория" in user_client.get("/").content.decode()
+
+
+def test_comment_touches_post(
+        user_client, mixer, post_with_published_location
+):
+    post = post_with_published_location
+    user_client.get("/")
+    comment = mixer.blend("blog.Comment", post=post)
+    updated_at = type(post).objects.get(pk=post.pk).updated_at
+    assert updated_at > post.updated_at
+    assert "Комментарии (1)" in user_client.get("/").content.decode()
+
+    comment.text = "Исправленный комментарий"
+    comment.save()
+    assert type(post).objects.get(pk=post.pk).updated_at > updated_at
+    assert comment.text in user_client.get(
+        f"/posts/{post.id}/"
+    ).content.decode()
@@ -0,0 +1,102 @@
+import gzip
+import io
+import json
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connections
+
+from blog import search
+from blog.dumps import iter_fixture
+from blog.models import Comment, Post
+
+DB_JSON = settings.BASE_DIR.parent / "db.json"
+EXCLUDE = ("-e", "admin", "-e", "sessions", "-e", "auth.permission")
+
+
+def test_iter_fixture_streams_objects():
+    objects = [{"model": "blog.location", "pk": pk, "fields": {}}
+               for pk in range(50)]
+    text = json.dumps(objects, indent=2)
+    assert list(iter_fixture(io.StringIO(text), chunk_size=7)) == objects
+    assert list(iter_fixture(io.StringIO("[]"))) == []
+    with pytest.raises(ValueError):
+        list(iter_fixture(io.StringIO(text[:-10]), chunk_size=7))
+
+
+@pytest.mark.django_db(transaction=True)
+def test_load_dump_matches_fixture(tmp_path):
+    fixture = json.loads(DB_JSON.read_text(encoding="utf-8"))
+    posts = {
+        obj["pk"]: obj["fields"] for obj in fixture
+        if obj["model"] == "blog.post"
+    }
+    fixture.append({
+        "model": "blog.comment", "pk": 1,
+        "fields": {"author": 1, "post": min(posts), "text": "Привет",
+                   "created_at": "2023-01-01T00:00:00Z"},
+    })
+    path = tmp_path / "dump.json.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as stream:
+        json.dump(fixture, stream)
+
+    call_command(
+        "load_dump", str(path), *EXCLUDE, "--batch-size", "5",
+        stdout=StringIO(),
+    )
+
+    assert Post.objects.count() == len(posts)
+    post = Post.objects.get(pk=min(posts))
+    assert post.created_at.isoformat().startswith(
+        posts[post.pk]["created_at"][:19]
+    ), "Убедитесь, что загрузка сохраняет created_at из дампа."
+    assert post.comment_count == 1
+    assert Comment.objects.get().text == "Привет"
+    assert Post.objects.filter(is_visible=True).exists(), (
+        "Убедитесь, что после загрузки пересчитывается видимость публикаций."
+    )
+
+
+@pytest.fixture
+def other_database(tmp_path):
+    alias = "loaded"
+    connections.databases[alias] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": str(tmp_path / "loaded.sqlite3"),
+    }
+    call_command("migrate", database=alias, verbosity=0)
+    yield alias
+    connections[alias].close()
+    del connections[alias]
+    del connections.databases[alias]
+
+
+def search_rows(alias):
+    with connections[alias].cursor() as cursor:
+        cursor.execute(f"SELECT kind, post_id FROM {search.SEARCH_TABLE}")
+        return cursor.fetchall()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_load_dump_indexes_target_database(tmp_path, other_database):
+    path = tmp_path / "dump.json.gz"
+    with gzip.open(path, "wt", encoding="utf-8") as stream:
+        stream.write(DB_JSON.read_text(encoding="utf-8"))
+    default_rows = search_rows("default")
+
+    call_command(
+        "load_dump", str(path), *EXCLUDE, "--database", other_database,
+        stdout=StringIO(),
+    )
+
+    documents = (
+        Post.objects.using(other_database).count()
+        + Comment.objects.using(other_database).count()
+    )
+    assert documents and len(search_rows(other_database)) == documents, (
+        "Убедитесь, что поисковый индекс строится в той базе, куда"
+        " загружен дамп."
+    )
+    assert search_rows("default") == default_rows
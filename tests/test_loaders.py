@@ -0,0 +1,52 @@
+import pytest
+
+from blog import loaders
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_lazy_foreign_keys_are_batched(
+        django_assert_num_queries, mixer, published_category,
+        published_location
+):
+    authors = mixer.cycle(3).blend("auth.User")
+    for author in authors:
+        mixer.cycle(2).blend(
+            "blog.Post", author=author, category=published_category,
+            location=published_location,
+        )
+    with django_assert_num_queries(3):
+        posts = list(Post.objects.all())
+        assert {post.author.pk for post in posts} == {
+            author.pk for author in authors
+        }
+        assert {post.category.pk for post in posts} == {
+            published_category.pk
+        }
+    with django_assert_num_queries(1):
+        assert [post.location for post in posts] == [
+            published_location
+        ] * len(posts)
+
+
+def test_identity_map_deduplicates_across_querysets(
+        django_assert_num_queries, post_with_published_location
+):
+    with loaders.identity_map():
+        with django_assert_num_queries(3):
+            first = Post.objects.get().author
+            second = Post.objects.get().author
+        assert first is second
+
+
+def test_owner_profile_loads_cards_without_lazy_queries(
+        user_client, user, mixer, published_category, published_location,
+        django_assert_max_num_queries
+):
+    mixer.cycle(10).blend(
+        "blog.Post", author=user, category=published_category,
+        location=published_location,
+    )
+    with django_assert_max_num_queries(6):
+        user_client.get(f"/profile/{user.username}/")
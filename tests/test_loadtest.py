@@ -0,0 +1,55 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from blog import loadtest
+
+MANAGE = Path(__file__).resolve().parent.parent / "blogicum" / "manage.py"
+
+
+def test_parse_mix():
+    assert loadtest.parse_mix("read=8, comment=2") == {
+        "read": 8.0, "comment": 2.0,
+    }
+    with pytest.raises(ValueError):
+        loadtest.parse_mix("read=1,delete=1")
+    with pytest.raises(ValueError):
+        loadtest.parse_mix("read=0")
+
+
+def test_summarize_separates_errors_and_back_pressure():
+    samples = {
+        "add_comment": [(302, 4.0), (302, 30.0), (503, 900.0), (None, 1.0)],
+    }
+    summary = loadtest.summarize(samples, seconds=2)["add_comment"]
+    assert summary["rps"] == 2
+    assert summary["errors"] == 0.25, (
+        "Убедитесь, что обрыв соединения считается ошибкой."
+    )
+    assert summary["rejected"] == 0.25, (
+        "Убедитесь, что ответы 503 очереди записи считаются отдельно."
+    )
+    assert sum(summary["histogram"]) == 4
+    assert summary["histogram"][0] == 2
+
+
+def test_load_test_drives_every_scenario(tmp_path):
+    output = tmp_path / "summary.json"
+    subprocess.run(
+        [sys.executable, str(MANAGE), "load_test", "--duration", "1",
+         "--workers", "2", "--clients", "2", "--posts", "20",
+         "--mix", "read=1,comment=1,post=1", "--output", str(output)],
+        check=True, capture_output=True, timeout=120,
+    )
+    summary = json.loads(output.read_text())
+    assert {"add_comment", "create_post"} <= set(summary), (
+        "Убедитесь, что нагрузка включает комментарии и публикации."
+    )
+    for endpoint, item in summary.items():
+        assert item["errors"] == 0, (
+            f"Убедитесь, что {endpoint} отвечает без ошибок: "
+            f"{item['statuses']}."
+        )
@@ -0,0 +1,96 @@
+import logging
+
+import pytest
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse
+from django.template import Context, Engine
+from django.test import RequestFactory
+
+from blog.middleware import NPlusOneMiddleware
+from blog.models import Comment, Post
+from blog.queries import NPlusOneError
+
+pytestmark = [pytest.mark.django_db]
+
+TEMPLATES = {
+    "comments.html": (
+        "{% for comment in comments %}\n"
+        "{{ comment.post.title }}\n"
+        "{% endfor %}"
+    ),
+    "posts.html": (
+        "{% for post in posts %}{{ post.author.username }}{% endfor %}"
+    ),
+}
+
+
+def render_view(template_name, **context):
+    engine = Engine(loaders=[
+        ("django.template.loaders.locmem.Loader", TEMPLATES),
+    ])
+
+    def view(request):
+        return HttpResponse(
+            engine.get_template(template_name).render(Context(context))
+        )
+
+    return view
+
+
+@pytest.fixture
+def comments(mixer, user):
+    posts = mixer.cycle(4).blend("blog.Post", author=user)
+    return [
+        mixer.blend("blog.Comment", post=post, author=user) for post in posts
+    ]
+
+
+def test_lazy_foreign_key_in_loop_raises(comments):
+    # Comment.post не загружается пакетами: каждая итерация — запрос.
+    middleware = NPlusOneMiddleware(
+        render_view("comments.html", comments=Comment.objects.all())
+    )
+    with pytest.raises(NPlusOneError) as error:
+        middleware(RequestFactory().get("/comments/"))
+    message = str(error.value)
+    assert "4 одинаковых запросов" in message
+    assert "поле blog.Comment.post" in message, (
+        "Убедитесь, что в отчёте указано лениво загружаемое поле."
+    )
+    assert "comments.html:2 (comment.post.title)" in message, (
+        "Убедитесь, что в отчёте указана строка шаблона."
+    )
+
+
+def test_n_plus_one_is_logged_without_raise(settings, comments, caplog):
+    settings.BLOG_NPLUSONE = {"THRESHOLD": 3, "RAISE": False}
+    middleware = NPlusOneMiddleware(
+        render_view("comments.html", comments=Comment.objects.all())
+    )
+    with caplog.at_level(logging.WARNING, logger="blog.nplusone"):
+        response = middleware(RequestFactory().get("/comments/"))
+    assert response.status_code == 200
+    assert "blog.Comment.post" in caplog.text
+
+
+def test_batched_loads_are_not_reported(comments):
+    middleware = NPlusOneMiddleware(
+        render_view("posts.html", posts=Post.objects.all())
+    )
+    response = middleware(RequestFactory().get("/posts/"))
+    assert response.status_code == 200, (
+        "Убедитесь, что пакетная загрузка авторов не считается N+1."
+    )
+
+
+def test_index_page_has_no_n_plus_one(client, mixer, published_category):
+    mixer.cycle(12).blend(
+        "blog.Post", category=published_category, location=None
+    )
+    assert client.get("/").status_code == 200
+
+
+def test_disabled_without_settings(settings):
+    settings.BLOG_NPLUSONE = None
+    with pytest.raises(MiddlewareNotUsed):
+        NPlusOneMiddleware(lambda request: HttpResponse())
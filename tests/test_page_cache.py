@@ -0,0 +1,138 @@
+import multiprocessing
+from datetime import timedelta
+
+import pytest
+from django.core.cache import cache
+from django.core.management import call_command
+from django.utils import timezone
+
+from blog.caching import bump_generation, get_generation
+from blog.management.commands.publish_scheduled import WATERMARK_KEY
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_anonymous_page_is_cached(
+        client, django_assert_num_queries, post_with_published_location
+):
+    url = f"/posts/{post_with_published_location.id}/"
+    client.get(url)
+    with django_assert_num_queries(0):
+        response = client.get(url)
+    assert post_with_published_location.title in response.content.decode()
+
+
+def test_comment_purges_post_page(
+        client, mixer, post_with_published_location
+):
+    url = f"/posts/{post_with_published_location.id}/"
+    client.get(url)
+    comment = mixer.blend("blog.Comment", post=post_with_published_location)
+    response = client.get(url)
+    assert f"comment_{comment.id}" in response.content.decode(), (
+        "Убедитесь, что новый комментарий сбрасывает кэш страницы поста."
+    )
+
+
+def test_post_edit_purges_only_affected_pages(
+        client, mixer, django_assert_num_queries, another_user,
+        post_with_published_location, another_category
+):
+    post = post_with_published_location
+    mixer.blend(
+        "blog.Post", author=another_user, category=another_category,
+        location=None,
+    )
+    other_url = f"/category/{another_category.slug}/"
+    client.get("/")
+    client.get(other_url)
+
+    post.title = "Обновлённый заголовок"
+    post.save(update_fields=["title"])
+
+    assert post.title in client.get("/").content.decode()
+    with django_assert_num_queries(0):
+        client.get(other_url)
+
+
+def test_logged_in_pages_are_not_cached(
+        user_client, post_with_published_location
+):
+    url = f"/posts/{post_with_published_location.id}/"
+    user_client.get(url)
+    response = user_client.get(url)
+    assert response.context is not None
+
+
+def test_feed_ttl_ends_at_next_publication(
+        mixer, user, published_category, post_with_published_location
+):
+    from blog.scheduling import publication_ttl
+
+    assert publication_ttl(600, {}) == 600
+    mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        pub_date=timezone.now() + timedelta(seconds=30),
+    )
+    assert 0 < publication_ttl(600, {}) <= 30
+    assert 0 < publication_ttl(
+        600, {"category_id": published_category.id}
+    ) <= 30
+    assert publication_ttl(600, None) == 600
+
+
+def test_scheduled_post_going_live_purges_feed(
+        client, post_with_published_location
+):
+    from blog.scheduling import invalidate_published_since
+
+    client.get("/")
+    post = post_with_published_location
+    published = invalidate_published_since(
+        post.pub_date - timedelta(seconds=1)
+    )
+    assert published == 1
+    assert client.get("/").context is not None
+
+
+def test_generation_bump_reaches_other_processes():
+    # Запись в одном обработчике сервера должна сбросить кэш во всех.
+    before = get_generation("feed")
+    worker = multiprocessing.get_context("fork").Process(
+        target=bump_generation, args=("feed",)
+    )
+    worker.start()
+    worker.join()
+    assert get_generation("feed") != before, (
+        "Убедитесь, что поколения тегов хранятся в общем для процессов кэше."
+    )
+
+
+def watch_feed(started, done, results):
+    # Процесс сервера, запущенный до команды: видит только общий кэш.
+    started.set()
+    done.wait(30)
+    results.put((get_generation("feed"), cache.get(WATERMARK_KEY)))
+
+
+def test_publish_scheduled_purges_feed_of_running_server(
+        post_with_published_location
+):
+    post = post_with_published_location
+    before = get_generation("feed")
+    context = multiprocessing.get_context("fork")
+    started, done, results = context.Event(), context.Event(), context.Queue()
+    server = context.Process(target=watch_feed, args=(started, done, results))
+    server.start()
+    started.wait(30)
+    lookback = (timezone.now() - post.pub_date).total_seconds()
+    call_command("publish_scheduled", lookback=int(lookback) + 2)
+    done.set()
+    generation, watermark = results.get(timeout=30)
+    server.join()
+    assert generation != before, (
+        "Убедитесь, что publish_scheduled сбрасывает кэш лент сервера."
+    )
+    assert watermark is not None, (
+        "Убедитесь, что отметка последней проверки переживает команду."
+    )
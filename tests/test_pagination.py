@@ -0,0 +1,73 @@
+from http import HTTPStatus
+
+import pytest
+from conftest import N_PER_PAGE
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_cursor_pagination_walks_feed(
+        client, many_posts_with_published_locations
+):
+    expected_ids = [
+        post.id for post in sorted(
+            many_posts_with_published_locations,
+            key=lambda post: (post.pub_date, post.id),
+            reverse=True,
+        )
+    ]
+    response = client.get("/?cursor=")
+    assert response.status_code == HTTPStatus.OK
+    first_page = response.context["page_obj"]
+    assert [post.id for post in first_page] == expected_ids[:N_PER_PAGE]
+    assert first_page.has_next() and not first_page.has_previous()
+
+    response = client.get(f"/?cursor={first_page.next_cursor}")
+    second_page = response.context["page_obj"]
+    assert [post.id for post in second_page] == expected_ids[N_PER_PAGE:]
+    assert second_page.has_previous()
+
+    response = client.get(f"/?cursor={second_page.previous_cursor}")
+    assert [
+        post.id for post in response.context["page_obj"]
+    ] == expected_ids[:N_PER_PAGE]
+
+
+def test_offset_pagination_kept(client, many_posts_with_published_locations):
+    response = client.get("/?page=2")
+    assert response.status_code == HTTPStatus.OK
+    assert response.context["page_obj"].number == 2
+
+
+def test_invalid_cursor_is_not_found(client):
+    response = client.get("/?cursor=bm90LWEtY3Vyc29y")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_paginator_renders_page_window(
+        client, mixer, published_category, published_location
+):
+    mixer.cycle(N_PER_PAGE * 30).blend(
+        "blog.Post",
+        category=published_category,
+        location=published_location,
+    )
+    response = client.get("/?page=15")
+    page_obj = response.context["page_obj"]
+    page_links = response.content.decode("utf-8").count("?page=")
+    assert page_obj.paginator.num_pages == 30
+    assert page_links < 15, (
+        "Убедитесь, что навигация по страницам показывает только окно"
+        " номеров страниц, а не все страницы ленты."
+    )
+
+
+def test_feed_count_is_cached(
+        client, django_assert_num_queries, published_category,
+        many_posts_with_published_locations
+):
+    url = f"/category/{published_category.slug}/"
+    client.get(url)
+    # Запрос категории и запрос страницы публикаций, без COUNT(*).
+    with django_assert_num_queries(2):
+        client.get(f"{url}?page=1")
@@ -0,0 +1,54 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+
+from blog import pragmas
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_connection_gets_configured_preset(settings):
+    preset = pragmas.preset_pragmas(settings.BLOG_SQLITE_PRESETS["default"])
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA busy_timeout")
+        assert cursor.fetchone()[0] == preset["busy_timeout"], (
+            "Убедитесь, что новое соединение получает прагмы своего набора."
+        )
+
+
+def test_unknown_preset_is_rejected():
+    with pytest.raises(ValueError):
+        pragmas.preset_pragmas("fast")
+
+
+@pytest.mark.django_db(transaction=True)
+def test_benchmark_reports_every_preset(post_with_published_location):
+    out = StringIO()
+    call_command(
+        "benchmark_sqlite", "--seconds", "0.2", "--threads", "2",
+        stdout=out,
+    )
+    lines = out.getvalue().splitlines()
+    names = {line.split()[0] for line in lines[1:]}
+    assert names == {"django", *pragmas.PRESETS}, (
+        "Убедитесь, что benchmark_sqlite сравнивает все наборы прагм "
+        "с настройками Django по умолчанию."
+    )
+    assert all(float(line.split()[1]) > 0 for line in lines[1:]), (
+        "Убедитесь, что замер выполняет страницы блога."
+    )
+
+
+def test_wal_is_switched_once_per_database():
+    database, connection = pragmas.split_pragmas(
+        pragmas.preset_pragmas("write-heavy")
+    )
+    assert database == {"journal_mode": "WAL"}, (
+        "Убедитесь, что WAL включается один раз для файла базы, а не "
+        "каждым соединением."
+    )
+    assert "journal_mode" not in connection
+    _, connection = pragmas.split_pragmas(pragmas.preset_pragmas("bulk-load"))
+    assert connection["journal_mode"] == "MEMORY"
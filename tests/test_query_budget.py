@@ -0,0 +1,79 @@
+import pytest
+from django.urls import reverse
+
+pytestmark = [pytest.mark.django_db]
+
+# Объёмы данных: одна запись, часть страницы и больше страницы.
+SIZES = (1, 4, 12)
+SEARCH_WORD = "путешествие"
+
+# Маршрут, клиент, какие данные растут, бюджет запросов.
+BUDGETS = [
+    ("blog:index", "client", "posts", 2),
+    ("blog:index", "user_client", "posts", 4),
+    ("blog:category_posts", "client", "posts", 4),
+    ("blog:search", "client", "posts", 3),
+    ("blog:profile", "client", "own_posts", 4),
+    ("blog:profile", "user_client", "own_posts", 5),
+    ("blog:post_detail", "client", "comments", 2),
+    ("blog:post_detail", "user_client", "comments", 4),
+    ("blog:post_comments", "client", "comments", 2),
+]
+
+
+class Dataset:
+    """Публикации и комментарии разных авторов, растущие по запросу."""
+
+    def __init__(self, mixer, user, category, location):
+        self.mixer = mixer
+        self.user = user
+        self.category = category
+        self.location = location
+        self.post = self.add_post(author=user)
+
+    def add_post(self, author=None):
+        return self.mixer.blend(
+            "blog.Post",
+            title=f"{SEARCH_WORD.capitalize()} {self.mixer.faker.word()}",
+            author=author or self.mixer.blend("auth.User"),
+            category=self.category,
+            location=self.mixer.blend(
+                "blog.Location", is_published=True
+            ) if author is None else self.location,
+        )
+
+    def grow(self, kind, size):
+        if kind == "comments":
+            while self.post.comments.count() < size:
+                self.mixer.blend(
+                    "blog.Comment", post=self.post,
+                    author=self.mixer.blend("auth.User"),
+                )
+            return
+        posts = self.user.posts if kind == "own_posts" else None
+        while (posts or self.category.posts).count() < size:
+            self.add_post(author=self.user if posts is not None else None)
+
+    def url(self, name):
+        arguments = {
+            "blog:category_posts": [self.category.slug],
+            "blog:profile": [self.user.username],
+            "blog:post_detail": [self.post.pk],
+            "blog:post_comments": [self.post.pk],
+        }
+        url = reverse(name, args=arguments.get(name, []))
+        if name == "blog:search":
+            url += f"?q={SEARCH_WORD}"
+        return url
+
+
+@pytest.mark.parametrize("name, client_name, kind, budget", BUDGETS)
+def test_query_budget(
+        name, client_name, kind, budget, request, query_budget, mixer, user,
+        published_category, published_location
+):
+    dataset = Dataset(mixer, user, published_category, published_location)
+    query_budget.check(
+        request.getfixturevalue(client_name), dataset.url(name), budget,
+        lambda size: dataset.grow(kind, size), SIZES,
+    )
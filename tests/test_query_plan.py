@@ -0,0 +1,88 @@
+import re
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from blog.timeline import timeline
+
+pytestmark = [pytest.mark.django_db]
+
+PUB_DATE_BOUND = re.compile(r'"blog_post"\."pub_date" (<=|>=|<|>)')
+BAD_PLAN_STEPS = (
+    re.compile(r"^SCAN (TABLE )?blog_post\b"),
+    re.compile(r"USE TEMP B-TREE"),
+)
+
+
+def explain(sql):
+    with connection.cursor() as cursor:
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def assert_feed_queries_use_indexes(client, url):
+    # Пересобираем буфер главной, чтобы проверить и его запрос.
+    timeline.reset()
+    with CaptureQueriesContext(connection) as captured:
+        response = client.get(url)
+    assert response.status_code == 200, url
+    feed_queries = [
+        query["sql"] for query in captured.captured_queries
+        if query["sql"].startswith("SELECT") and '"blog_post"' in query["sql"]
+    ]
+    assert feed_queries, f"Страница `{url}` не запрашивает публикации."
+    return feed_queries
+    for sql in feed_queries:
+        plan = explain(sql)
+        bad_steps = [
+            step for step in plan
+            if any(pattern.search(step) for pattern in BAD_PLAN_STEPS)
+        ]
+        assert not bad_steps, (
+            f"Запрос ленты `{url}` читает таблицу без индекса или сортирует"
+            f" во временном B-дереве: {bad_steps}\nSQL: {sql}\n"
+            f"План: {plan}"
+        )
+
+
+@pytest.mark.parametrize("suffix", ["", "?page=2", "?cursor="])
+def test_feed_query_plans(
+        suffix, client, user_client, user, published_category,
+        many_posts_with_published_locations
+):
+    urls = (
+        "/",
+        f"/category/{published_category.slug}/",
+        f"/profile/{user.username}/",
+    )
+    for url in urls:
+        assert_feed_queries_use_indexes(client, url + suffix)
+        assert_feed_queries_use_indexes(user_client, url + suffix)
+
+
+def test_deep_cursor_query_plan(
+        client, user, published_category, many_posts_with_published_locations
+):
+    urls = (
+        "/",
+        f"/category/{published_category.slug}/",
+        f"/profile/{user.username}/",
+    )
+    for url in urls:
+        first_page = client.get(f"{url}?cursor=").context["page_obj"]
+        second_page = client.get(
+            f"{url}?cursor={first_page.next_cursor}"
+        ).context["page_obj"]
+        for cursor in (second_page.next_cursor, second_page.previous_cursor):
+            if not cursor:
+                continue
+            page_url = f"{url}?cursor={cursor}"
+            for sql in assert_feed_queries_use_indexes(client, page_url):
+                bounds = PUB_DATE_BOUND.findall(sql)
+                # Диапазон индекса SQLite берёт из первого условия по
+                # дате: это должна быть граница курсора, а не now().
+                assert not bounds or bounds[0] in ("<=", ">="), (
+                    f"Условие курсора `{page_url}` стоит в WHERE после"
+                    f" границы публикации: {sql}"
+                )
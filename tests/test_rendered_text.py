@@ -0,0 +1,56 @@
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.template.defaultfilters import linebreaksbr, truncatewords
+from django.test.utils import CaptureQueriesContext
+
+from blog.models import Post
+
+pytestmark = [pytest.mark.django_db]
+
+TEXT = "Первая строка <b>текста</b>\n" + " ".join(["слово"] * 20)
+
+
+def test_save_renders_excerpt_and_html(post_with_published_location):
+    post = post_with_published_location
+    post.text = TEXT
+    post.save(update_fields=["text"])
+    post.refresh_from_db()
+    assert post.excerpt == truncatewords(TEXT, 10), (
+        "Убедитесь, что анонс совпадает с выводом фильтра truncatewords."
+    )
+    assert post.text_html == linebreaksbr(TEXT, autoescape=True), (
+        "Убедитесь, что text_html совпадает с выводом фильтра linebreaksbr."
+    )
+
+
+def test_feeds_do_not_read_full_text(client, post_with_published_location):
+    with CaptureQueriesContext(connection) as queries:
+        response = client.get("/")
+    assert post_with_published_location.excerpt in response.content.decode()
+    post_queries = [
+        query["sql"] for query in queries.captured_queries
+        if 'FROM "blog_post"' in query["sql"]
+    ]
+    assert post_queries and not any(
+        '"blog_post"."text"' in sql for sql in post_queries
+    ), "Убедитесь, что лента не читает полный текст публикаций."
+
+
+def test_detail_shows_rendered_html(client, post_with_published_location):
+    post = post_with_published_location
+    post.text = TEXT
+    post.save()
+    response = client.get(f"/posts/{post.id}/")
+    assert post.text_html in response.content.decode(), (
+        "Убедитесь, что страница публикации выводит готовый HTML текста."
+    )
+
+
+def test_command_backfills_updated_text(post_with_published_location):
+    Post.objects.update(text=TEXT)
+    call_command("render_post_text", "--batch-size", "1")
+    post = Post.objects.get()
+    assert post.text_html == linebreaksbr(TEXT, autoescape=True), (
+        "Убедитесь, что render_post_text заполняет HTML текста заново."
+    )
@@ -0,0 +1,114 @@
+from http import HTTPStatus
+from io import BytesIO
+
+import pytest
+from django.core.files.images import ImageFile
+from PIL import Image
+
+pytestmark = [pytest.mark.django_db]
+
+
+@pytest.fixture
+def big_image_post(settings, tmp_path, mixer, user, published_category):
+    settings.MEDIA_ROOT = tmp_path
+    img_io = BytesIO()
+    Image.new("RGB", (2000, 1000), color=(73, 109, 137)).save(
+        img_io, format="JPEG"
+    )
+    return mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        image=ImageFile(img_io, name="big.jpg"),
+    )
+
+
+def test_rendition_is_resized_and_negotiated(client, big_image_post):
+    url = f"/media/r/320x0/{big_image_post.image.name}"
+
+    response = client.get(url, HTTP_ACCEPT="image/webp,*/*")
+    assert response.status_code == HTTPStatus.OK
+    assert response["Content-Type"] == "image/webp"
+    image = Image.open(BytesIO(b"".join(response.streaming_content)))
+    assert image.size == (320, 160)
+
+    response = client.get(url, HTTP_ACCEPT="image/*")
+    assert response["Content-Type"] == "image/jpeg"
+    assert "Accept" in response["Vary"]
+
+
+def test_rendition_rejects_unknown_sizes_and_paths(client, big_image_post):
+    name = big_image_post.image.name
+    assert client.get(f"/media/r/333x0/{name}").status_code == 404
+    assert client.get("/media/r/320x0/../../etc/passwd").status_code == 404
+
+
+def test_rendition_cache_evicts_least_recent(big_image_post, settings):
+    from blog import renditions
+
+    name = big_image_post.image.name
+    old = renditions.get_rendition(name, 320, 0, "jpeg")
+    new = renditions.get_rendition(name, 640, 0, "jpeg")
+    renditions.os.utime(old, (1, 1))
+    renditions.evict(new.stat().st_size)
+    assert new.exists() and not old.exists()
+
+
+def test_feed_emits_srcset(client, big_image_post):
+    content = client.get("/").content.decode("utf-8")
+    assert f"/media/r/1280x0/{big_image_post.image.name} 1280w" in content
+
+
+def test_rendition_evicted_concurrently_is_rebuilt(
+        client, big_image_post, monkeypatch
+):
+    from blog import renditions
+
+    name = big_image_post.image.name
+    path = renditions.get_rendition(name, 320, 0, "jpeg")
+    real_open = open
+    evicted = []
+
+    def evict_before_open(file, *args, **kwargs):
+        # Соседний запрос удаляет копию между проверкой и открытием.
+        if file == path and not evicted:
+            evicted.append(file)
+            path.unlink()
+        return real_open(file, *args, **kwargs)
+
+    monkeypatch.setattr("builtins.open", evict_before_open)
+    response = client.get(f"/media/r/320x0/{name}", HTTP_ACCEPT="image/*")
+    assert response.status_code == HTTPStatus.OK
+    assert evicted and b"".join(response.streaming_content)
+    monkeypatch.undo()
+
+    path.unlink()
+    assert renditions.get_rendition(name, 320, 0, "jpeg").exists(), (
+        "Убедитесь, что удалённая копия строится заново, а не роняет"
+        " запрос."
+    )
+
+
+def test_rendition_cache_is_not_scanned_on_every_miss(
+        big_image_post, monkeypatch
+):
+    from blog import renditions
+
+    name = big_image_post.image.name
+    renditions.get_rendition(name, 320, 0, "jpeg")
+    scans = []
+    real_scan = renditions.scan
+    monkeypatch.setattr(
+        renditions, "scan", lambda: scans.append(1) or real_scan()
+    )
+    renditions.get_rendition(name, 640, 0, "jpeg")
+    renditions.get_rendition(name, 960, 0, "webp")
+    assert scans == [], (
+        "Убедитесь, что размер кэша копий ведётся счётчиком, а каталог"
+        " обходится только при переполнении."
+    )
+
+    monkeypatch.setattr(renditions, "RENDITION_CACHE_MAX_BYTES", 1)
+    monkeypatch.setattr(renditions, "RENDITION_CACHE_EVICT_TO", 0)
+    newest = renditions.get_rendition(name, 1280, 0, "webp")
+    assert scans == [1]
+    assert not any(renditions.cache_root().rglob("*.jpeg"))
+    assert not newest.exists()
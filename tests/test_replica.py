@@ -0,0 +1,135 @@
+from http import HTTPStatus
+
+import pytest
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from blog import routers
+from blog.caching import REPLICA_TAG, bump_generation
+from blog.middleware import PIN_SESSION_KEY
+from blog.models import Post
+from blog.timeline import timeline
+
+
+@pytest.fixture
+def with_replica(settings):
+    settings.BLOG_READ_REPLICAS = ["replica"]
+
+
+def test_router_reads_from_primary_outside_views(with_replica):
+    router = routers.ReplicaRouter()
+    assert router.db_for_read(Post) == "default", (
+        "Убедитесь, что без разрешения представления чтение идёт "
+        "из основной базы."
+    )
+    token = routers.allow_replica_reads()
+    try:
+        assert router.db_for_read(Post) == "replica", (
+            "Убедитесь, что разрешённое чтение уходит в реплику."
+        )
+        assert router.db_for_write(Post) == "default", (
+            "Убедитесь, что запись всегда идёт в основную базу."
+        )
+    finally:
+        routers.reset_replica_reads(token)
+
+
+def test_router_without_replicas_uses_primary():
+    token = routers.allow_replica_reads()
+    try:
+        assert routers.ReplicaRouter().db_for_read(Post) == "default", (
+            "Убедитесь, что без BLOG_READ_REPLICAS реплики не используются."
+        )
+    finally:
+        routers.reset_replica_reads(token)
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+def test_feed_reads_replica_until_session_writes(
+        with_replica, user_client, post_with_published_location
+):
+    with CaptureQueriesContext(connections["replica"]) as replica:
+        response = user_client.get("/")
+    assert response.status_code == HTTPStatus.OK
+    assert replica.captured_queries, (
+        "Убедитесь, что главная страница читает ленту с реплики."
+    )
+    response = user_client.post(
+        f"/posts/{post_with_published_location.id}/comment",
+        data={"text": "Комментарий"},
+    )
+    assert response.status_code == HTTPStatus.FOUND
+    assert user_client.session.get(PIN_SESSION_KEY), (
+        "Убедитесь, что после записи сессия закрепляется за основной базой."
+    )
+    with CaptureQueriesContext(connections["replica"]) as replica:
+        user_client.get(f"/posts/{post_with_published_location.id}/")
+    assert not replica.captured_queries, (
+        "Убедитесь, что сразу после записи автор читает из основной базы."
+    )
+
+
+@pytest.mark.django_db
+def test_write_without_replicas_leaves_session_alone(
+        client, user_client, post_with_published_location
+):
+    from django.contrib.sessions.models import Session
+
+    url = f"/posts/{post_with_published_location.id}/comment"
+    response = user_client.post(url, data={"text": "Комментарий"})
+    assert response.status_code == HTTPStatus.FOUND
+    assert PIN_SESSION_KEY not in user_client.session, (
+        "Убедитесь, что без BLOG_READ_REPLICAS сессия не закрепляется"
+        " за основной базой."
+    )
+    sessions = Session.objects.count()
+    client.post(url, data={"text": "Комментарий"})
+    assert Session.objects.count() == sessions, (
+        "Убедитесь, что анонимный POST не создаёт сессию."
+    )
+
+
+@pytest.mark.django_db
+def test_failed_write_does_not_pin_session(with_replica, user_client):
+    response = user_client.post("/posts/0/comment", data={"text": "Нет"})
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert PIN_SESSION_KEY not in user_client.session, (
+        "Убедитесь, что неудачная запись не закрепляет сессию за основной"
+        " базой."
+    )
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+def test_timeline_is_built_from_primary(
+        with_replica, post_with_published_location
+):
+    timeline.reset()
+    token = routers.allow_replica_reads()
+    try:
+        with CaptureQueriesContext(connections["replica"]) as replica:
+            posts = timeline.posts()
+    finally:
+        routers.reset_replica_reads(token)
+    assert posts == [post_with_published_location]
+    assert not replica.captured_queries, (
+        "Убедитесь, что буфер ленты собирается из основной базы: реплика "
+        "может отставать от записи, сдвинувшей поколение."
+    )
+
+
+@pytest.mark.django_db(transaction=True, databases=["default", "replica"])
+def test_replica_refresh_purges_pages_read_from_replica(
+        with_replica, client, post_with_published_location
+):
+    url = f"/posts/{post_with_published_location.id}/"
+    client.get(url)
+    with CaptureQueriesContext(connections["replica"]) as replica:
+        client.get(url)
+    assert not replica.captured_queries
+    bump_generation(REPLICA_TAG)
+    with CaptureQueriesContext(connections["replica"]) as replica:
+        client.get(url)
+    assert replica.captured_queries, (
+        "Убедитесь, что страницы, прочитанные с реплики, сбрасываются "
+        "при её обновлении."
+    )
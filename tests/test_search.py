@@ -0,0 +1,83 @@
+from http import HTTPStatus
+
+import pytest
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_search_finds_stemmed_words(
+        client, mixer, user, published_category, published_location
+):
+    travel = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        title="Путешествие на Байкал", text="Зимой лёд прозрачный.",
+    )
+    cooking = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        title="Рецепт", text="Блины для путешествий и походов.",
+    )
+    mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        title="Другое", text="Ничего общего.",
+    )
+    mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        title="Путешествия", text="Черновик.", is_published=False,
+    )
+
+    response = client.get("/search/?q=путешествия")
+
+    assert response.status_code == HTTPStatus.OK
+    found = list(response.context["page_obj"])
+    assert found == [travel, cooking], (
+        "Убедитесь, что поиск находит словоформы, ранжирует совпадения в"
+        " заголовке выше и не показывает неопубликованные посты."
+    )
+
+
+def test_search_includes_comments(client, mixer, post_with_published_location):
+    mixer.blend(
+        "blog.Comment", post=post_with_published_location,
+        text="Отличные фотографии озера",
+    )
+    response = client.get("/search/?q=фотография")
+    assert list(response.context["page_obj"]) == [
+        post_with_published_location
+    ]
+
+
+def test_deleted_post_leaves_index(
+        client, mixer, user, published_category
+):
+    post = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        title="Удаляемая заметка",
+    )
+    post.delete()
+    response = client.get("/search/?q=заметка")
+    assert list(response.context["page_obj"]) == []
+
+
+def test_admin_search_uses_index(
+        client, mixer, user, published_category
+):
+    wanted = mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        title="Горные маршруты", is_published=False,
+    )
+    mixer.blend(
+        "blog.Post", author=user, category=published_category,
+        title="Морские прогулки",
+    )
+    admin = mixer.blend(
+        "auth.User", is_staff=True, is_superuser=True, is_active=True
+    )
+    client.force_login(admin)
+    response = client.get("/admin/blog/post/?q=маршрут")
+    assert response.status_code == HTTPStatus.OK
+    assert list(response.context["cl"].result_list) == [wanted]
+    response = client.get("/admin/blog/post/?q=!!!")
+    assert response.status_code == HTTPStatus.OK, (
+        "Убедитесь, что поиск в админке выдерживает запрос без слов."
+    )
+    assert list(response.context["cl"].result_list) == []
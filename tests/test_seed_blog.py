@@ -0,0 +1,116 @@
+import random
+from collections import Counter
+from datetime import datetime
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db.models import Sum
+from django.utils.timezone import make_aware
+
+from blog import seeding
+from blog.models import Category, Comment, Location, Post
+
+DB_JSON = settings.BASE_DIR.parent / "db.json"
+NOW = "2024-06-01T12:00"
+
+
+def snapshot():
+    """Данные без абсолютных ключей: они зависят от того, что уже в базе."""
+    first = {
+        kind: model.objects.order_by("pk").values_list(
+            "pk", flat=True
+        ).first()
+        for kind, model in seeding.MODELS.items()
+    }
+    return [
+        (post.title, post.text, post.pub_date, post.is_published,
+         post.author_id - first["users"],
+         post.category_id - first["categories"],
+         post.comment_count)
+        for post in Post.objects.order_by("pk")
+    ]
+
+
+def clear():
+    for model in reversed(seeding.MODELS.values()):
+        model.objects.all().delete()
+
+
+def test_shape_follows_dump():
+    shape = seeding.Shape.from_dump(DB_JSON)
+    assert shape.sample_posts == 39
+    assert shape.sample_users == 4
+    assert shape.unpublished == 0
+    assert shape.no_location == 0
+    assert 0 < shape.author_skew <= seeding.MAX_SKEW, (
+        "Убедитесь, что перекос авторов снимается с дампа."
+    )
+    assert "обед" in shape.words, (
+        "Убедитесь, что словарь берётся из текстов дампа."
+    )
+    counts = shape.counts(39 * 100)
+    assert counts["users"] == 400
+    assert counts["categories"] == 60
+    assert counts["locations"] == 120
+
+
+def test_zipf_index_prefers_small_ranks():
+    rng = random.Random(0)
+    picks = [seeding.zipf_index(rng, 100, 1.0) for _ in range(10000)]
+    assert min(picks) == 0 and max(picks) <= 99
+    assert picks.count(0) > picks.count(50) * 10
+    assert sorted({seeding.scatter(index, 100) for index in range(100)}) == (
+        list(range(100))
+    ), "Убедитесь, что перестановка ключей взаимно однозначна."
+
+
+@pytest.mark.django_db(transaction=True)
+def test_seed_blog_is_deterministic(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    options = {"posts": 60, "seed": 7, "images": 0.3}
+    call_command("seed_blog", "--now", NOW, workers=1, **options)
+    serial = snapshot()
+    clear()
+    call_command(
+        "seed_blog", "--now", NOW, workers=2, batch_size=16, **options
+    )
+    assert snapshot() == serial, (
+        "Убедитесь, что данные зависят только от seed, а не от числа "
+        "процессов и размера пачки."
+    )
+
+
+@pytest.mark.django_db(transaction=True)
+def test_seed_blog_fills_derived_fields(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    call_command(
+        "seed_blog", "--now", NOW, posts=200, comments=1000, users=20,
+        seed=1, unpublished=0.1, scheduled=0.1, images=0.2, workers=1,
+    )
+    assert Post.objects.count() == 200
+    assert Comment.objects.count() == 1000
+    assert Category.objects.exists() and Location.objects.exists()
+    assert Post.objects.aggregate(total=Sum("comment_count"))["total"] == (
+        1000
+    ), "Убедитесь, что comment_count пересчитывается после вставки."
+    assert not Post.objects.filter(text_html="").exists()
+    assert Post.objects.filter(is_published=False).exists()
+    assert Post.objects.filter(
+        pub_date__gt=make_aware(datetime.fromisoformat(NOW))
+    ).exists(), "Убедитесь, что часть публикаций отложена."
+    assert Post.objects.exclude(image="").exists()
+    assert Post.objects.filter(is_visible=True).exists()
+    counts = sorted(Counter(
+        Post.objects.values_list("author_id", flat=True)
+    ).values(), reverse=True)
+    assert counts[0] > counts[len(counts) // 2] * 2, (
+        "Убедитесь, что у немногих авторов большая часть публикаций."
+    )
+
+
+@pytest.mark.django_db
+def test_seed_blog_reports_missing_dump(tmp_path):
+    with pytest.raises(CommandError):
+        call_command("seed_blog", dump=str(tmp_path / "missing.json"))
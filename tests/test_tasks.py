@@ -0,0 +1,76 @@
+import pytest
+from django.core import mail
+from django.core.management import call_command
+
+from blog import tasks
+from blog.models import Task
+
+pytestmark = [pytest.mark.django_db]
+
+calls = []
+
+
+def record(value):
+    calls.append(value)
+
+
+def explode():
+    raise RuntimeError("Задача упала")
+
+
+def test_enqueue_deduplicates_pending_tasks():
+    first = tasks.enqueue(record, 1, dedup_key="record")
+    second = tasks.enqueue(record, 2, dedup_key="record")
+    assert first.pk == second.pk
+    assert Task.objects.filter(dedup_key="record").count() == 1
+
+    tasks.execute(tasks.claim(1)[0])
+    third = tasks.enqueue(record, 3, dedup_key="record")
+    assert third.pk != first.pk, (
+        "Убедитесь, что ключ дедупликации освобождается после выполнения."
+    )
+
+
+def test_failed_task_is_retried_then_given_up():
+    task = tasks.enqueue(explode, max_attempts=2)
+    assert tasks.execute(tasks.claim(1)[0]) == Task.PENDING
+    task.refresh_from_db()
+    assert task.attempts == 1 and "Задача упала" in task.last_error
+    assert tasks.claim(1) == [], "Повтор должен ждать паузу."
+
+    Task.objects.filter(pk=task.pk).update(run_after=task.created_at)
+    assert tasks.execute(tasks.claim(1)[0]) == Task.FAILED
+
+
+def test_abandoned_task_is_given_up_after_max_attempts():
+    # Обработчик каждый раз умирает, не записав результат.
+    task = tasks.enqueue(record, 1, max_attempts=2)
+    for _ in range(2):
+        assert tasks.claim(1, lease=-1) == [task.pk]
+    assert tasks.claim(1) == [], (
+        "Убедитесь, что брошенная задача не забирается сверх max_attempts."
+    )
+    task.refresh_from_db()
+    assert task.status == Task.FAILED
+    assert task.attempts == 2
+
+
+def test_queued_email_backend(settings):
+    settings.EMAIL_BACKEND = "blog.mail.QueuedEmailBackend"
+    settings.QUEUED_EMAIL_BACKEND = (
+        "django.core.mail.backends.locmem.EmailBackend"
+    )
+    mail.send_mail("Тема", "Текст", "from@example.com", ["to@example.com"])
+    assert mail.outbox == []
+    tasks.execute(tasks.claim(1)[0])
+    assert [message.subject for message in mail.outbox] == ["Тема"]
+
+
+@pytest.mark.django_db(transaction=True)
+def test_worker_command_runs_tasks():
+    calls.clear()
+    for value in range(5):
+        tasks.enqueue(record, value)
+    call_command("run_tasks", "--once", "--workers", "2")
+    assert sorted(calls) == list(range(5))
+    assert not Task.objects.exclude(status=Task.DONE).exists()
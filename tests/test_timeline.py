@@ -0,0 +1,84 @@
+from datetime import timedelta
+
+import pytest
+from django.utils import timezone
+
+from blog.constants import TIMELINE_MAX_AGE, TIMELINE_SIZE
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_index_is_served_from_timeline(
+        user_client, django_assert_num_queries,
+        many_posts_with_published_locations
+):
+    user_client.get("/")
+    # Остаются только запросы сессии и пользователя.
+    with django_assert_num_queries(2):
+        response = user_client.get("/?page=2")
+    assert response.context["page_obj"].number == 2
+    assert len(response.context["page_obj"]) > 0
+
+
+def test_timeline_follows_edits(
+        user_client, mixer, post_with_published_location
+):
+    post = post_with_published_location
+    user_client.get("/")
+
+    post.title = "Заголовок после правки"
+    post.save()
+    assert post.title in user_client.get("/").content.decode()
+
+    mixer.blend("blog.Comment", post=post)
+    assert "Комментарии (1)" in user_client.get("/").content.decode()
+
+    post.category.is_published = False
+    post.category.save()
+    assert post.title not in user_client.get("/").content.decode()
+
+
+def test_timeline_expires_at_scheduled_publication(
+        user_client, monkeypatch, post_with_published_location
+):
+    post = post_with_published_location
+    post.pub_date = timezone.now() + timedelta(seconds=1)
+    post.save()
+    assert not user_client.get("/").context["page_obj"].object_list
+
+    # Публикация вышла без сигналов; буфер сверяется с её временем.
+    type(post).objects.filter(pk=post.pk).update(
+        pub_date=timezone.now() - timedelta(seconds=1)
+    )
+    later = timezone.now() + timedelta(seconds=2)
+    monkeypatch.setattr("blog.timeline.now", lambda: later)
+    page_obj = user_client.get("/").context["page_obj"]
+    assert [item.pk for item in page_obj] == [post.pk]
+
+
+def test_timeline_has_bounded_lifetime(
+        user_client, monkeypatch, post_with_published_location
+):
+    post = post_with_published_location
+    user_client.get("/")
+    # Снятие с публикации в обход сигналов не сдвигает поколения тегов.
+    type(post).objects.filter(pk=post.pk).update(is_visible=False)
+    assert user_client.get("/").context["page_obj"].object_list
+
+    later = timezone.now() + timedelta(seconds=TIMELINE_MAX_AGE + 1)
+    monkeypatch.setattr("blog.timeline.now", lambda: later)
+    assert not user_client.get("/").context["page_obj"].object_list, (
+        "Убедитесь, что буфер ленты не живёт дольше TIMELINE_MAX_AGE."
+    )
+
+
+def test_deep_pages_fall_back_to_database(
+        client, mixer, published_category, published_location
+):
+    mixer.cycle(TIMELINE_SIZE + 5).blend(
+        "blog.Post", category=published_category,
+        location=published_location,
+    )
+    pages = TIMELINE_SIZE // 10 + 1
+    response = client.get(f"/?page={pages}")
+    assert len(response.context["page_obj"]) == 5
@@ -0,0 +1,37 @@
+from http import HTTPStatus
+
+import pytest
+
+pytestmark = [pytest.mark.django_db]
+
+
+def test_category_toggle_updates_visibility(
+        another_user_client, post_with_published_location, published_category
+):
+    post = post_with_published_location
+    post.refresh_from_db()
+    assert post.is_visible
+
+    published_category.is_published = False
+    published_category.save()
+    post.refresh_from_db()
+    assert not post.is_visible, (
+        "Убедитесь, что снятие категории с публикации скрывает её посты."
+    )
+    response = another_user_client.get(f"/posts/{post.id}/")
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+    published_category.is_published = True
+    published_category.save()
+    post.refresh_from_db()
+    assert post.is_visible
+
+
+def test_category_delete_hides_posts(
+        post_with_published_location, published_category
+):
+    post = post_with_published_location
+    published_category.delete()
+    post.refresh_from_db()
+    assert post.category is None
+    assert not post.is_visible
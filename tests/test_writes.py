@@ -0,0 +1,119 @@
+import fcntl
+import threading
+from http import HTTPStatus
+
+import pytest
+
+from blog import tasks
+from blog.writes import WriteLock, WriteQueueFull
+from blogicum import settings as project_settings
+
+
+@pytest.fixture
+def held():
+    """Держать блокировку в другом потоке, пока тест не отпустит её."""
+    acquired, release = threading.Event(), threading.Event()
+
+    def hold(write_lock):
+        def run():
+            with write_lock.hold():
+                acquired.set()
+                release.wait(5)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        acquired.wait(5)
+        return thread
+
+    threads = []
+    yield lambda write_lock: threads.append(hold(write_lock))
+    release.set()
+    for thread in threads:
+        thread.join()
+
+
+def test_full_queue_rejects_writer_at_once(held, tmp_path):
+    write_lock = WriteLock(tmp_path / "db.lock", max_waiters=1, timeout=5)
+    held(write_lock)
+    with pytest.raises(WriteQueueFull):
+        with write_lock.hold():
+            pass
+
+
+def test_writer_gives_up_after_timeout(held, tmp_path):
+    write_lock = WriteLock(tmp_path / "db.lock", max_waiters=2, timeout=0.05)
+    held(write_lock)
+    with pytest.raises(WriteQueueFull):
+        with write_lock.hold():
+            pass
+
+
+def test_nested_writes_share_the_lock(tmp_path):
+    write_lock = WriteLock(tmp_path / "db.lock", max_waiters=1, timeout=0.05)
+    with write_lock.hold():
+        with write_lock.hold():
+            pass
+    with write_lock.hold():
+        pass
+
+
+def test_file_lock_is_shared_between_processes(tmp_path):
+    path = tmp_path / "db.lock"
+    write_lock = WriteLock(path, max_waiters=2, timeout=0.05)
+    with open(path, "a") as other_process:
+        fcntl.flock(other_process, fcntl.LOCK_EX)
+        with pytest.raises(WriteQueueFull):
+            with write_lock.hold():
+                pass
+        fcntl.flock(other_process, fcntl.LOCK_UN)
+    with write_lock.hold():
+        pass
+
+
+@pytest.fixture
+def write_lock(settings, tmp_path):
+    settings.BLOG_WRITE_LOCK = {"PATH": tmp_path / "db.lock", "TIMEOUT": 0.05}
+
+
+def test_write_lock_is_optional():
+    assert project_settings.BLOG_WRITE_LOCK is None, (
+        "Убедитесь, что очередь записи по умолчанию выключена."
+    )
+
+
+@pytest.mark.django_db
+def test_busy_write_gets_service_unavailable(
+        settings, write_lock, user_client, post_with_published_location
+):
+    with open(settings.BLOG_WRITE_LOCK["PATH"], "a") as other_process:
+        fcntl.flock(other_process, fcntl.LOCK_EX)
+        response = user_client.post(
+            f"/posts/{post_with_published_location.id}/comment",
+            data={"text": "Комментарий"},
+        )
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE, (
+        "Убедитесь, что запись, не дождавшаяся очереди, получает ответ 503."
+    )
+    assert response["Retry-After"], (
+        "Убедитесь, что ответ 503 подсказывает, когда повторить запрос."
+    )
+    assert not post_with_published_location.comments.exists()
+    response = user_client.post(
+        f"/posts/{post_with_published_location.id}/comment",
+        data={"text": "Комментарий"},
+    )
+    assert response.status_code == HTTPStatus.FOUND, (
+        "Убедитесь, что после освобождения очереди запись проходит."
+    )
+
+
+@pytest.mark.django_db
+def test_task_worker_writes_through_queue(settings, write_lock):
+    task = tasks.enqueue(tasks.warm_renditions, 1)
+    with open(settings.BLOG_WRITE_LOCK["PATH"], "a") as other_process:
+        fcntl.flock(other_process, fcntl.LOCK_EX)
+        assert tasks.claim(10) == [], (
+            "Убедитесь, что обработчик задач пишет через очередь записи."
+        )
+        fcntl.flock(other_process, fcntl.LOCK_UN)
+    assert tasks.claim(10) == [task.pk]